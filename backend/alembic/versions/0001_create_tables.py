@@ -0,0 +1,55 @@
+"""create categories and tasks tables
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+
+既存のモデル (db_init.create_tables) と同じスキーマ。
+create_allで作成済みのDBは `alembic stamp 0001` してから upgrade する。
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'categories',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(timezone=True)),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name'),
+    )
+    op.create_index('ix_categories_id', 'categories', ['id'])
+
+    op.create_table(
+        'tasks',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('title', sa.String(length=255), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('priority', sa.String(length=10), nullable=False),
+        sa.Column('due_date', sa.DateTime(), nullable=True),
+        sa.Column('status', sa.Boolean()),
+        sa.Column('order_index', sa.Integer()),
+        sa.Column('category_id', sa.Integer(), sa.ForeignKey('categories.id')),
+        sa.Column('parent_task_id', sa.Integer(), sa.ForeignKey('tasks.id'), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(timezone=True)),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_tasks_id', 'tasks', ['id'])
+
+
+def downgrade():
+    op.drop_index('ix_tasks_id', table_name='tasks')
+    op.drop_table('tasks')
+    op.drop_index('ix_categories_id', table_name='categories')
+    op.drop_table('categories')
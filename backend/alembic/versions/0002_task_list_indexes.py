@@ -0,0 +1,38 @@
+"""add composite indexes for task list filters and sort order
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+
+get_tasksの並び順 (order_index, due_date, created_at, id) を末尾に持つ複合インデックス。
+各フィルタ列を先頭に置くことで、絞り込みとORDER BYを同じインデックスで満たし、
+一時B-treeによるソートなしでLIMIT件だけを読む。
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+SORT_COLUMNS = ['order_index', 'due_date', 'created_at', 'id']
+
+INDEXES = {
+    'ix_tasks_sort': [],
+    'ix_tasks_status_sort': ['status'],
+    'ix_tasks_priority_sort': ['priority'],
+    'ix_tasks_category_sort': ['category_id'],
+    'ix_tasks_parent_sort': ['parent_task_id'],
+}
+
+
+def upgrade():
+    for name, prefix in INDEXES.items():
+        op.create_index(name, 'tasks', prefix + SORT_COLUMNS)
+
+
+def downgrade():
+    for name in INDEXES:
+        op.drop_index(name, table_name='tasks')
@@ -0,0 +1,30 @@
+"""add data_versions table
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+
+テーブルごとの更新バージョン。ETagの算出に使う。
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'data_versions',
+        sa.Column('name', sa.String(length=50), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('name'),
+    )
+
+
+def downgrade():
+    op.drop_table('data_versions')
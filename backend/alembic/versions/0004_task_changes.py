@@ -0,0 +1,47 @@
+"""add task change sequence and tombstones
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+
+差分同期 (GET /tasks/changes) 用。tasks.change_seqは最後に変更されたコミットの
+変更シーケンス (data_versionsのtasksのバージョン) で、task_tombstonesは削除の記録。
+既存のタスクには現在のバージョンを設定する。
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('tasks') as batch_op:
+        batch_op.add_column(sa.Column('change_seq', sa.Integer(), nullable=True))
+        batch_op.create_index('ix_tasks_change_seq', ['change_seq', 'id'])
+    op.execute(
+        "UPDATE tasks SET change_seq = "
+        "COALESCE((SELECT version FROM data_versions WHERE name = 'tasks'), 0)"
+    )
+
+    op.create_table(
+        'task_tombstones',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('task_id', sa.Integer(), nullable=False),
+        sa.Column('change_seq', sa.Integer(), nullable=True),
+        sa.Column('deleted_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_task_tombstones_change_seq', 'task_tombstones', ['change_seq', 'task_id'])
+
+
+def downgrade():
+    op.drop_index('ix_task_tombstones_change_seq', table_name='task_tombstones')
+    op.drop_table('task_tombstones')
+    with op.batch_alter_table('tasks') as batch_op:
+        batch_op.drop_index('ix_tasks_change_seq')
+        batch_op.drop_column('change_seq')
@@ -0,0 +1,63 @@
+"""add materialized task paths
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17
+
+tasks.pathは祖先のIDを/で区切った経路 (ルートは'/')。
+子孫・祖先の取得、親の付け替え時の循環の検出に使う。既存のタスクは親子関係から再帰CTEで設定する
+(循環していてルートから辿れないタスクは'/'のまま)。
+ダウングレードのテーブルの再作成でFTS5の索引を同期するトリガー (0005) が消えるため作り直す。
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+# 0005で作成したFTS5の索引を同期するトリガー
+SEARCH_TRIGGERS = [
+    "CREATE TRIGGER tasks_fts_ai AFTER INSERT ON tasks BEGIN "
+    "INSERT INTO tasks_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    "CREATE TRIGGER tasks_fts_ad AFTER DELETE ON tasks BEGIN "
+    "INSERT INTO tasks_fts(tasks_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); END",
+    "CREATE TRIGGER tasks_fts_au AFTER UPDATE OF title, description ON tasks BEGIN "
+    "INSERT INTO tasks_fts(tasks_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); "
+    "INSERT INTO tasks_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+]
+
+
+def upgrade():
+    with op.batch_alter_table('tasks') as batch_op:
+        batch_op.add_column(sa.Column(
+            'path',
+            sa.Text().with_variant(sa.Text(collation='C'), 'postgresql'),
+            server_default='/',
+            nullable=False,
+        ))
+        batch_op.create_index('ix_tasks_path', ['path'])
+    op.execute(
+        "WITH RECURSIVE tree (id, path) AS ("
+        " SELECT id, '/' FROM tasks WHERE parent_task_id IS NULL"
+        " UNION ALL"
+        " SELECT tasks.id, tree.path || CAST(tree.id AS VARCHAR) || '/'"
+        " FROM tasks JOIN tree ON tasks.parent_task_id = tree.id"
+        ") "
+        "UPDATE tasks SET path = (SELECT tree.path FROM tree WHERE tree.id = tasks.id) "
+        "WHERE parent_task_id IS NOT NULL AND id IN (SELECT id FROM tree)"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('tasks') as batch_op:
+        batch_op.drop_index('ix_tasks_path')
+        batch_op.drop_column('path')
+    if op.get_bind().dialect.name == 'sqlite':
+        for statement in SEARCH_TRIGGERS:
+            op.execute(statement)
@@ -0,0 +1,46 @@
+"""add archived_tasks table
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17
+
+完了から一定期間が過ぎたタスクや、削除の代わりにアーカイブしたタスクをtasksから移動する先。
+tasksの(status, updated_at)のインデックスはアーカイブの対象を探すために使う。
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'archived_tasks',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('title', sa.String(length=255), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('priority', sa.String(length=10), nullable=False),
+        sa.Column('due_date', sa.DateTime(), nullable=True),
+        sa.Column('status', sa.Boolean(), nullable=True),
+        sa.Column('order_index', sa.Integer(), nullable=True),
+        sa.Column('category_id', sa.Integer(), nullable=True),
+        sa.Column('parent_task_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('path', sa.Text(), nullable=False),
+        sa.Column('archived_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_archived_tasks_archived_at', 'archived_tasks', ['archived_at', 'id'])
+    op.create_index('ix_tasks_status_updated', 'tasks', ['status', 'updated_at'])
+
+
+def downgrade():
+    op.drop_index('ix_tasks_status_updated', table_name='tasks')
+    op.drop_index('ix_archived_tasks_archived_at', table_name='archived_tasks')
+    op.drop_table('archived_tasks')
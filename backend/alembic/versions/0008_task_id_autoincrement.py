@@ -0,0 +1,58 @@
+"""never reuse task ids on SQLite
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17
+
+SQLiteのINTEGER PRIMARY KEYは最大のIDの行を削除するとそのIDを再利用するため、
+アーカイブしたタスクと同じIDのタスクが作成され、それをアーカイブするとarchived_tasksのIDが重複していた。
+tasksをAUTOINCREMENTにして作り直し、採番をアーカイブしたタスクのIDより後から始める。
+テーブルの再作成でFTS5の索引を同期するトリガーが消えるため作り直す (索引の内容はIDで対応するのでそのまま使える)。
+SQLite以外のDBはシーケンスでIDを再利用しないため何もしない。
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+TRIGGERS = [
+    "CREATE TRIGGER tasks_fts_ai AFTER INSERT ON tasks BEGIN "
+    "INSERT INTO tasks_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    "CREATE TRIGGER tasks_fts_ad AFTER DELETE ON tasks BEGIN "
+    "INSERT INTO tasks_fts(tasks_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); END",
+    "CREATE TRIGGER tasks_fts_au AFTER UPDATE OF title, description ON tasks BEGIN "
+    "INSERT INTO tasks_fts(tasks_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); "
+    "INSERT INTO tasks_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+]
+
+
+def _recreate_tasks(autoincrement):
+    with op.batch_alter_table(
+        'tasks', recreate='always', table_kwargs={'sqlite_autoincrement': autoincrement}
+    ):
+        pass
+    for statement in TRIGGERS:
+        op.execute(statement)
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    _recreate_tasks(True)
+    op.execute("DELETE FROM sqlite_sequence WHERE name = 'tasks'")
+    op.execute(
+        "INSERT INTO sqlite_sequence (name, seq) SELECT 'tasks', MAX("
+        "(SELECT COALESCE(MAX(id), 0) FROM tasks), (SELECT COALESCE(MAX(id), 0) FROM archived_tasks))"
+    )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    _recreate_tasks(False)
@@ -1,7 +1,36 @@
 from fastapi import APIRouter
 
-from app.api.endpoints import tasks, categories
+from app.api.endpoints import tasks, categories, cache, stream
+from app.core.config import settings
 
-api_router = APIRouter()
-api_router.include_router(tasks.router, prefix="/tasks", tags=["tasks"])
-api_router.include_router(categories.router, prefix="/categories", tags=["categories"])
\ No newline at end of file
+
+def with_overrides(router: APIRouter, overrides: APIRouter) -> APIRouter:
+    """
+    routerのルートのうち、overridesに同じパス・メソッドのルートがあるものを置き換える
+    ルートの順序 (静的なパスが/{id}より先に評価されること) はrouterのまま維持する
+    """
+    replacements = {(route.path, frozenset(route.methods)): route for route in overrides.routes}
+    combined = APIRouter()
+    combined.routes.extend(
+        replacements.get((route.path, frozenset(route.methods)), route) for route in router.routes
+    )
+    return combined
+
+
+def build_api_router(async_db: bool) -> APIRouter:
+    tasks_router, categories_router = tasks.router, categories.router
+    if async_db:
+        from app.api.endpoints import async_categories, async_tasks
+
+        tasks_router = with_overrides(tasks_router, async_tasks.router)
+        categories_router = with_overrides(categories_router, async_categories.router)
+
+    api_router = APIRouter()
+    api_router.include_router(tasks_router, prefix="/tasks", tags=["tasks"])
+    api_router.include_router(categories_router, prefix="/categories", tags=["categories"])
+    api_router.include_router(cache.router, prefix="/cache", tags=["cache"])
+    api_router.include_router(stream.router, prefix="/stream", tags=["stream"])
+    return api_router
+
+
+api_router = build_api_router(settings.ASYNC_DB)
@@ -0,0 +1,117 @@
+"""
+ASYNC_DB有効時にcategoriesルーターの同じパス・メソッドを置き換える非同期ハンドラー
+ここにないエンドポイントは同期版のハンドラーがそのまま使われる
+"""
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import response_cache
+from app.core.changes import get_versions
+from app.core.database import get_async_db
+from app.core.etag import compute_etag, conditional_response, is_not_modified, not_modified_response
+from app.core.pagination import decode_cursor, encode_cursor
+from app.crud import async_category_crud
+from app.schemas.category import Category, CategoryCreate, CategoryUpdate
+
+router = APIRouter()
+
+
+@router.get("/", response_model=List[Category])
+async def read_categories(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+):
+    """
+    カテゴリ一覧を取得する
+    - **cursor**: 前ページのX-Next-Cursorヘッダーの値。指定した場合はskipを無視してその続きを取得
+    更新がない間は同じ条件の結果をキャッシュから返し、If-None-Matchが一致する場合は304を返す
+    """
+    params = {"skip": skip, "limit": limit, "cursor": cursor}
+    cached = response_cache.load("categories", params)
+    if cached is not None:
+        return conditional_response(request, cached)
+    
+    # 前回から更新がなければ行を読み込まずに304を返す
+    etag = compute_etag(await db.run_sync(get_versions, ["categories"]), request)
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    
+    after_id = None
+    if cursor is not None:
+        try:
+            (after_id,) = decode_cursor(cursor, 1)
+            if type(after_id) is not int:
+                raise ValueError("Invalid cursor")
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    categories = await async_category_crud.get_categories(db, skip=skip, limit=limit, after_id=after_id)
+    
+    headers = {"ETag": etag}
+    if categories and len(categories) == limit:
+        headers["X-Next-Cursor"] = encode_cursor([categories[-1].id])
+    return response_cache.store(
+        "categories", params, [Category.from_orm(category) for category in categories], headers
+    )
+
+
+@router.post("/", response_model=Category)
+async def create_category(category: CategoryCreate, db: AsyncSession = Depends(get_async_db)):
+    """
+    新しいカテゴリを作成する
+    """
+    if await async_category_crud.get_category_by_name(db, name=category.name):
+        raise HTTPException(status_code=400, detail="Category already exists")
+    
+    return await async_category_crud.create_category(db=db, category=category)
+
+
+@router.get("/{category_id}", response_model=Category)
+async def read_category(category_id: int, db: AsyncSession = Depends(get_async_db)):
+    """
+    指定されたIDのカテゴリを取得する
+    """
+    db_category = await async_category_crud.get_category(db, category_id=category_id)
+    if db_category is None:
+        raise HTTPException(status_code=404, detail="Category not found")
+    return db_category
+
+
+@router.put("/{category_id}", response_model=Category)
+async def update_category(
+    category_id: int, category: CategoryUpdate, db: AsyncSession = Depends(get_async_db)
+):
+    """
+    カテゴリを更新する
+    """
+    db_category = await async_category_crud.get_category(db, category_id)
+    if db_category is None:
+        raise HTTPException(status_code=404, detail="Category not found")
+    
+    # 名前の更新時は重複チェック
+    if category.name is not None and db_category.name != category.name:
+        if await async_category_crud.get_category_by_name(db, name=category.name):
+            raise HTTPException(status_code=400, detail="Category name already exists")
+    
+    return await async_category_crud.update_category(
+        db=db, category_id=category_id, category_update=category, db_category=db_category
+    )
+
+
+@router.delete("/{category_id}")
+async def delete_category(category_id: int, db: AsyncSession = Depends(get_async_db)):
+    """
+    カテゴリを削除する
+    """
+    if not await async_category_crud.delete_category(db=db, category_id=category_id, only_if_empty=True):
+        if await async_category_crud.get_category(db, category_id) is None:
+            raise HTTPException(status_code=404, detail="Category not found")
+        raise HTTPException(
+            status_code=400,
+            detail="Category has associated tasks. Please delete or reassign tasks first."
+        )
+    return {"message": "Category deleted successfully"}
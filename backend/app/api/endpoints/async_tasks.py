@@ -0,0 +1,175 @@
+"""
+ASYNC_DB有効時にtasksルーターの同じパス・メソッドを置き換える非同期ハンドラー
+ここにないエンドポイントは同期版のハンドラーがそのまま使われる
+"""
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.endpoints.tasks import parse_cursor_param, parse_fields_param
+from app.core.cache import response_cache
+from app.core.changes import get_versions
+from app.core.database import get_async_db
+from app.core.etag import compute_etag, conditional_response, is_not_modified, not_modified_response
+from app.core.serialization import fast_json_enabled
+from app.crud import async_task_crud, task_crud
+from app.schemas.task import Task, TaskCreate, TaskUpdate, TaskStatusUpdate
+
+router = APIRouter()
+
+
+@router.get("/", response_model=List[Task])
+async def read_tasks(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    status: Optional[bool] = None,
+    priority: Optional[str] = None,
+    category_id: Optional[int] = None,
+    parent_task_id: Optional[int] = None,
+    fields: Optional[str] = None,
+):
+    """
+    タスク一覧を取得する
+    - **status**: タスクのステータス（完了/未完了）でフィルタリング
+    - **priority**: 優先度（low/medium/high）でフィルタリング
+    - **category_id**: カテゴリIDでフィルタリング
+    - **parent_task_id**: 親タスクIDでフィルタリング（指定しない場合はルートタスクのみ取得）
+    - **cursor**: 前ページのX-Next-Cursorヘッダーの値。指定した場合はskipを無視してその続きを取得
+    - **fields**: 返すフィールドをカンマ区切りで指定 (例: id,title,status)。指定した列だけをSELECTして返す
+    更新がない間は同じ条件の結果をキャッシュから返し、If-None-Matchが一致する場合は304を返す
+    """
+    selected = parse_fields_param(fields)
+    
+    params = {
+        "skip": skip,
+        "limit": limit,
+        "cursor": cursor,
+        "status": status,
+        "priority": priority,
+        "category_id": category_id,
+        "parent_task_id": parent_task_id,
+        "fields": selected,
+    }
+    cached = response_cache.load("tasks", params)
+    if cached is not None:
+        return conditional_response(request, cached)
+    
+    # 前回から更新がなければ行を読み込まずに304を返す
+    etag = compute_etag(await db.run_sync(get_versions, ["tasks"]), request)
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    
+    filters = dict(
+        skip=skip,
+        limit=limit,
+        status=status,
+        priority=priority,
+        category_id=category_id,
+        parent_task_id=parent_task_id,
+        after=parse_cursor_param(cursor),
+    )
+    headers = {"ETag": etag}
+    if selected is not None or fast_json_enabled():
+        # DBの値は検証済みのため、列の値からそのまま (FAST_JSONの場合はorjsonで) エンコードする
+        rows = await async_task_crud.get_task_rows(db, **filters, fields=selected)
+        # ページが埋まっている場合のみ次ページのカーソルを返す
+        if rows and len(rows) == limit:
+            headers["X-Next-Cursor"] = task_crud.encode_task_row_cursor(rows[-1])
+        if selected is not None:
+            # カーソル用に読んだ並び順の列を除く
+            rows = [{name: row[name] for name in selected} for row in rows]
+        return response_cache.store("tasks", params, rows, headers)
+    
+    tasks = await async_task_crud.get_tasks(db, **filters)
+    
+    # ページが埋まっている場合のみ次ページのカーソルを返す
+    if tasks and len(tasks) == limit:
+        headers["X-Next-Cursor"] = task_crud.encode_task_cursor(tasks[-1])
+    return response_cache.store("tasks", params, [Task.from_orm(task) for task in tasks], headers)
+
+
+@router.post("/", response_model=Task)
+async def create_task(task: TaskCreate, db: AsyncSession = Depends(get_async_db)):
+    """
+    新しいタスクを作成する
+    """
+    detail = await async_task_crud.check_references(db, task.category_id, task.parent_task_id)
+    if detail is not None:
+        raise HTTPException(status_code=404, detail=detail)
+    
+    return await async_task_crud.create_task(db=db, task=task)
+
+
+@router.get("/{task_id}", response_model=Task)
+async def read_task(
+    task_id: int, request: Request, response: Response, db: AsyncSession = Depends(get_async_db)
+):
+    """
+    指定されたIDのタスクを取得する
+    If-None-Matchが一致する場合は304を返す
+    """
+    etag = compute_etag(await db.run_sync(get_versions, ["tasks"]), request)
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    
+    db_task = await async_task_crud.get_task(db, task_id=task_id)
+    if db_task is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    response.headers["ETag"] = etag
+    return db_task
+
+
+@router.put("/{task_id}", response_model=Task)
+async def update_task(task_id: int, task: TaskUpdate, db: AsyncSession = Depends(get_async_db)):
+    """
+    タスクを更新する
+    """
+    db_task = await async_task_crud.get_task(db, task_id)
+    if db_task is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    
+    # 自分自身を親にはできない
+    if task.parent_task_id == task_id:
+        raise HTTPException(status_code=400, detail="Task cannot be its own parent")
+    
+    # 変更されるカテゴリ・親タスクのみ1クエリで存在確認 (親は経路で子孫でないことも確認)
+    detail = await async_task_crud.check_references(
+        db,
+        task.category_id if task.category_id != db_task.category_id else None,
+        task.parent_task_id if task.parent_task_id != db_task.parent_task_id else None,
+        task=db_task,
+    )
+    if detail == task_crud.TASK_CYCLE_ERROR:
+        raise HTTPException(status_code=400, detail=detail)
+    if detail is not None:
+        raise HTTPException(status_code=404, detail=detail)
+    
+    return await async_task_crud.update_task(db=db, task_id=task_id, task_update=task, db_task=db_task)
+
+
+@router.patch("/{task_id}/status", response_model=Task)
+async def update_task_status(
+    task_id: int, status_update: TaskStatusUpdate, db: AsyncSession = Depends(get_async_db)
+):
+    """
+    タスクのステータスを更新する
+    """
+    updated_task = await async_task_crud.update_task_status(
+        db=db, task_id=task_id, status=status_update.status
+    )
+    if updated_task is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return updated_task
+
+
+@router.delete("/{task_id}")
+async def delete_task(task_id: int, db: AsyncSession = Depends(get_async_db)):
+    """
+    タスクを削除する
+    """
+    if not await async_task_crud.delete_task(db=db, task_id=task_id):
+        raise HTTPException(status_code=404, detail="Task not found")
+    return {"message": "Task deleted successfully"}
@@ -0,0 +1,13 @@
+from fastapi import APIRouter
+
+from app.core.cache import response_cache
+
+router = APIRouter()
+
+
+@router.get("/stats")
+def read_cache_stats():
+    """
+    レスポンスキャッシュのヒット・ミス・無効化の回数を取得する
+    """
+    return response_cache.stats()
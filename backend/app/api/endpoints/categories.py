@@ -1,21 +1,59 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
 
+from app.core.cache import response_cache
+from app.core.changes import get_versions
 from app.core.database import get_db
-from app.crud import category_crud
+from app.core.etag import compute_etag, conditional_response, is_not_modified, not_modified_response
+from app.core.pagination import decode_cursor, encode_cursor
+from app.crud import category_crud, task_crud
 from app.schemas.category import Category, CategoryCreate, CategoryUpdate, CategoryWithTasks
 
 router = APIRouter()
 
 
 @router.get("/", response_model=List[Category])
-def read_categories(db: Session = Depends(get_db), skip: int = 0, limit: int = 100):
+def read_categories(
+    request: Request,
+    db: Session = Depends(get_db),
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+):
     """
     カテゴリ一覧を取得する
+    - **cursor**: 前ページのX-Next-Cursorヘッダーの値。指定した場合はskipを無視してその続きを取得
+    更新がない間は同じ条件の結果をキャッシュから返し、If-None-Matchが一致する場合は304を返す
     """
-    categories = category_crud.get_categories(db, skip=skip, limit=limit)
-    return categories
+    params = {"skip": skip, "limit": limit, "cursor": cursor}
+    cached = response_cache.load("categories", params)
+    if cached is not None:
+        return conditional_response(request, cached)
+    
+    # 前回から更新がなければ行を読み込まずに304を返す
+    etag = compute_etag(get_versions(db, ["categories"]), request)
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    
+    after_id = None
+    if cursor is not None:
+        try:
+            (after_id,) = decode_cursor(cursor, 1)
+            if type(after_id) is not int:
+                raise ValueError("Invalid cursor")
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    categories = category_crud.get_categories(db, skip=skip, limit=limit, after_id=after_id)
+    
+    headers = {"ETag": etag}
+    if categories and len(categories) == limit:
+        headers["X-Next-Cursor"] = encode_cursor([categories[-1].id])
+    return response_cache.store(
+        "categories", params, [Category.from_orm(category) for category in categories], headers
+    )
 
 
 @router.post("/", response_model=Category)
@@ -44,13 +82,43 @@ def read_category(category_id: int, db: Session = Depends(get_db)):
 
 
 @router.get("/{category_id}/tasks", response_model=CategoryWithTasks)
-def read_category_with_tasks(category_id: int, db: Session = Depends(get_db)):
+def read_category_with_tasks(
+    category_id: int,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+):
     """
     指定されたIDのカテゴリとそのタスクを取得する
+    タスクはタスク一覧と同じ並び順でページングする
+    - **cursor**: 前ページのX-Next-Cursorヘッダーの値。指定した場合はskipを無視してその続きを取得
+    If-None-Matchが一致する場合は304を返す
     """
+    etag = compute_etag(get_versions(db, ["categories", "tasks"]), request)
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    
+    after = None
+    if cursor is not None:
+        try:
+            after = task_crud.decode_task_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    
     db_category = category_crud.get_category(db, category_id=category_id)
     if db_category is None:
         raise HTTPException(status_code=404, detail="Category not found")
+    
+    tasks = task_crud.get_tasks(db, skip=skip, limit=limit, category_id=category_id, after=after)
+    # ページ分のタスクを取得済みのコレクションとして設定し、全件の遅延ロードを防ぐ
+    set_committed_value(db_category, "tasks", tasks)
+    
+    if tasks and len(tasks) == limit:
+        response.headers["X-Next-Cursor"] = task_crud.encode_task_cursor(tasks[-1])
+    response.headers["ETag"] = etag
     return db_category
 
 
@@ -71,7 +139,7 @@ def update_category(category_id: int, category: CategoryUpdate, db: Session = De
             raise HTTPException(status_code=400, detail="Category name already exists")
     
     updated_category = category_crud.update_category(
-        db=db, category_id=category_id, category_update=category
+        db=db, category_id=category_id, category_update=category, db_category=db_category
     )
     return updated_category
 
@@ -81,16 +149,13 @@ def delete_category(category_id: int, db: Session = Depends(get_db)):
     """
     カテゴリを削除する
     """
-    db_category = category_crud.get_category(db, category_id)
-    if db_category is None:
-        raise HTTPException(status_code=404, detail="Category not found")
-    
-    # カテゴリに関連するタスクがあるか確認し、警告
-    if db_category.tasks:
+    # 関連するタスクがない場合のみ1文で削除し、削除できなかった場合だけ理由を確認する
+    if not category_crud.delete_category(db=db, category_id=category_id, only_if_empty=True):
+        if category_crud.get_category(db, category_id) is None:
+            raise HTTPException(status_code=404, detail="Category not found")
         raise HTTPException(
             status_code=400, 
             detail="Category has associated tasks. Please delete or reassign tasks first."
         )
     
-    category_crud.delete_category(db=db, category_id=category_id)
     return {"message": "Category deleted successfully"}
\ No newline at end of file
@@ -0,0 +1,57 @@
+import json
+from typing import Any, List, Optional
+
+from fastapi import APIRouter, Query, Request
+from fastapi.responses import StreamingResponse
+
+from app.core.config import settings
+from app.core.events import event_hub
+
+router = APIRouter()
+
+
+def format_sse(event: str, data: Any) -> str:
+    """Server-Sent Eventsの1メッセージに変換する"""
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+@router.get("")
+async def stream_changes(
+    request: Request,
+    category_id: Optional[List[int]] = Query(None),
+    type: Optional[List[str]] = Query(None, regex="^(task|category)$"),
+):
+    """
+    タスク・カテゴリの変更をServer-Sent Eventsで配信する
+    - **category_id**: 指定したカテゴリのタスク・カテゴリの変更のみ受け取る (複数指定可)
+    - **type**: task / category のどちらかの変更のみ受け取る
+    変更は "changes" イベントで [{"type", "action", "id", "category_id"}, ...] の形でまとめて届く。
+    タスクの削除はサブタスクの削除を含む。
+    "resync" を受け取った場合は通知が溢れたため、一覧を取得し直すか /tasks/changes で差分を取得する。
+    他のプロセス (複数ワーカー) で処理した書き込みは、STREAM_POLL_SECONDSが設定されている場合に
+    その間隔で届く (カテゴリの変更はresyncになる)
+    """
+    subscription = event_hub.subscribe(categories=category_id, types=type)
+
+    async def events():
+        try:
+            yield "retry: 3000\n\n"
+            while not await request.is_disconnected():
+                batch = await subscription.next_batch(
+                    timeout=settings.STREAM_HEARTBEAT_SECONDS,
+                    coalesce=settings.STREAM_COALESCE_SECONDS,
+                )
+                if not batch:
+                    yield ": keep-alive\n\n"
+                elif batch[0]["type"] == "resync":
+                    yield format_sse("resync", {})
+                else:
+                    yield format_sse("changes", batch)
+        finally:
+            event_hub.unsubscribe(subscription)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,23 +1,68 @@
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query
+import codecs
+import tempfile
+from datetime import date
+from typing import Any, Collection, Iterator, List, Optional, Set, Union
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, Query
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import StreamingResponse
 
+from app.core.cache import response_cache
+from app.core.changes import get_versions
 from app.core.database import get_db
-from app.crud import task_crud, category_crud
-from app.schemas.task import Task, TaskCreate, TaskUpdate, TaskWithSubtasks, TaskStatusUpdate
+from app.core.etag import compute_etag, conditional_response, is_not_modified, not_modified_response
+from app.core.pagination import decode_cursor, encode_cursor
+from app.core.serialization import dumps_csv, dumps_ndjson, fast_json_enabled
+from app.crud import task_crud, category_crud, task_archive, task_import
+from app.schemas.task import (
+    ArchivedTask, Task, TaskArchiveResult, TaskCreate, TaskUpdate, TaskWithSubtasks, TaskStatusUpdate,
+    TaskBulkUpdate, TaskBulkResult, TaskChanges, TaskImportResult, TaskSearchResult, TaskStats
+)
 
 router = APIRouter()
 
+# インポートで受け取った本文をディスクに書き出すまでにメモリに保持するバイト数
+IMPORT_SPOOL_SIZE = 1024 * 1024
+
+# エクスポート形式ごとのContent-Typeとファイル名
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", "tasks.ndjson"),
+    "csv": ("text/csv; charset=utf-8", "tasks.csv"),
+}
+
+
+def parse_fields_param(fields: Optional[str]) -> Optional[List[str]]:
+    """一覧のfieldsパラメータを返すフィールド名のリストにする (未指定の場合はNone、不正な場合は400)"""
+    if fields is None:
+        return None
+    try:
+        return task_crud.parse_task_fields(fields)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+
+def parse_cursor_param(cursor: Optional[str]) -> Optional[List[Any]]:
+    """一覧のcursorパラメータをget_tasksのafterに渡す値にする (未指定の場合はNone、不正な場合は400)"""
+    if cursor is None:
+        return None
+    try:
+        return task_crud.decode_task_cursor(cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
 
 @router.get("/", response_model=List[Task])
 def read_tasks(
+    request: Request,
     db: Session = Depends(get_db),
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     status: Optional[bool] = None,
     priority: Optional[str] = None,
     category_id: Optional[int] = None,
     parent_task_id: Optional[int] = None,
+    fields: Optional[str] = None,
 ):
     """
     タスク一覧を取得する
@@ -25,17 +70,214 @@ def read_tasks(
     - **priority**: 優先度（low/medium/high）でフィルタリング
     - **category_id**: カテゴリIDでフィルタリング
     - **parent_task_id**: 親タスクIDでフィルタリング（指定しない場合はルートタスクのみ取得）
+    - **cursor**: 前ページのX-Next-Cursorヘッダーの値。指定した場合はskipを無視してその続きを取得
+    - **fields**: 返すフィールドをカンマ区切りで指定 (例: id,title,status)。指定した列だけをSELECTして返す
+    更新がない間は同じ条件の結果をキャッシュから返し、If-None-Matchが一致する場合は304を返す
     """
-    tasks = task_crud.get_tasks(
-        db, 
-        skip=skip, 
+    selected = parse_fields_param(fields)
+    
+    params = {
+        "skip": skip,
+        "limit": limit,
+        "cursor": cursor,
+        "status": status,
+        "priority": priority,
+        "category_id": category_id,
+        "parent_task_id": parent_task_id,
+        "fields": selected,
+    }
+    cached = response_cache.load("tasks", params)
+    if cached is not None:
+        return conditional_response(request, cached)
+    
+    # 前回から更新がなければ行を読み込まずに304を返す
+    etag = compute_etag(get_versions(db, ["tasks"]), request)
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    
+    filters = dict(
+        skip=skip,
         limit=limit,
         status=status,
         priority=priority,
         category_id=category_id,
-        parent_task_id=parent_task_id
+        parent_task_id=parent_task_id,
+        after=parse_cursor_param(cursor),
     )
-    return tasks
+    headers = {"ETag": etag}
+    if selected is not None or fast_json_enabled():
+        # DBの値は検証済みのため、列の値からそのまま (FAST_JSONの場合はorjsonで) エンコードする
+        rows = task_crud.get_task_rows(db, **filters, fields=selected)
+        # ページが埋まっている場合のみ次ページのカーソルを返す
+        if rows and len(rows) == limit:
+            headers["X-Next-Cursor"] = task_crud.encode_task_row_cursor(rows[-1])
+        if selected is not None:
+            # カーソル用に読んだ並び順の列を除く
+            rows = [{name: row[name] for name in selected} for row in rows]
+        return response_cache.store("tasks", params, rows, headers)
+    
+    tasks = task_crud.get_tasks(db, **filters)
+    
+    # ページが埋まっている場合のみ次ページのカーソルを返す
+    if tasks and len(tasks) == limit:
+        headers["X-Next-Cursor"] = task_crud.encode_task_cursor(tasks[-1])
+    return response_cache.store("tasks", params, [Task.from_orm(task) for task in tasks], headers)
+
+
+@router.get("/stats", response_model=TaskStats)
+def read_task_stats(
+    request: Request,
+    today: Optional[date] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    ダッシュボード用に、完了・未完了、優先度別、カテゴリ別、今日期限、期限切れのタスク数を取得する
+    - **today**: 今日の日付 (クライアントのタイムゾーンの日付。省略時はサーバーの日付)
+    タスク一覧と同様に、キャッシュとIf-None-Matchによる304に対応する
+    """
+    today = today or date.today()
+    # タスクの書き込みで一覧と一緒に無効化されるよう、tasksの名前空間にキャッシュする
+    params = {"view": "stats", "today": today}
+    cached = response_cache.load("tasks", params)
+    if cached is not None:
+        return conditional_response(request, cached)
+    
+    # todayを省略した場合は日付が変わると集計も変わるため、補った日付もETagに含める
+    etag = compute_etag(get_versions(db, ["tasks"]), request, {"today": today})
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    
+    stats = task_crud.get_task_stats(db, today=today)
+    return response_cache.store("tasks", params, TaskStats(**stats), {"ETag": etag})
+
+
+@router.get("/changes", response_model=TaskChanges)
+def read_task_changes(
+    since: Optional[str] = None,
+    limit: int = Query(1000, ge=1, le=10000),
+    db: Session = Depends(get_db),
+):
+    """
+    前回の同期以降に作成・更新されたタスクと、削除されたタスクのIDを取得する
+    - **since**: 前回のレスポンスのnext_since。指定しない場合は全てのタスクを返す
+    - **limit**: 1回に返すタスクの最大件数。has_moreがtrueの間はnext_sinceで続きを取得する
+    """
+    since_seq = since_id = None
+    if since is not None:
+        try:
+            since_seq, since_id = decode_cursor(since, 2)
+            if type(since_seq) is not int or not (since_id is None or type(since_id) is int):
+                raise ValueError("Invalid since token")
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid since token")
+    
+    # 先にウォーターマークを読み、それ以降にコミットされた変更は次回の同期に回す
+    watermark = task_crud.get_change_watermark(db)
+    tasks = task_crud.get_changed_tasks(
+        db, watermark, since_seq=since_seq, since_id=since_id, limit=limit + 1
+    )
+    has_more = len(tasks) > limit
+    if has_more:
+        tasks = tasks[:limit]
+        until_seq, next_since = tasks[-1].change_seq, [tasks[-1].change_seq, tasks[-1].id]
+    else:
+        until_seq, next_since = watermark, [watermark, None]
+    
+    deleted = []
+    if since_seq is not None:
+        deleted = task_crud.get_deleted_task_ids(db, since_seq, until_seq)
+    
+    return {
+        "changed": tasks,
+        "deleted": deleted,
+        "next_since": encode_cursor(next_since),
+        "has_more": has_more,
+    }
+
+
+@router.get("/export")
+def export_tasks(
+    format: str = Query("ndjson", regex="^(ndjson|csv)$"),
+    status: Optional[bool] = None,
+    priority: Optional[str] = None,
+    category_id: Optional[int] = None,
+    parent_task_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    条件に一致する全タスクをNDJSONまたはCSVでストリーミングする
+    - **format**: ndjson (1行に1件のJSON) / csv (先頭行は列名)
+    - **status** / **priority** / **category_id** / **parent_task_id**: タスク一覧と同じフィルタリング
+    行はサーバーサイドカーソルで少しずつ読み込んで送るため、件数に関わらずメモリ使用量は一定
+    """
+    media_type, filename = EXPORT_FORMATS[format]
+    fieldnames = list(Task.__fields__)
+    
+    def content() -> Iterator[bytes]:
+        batches = task_crud.iter_task_rows(
+            db,
+            status=status,
+            priority=priority,
+            category_id=category_id,
+            parent_task_id=parent_task_id,
+        )
+        if format == "csv":
+            yield dumps_csv([], fieldnames, header=True)
+            for rows in batches:
+                yield dumps_csv(rows, fieldnames)
+        else:
+            for rows in batches:
+                yield dumps_ndjson(rows)
+    
+    return StreamingResponse(
+        content(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.get("/search", response_model=List[TaskSearchResult])
+def search_tasks(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    status: Optional[bool] = None,
+    priority: Optional[str] = None,
+    category_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    タイトルと説明を全文検索し、関連度順に取得する
+    - **q**: 検索語。空白区切りの各語を前方一致でAND検索する
+    - **status** / **priority** / **category_id**: タスク一覧と同じフィルタリング
+    snippetには一致した語を<mark>で囲んだ抜粋が入る。
+    一致が500件を超える場合は新しい方の500件から順位付けし、X-Search-Truncated: trueを返す
+    (skip + limitは500まで。語を増やすかフィルタで絞り込む)
+    """
+    if not task_crud.supports_search(db):
+        raise HTTPException(status_code=501, detail="Search is not supported by this database")
+    if skip + limit > task_crud.SEARCH_CANDIDATES:
+        raise HTTPException(
+            status_code=400, detail=f"skip + limit must not exceed {task_crud.SEARCH_CANDIDATES}"
+        )
+    
+    results, truncated = task_crud.search_tasks(
+        db,
+        q,
+        skip=skip,
+        limit=limit,
+        status=status,
+        priority=priority,
+        category_id=category_id,
+    )
+    if truncated:
+        response.headers["X-Search-Truncated"] = "true"
+    
+    return [
+        TaskSearchResult(**Task.from_orm(task).dict(), rank=rank, snippet=snippet)
+        for task, rank, snippet in results
+    ]
 
 
 @router.post("/", response_model=Task)
@@ -50,29 +292,205 @@ def create_task(task: TaskCreate, db: Session = Depends(get_db)):
     - **category_id**: カテゴリID
     - **parent_task_id**: 親タスクID（サブタスクの場合）
     """
-    # カテゴリIDが指定されている場合は存在確認
-    if task.category_id is not None:
-        db_category = category_crud.get_category(db, task.category_id)
-        if db_category is None:
-            raise HTTPException(status_code=404, detail="Category not found")
-    
-    # 親タスクIDが指定されている場合は存在確認
-    if task.parent_task_id is not None:
-        parent_task = task_crud.get_task(db, task.parent_task_id)
-        if parent_task is None:
-            raise HTTPException(status_code=404, detail="Parent task not found")
+    # 指定されたカテゴリ・親タスクの存在を1クエリで確認
+    detail = task_crud.check_references(db, task.category_id, task.parent_task_id)
+    if detail is not None:
+        raise HTTPException(status_code=404, detail=detail)
     
     return task_crud.create_task(db=db, task=task)
 
 
+def _reference_error(
+    task: Union[TaskCreate, TaskUpdate], category_ids: Set[int], parent_task_ids: Collection[int]
+) -> Optional[str]:
+    """一括操作の項目が参照するカテゴリ・親タスクが存在しない場合はエラー内容を返す"""
+    if task.category_id is not None and task.category_id not in category_ids:
+        return "Category not found"
+    if task.parent_task_id is not None and task.parent_task_id not in parent_task_ids:
+        return "Parent task not found"
+    return None
+
+
+@router.post("/bulk", response_model=List[TaskBulkResult])
+def create_tasks_bulk(tasks: List[TaskCreate], db: Session = Depends(get_db)):
+    """
+    タスクを一括作成する
+    参照先のカテゴリ・親タスクはまとめて存在確認し、有効な項目のみを1トランザクションで作成する。
+    結果は入力と同じ順序で項目ごとに返す。
+    """
+    category_ids = category_crud.get_existing_category_ids(
+        db, {task.category_id for task in tasks if task.category_id is not None}
+    )
+    parent_paths = task_crud.get_task_paths(
+        db, {task.parent_task_id for task in tasks if task.parent_task_id is not None}
+    )
+    
+    results = []
+    valid = []
+    for index, task in enumerate(tasks):
+        detail = _reference_error(task, category_ids, parent_paths)
+        if detail is None:
+            valid.append((index, task))
+        else:
+            results.append(TaskBulkResult(index=index, success=False, detail=detail))
+    
+    if valid:
+        created_ids = task_crud.bulk_create_tasks(db, [task for _, task in valid], parent_paths=parent_paths)
+        results.extend(
+            TaskBulkResult(index=index, id=task_id, success=True)
+            for (index, _), task_id in zip(valid, created_ids)
+        )
+    
+    return sorted(results, key=lambda result: result.index)
+
+
+@router.post("/import", response_model=TaskImportResult)
+async def import_tasks(
+    request: Request,
+    format: str = Query("ndjson", regex="^(ndjson|csv)$"),
+    chunk_size: Optional[int] = Query(None, ge=1, le=10000),
+    db: Session = Depends(get_db),
+):
+    """
+    リクエスト本文のNDJSON / CSV (GET /tasks/exportと同じ形式) からタスクを作成する
+    - **format**: ndjson / csv (先頭行は列名)
+    - **chunk_size**: 1トランザクションで作成する行数 (省略時はIMPORT_CHUNK_SIZE)
+    categoryにカテゴリ名を指定するとcategory_idに変換する。失敗した行は行番号とエラー内容を返し、他の行は作成する
+    """
+    # 本文は一定サイズを超えると一時ファイルに書き出し、行ごとに読みながら取り込む
+    with tempfile.SpooledTemporaryFile(max_size=IMPORT_SPOOL_SIZE) as spool:
+        async for chunk in request.stream():
+            spool.write(chunk)
+        # チャンクごとにコミットするため、途中の行の復号に失敗して一部だけ作成されないよう先に全体を確認する
+        spool.seek(0)
+        line = await run_in_threadpool(task_import.find_undecodable_line, spool)
+        if line is not None:
+            raise HTTPException(status_code=400, detail=f"Request body must be UTF-8 (line {line})")
+        spool.seek(0)
+        lines = codecs.iterdecode(spool, "utf-8-sig")
+        return await run_in_threadpool(task_import.import_tasks, db, lines, format, chunk_size)
+
+
+@router.patch("/bulk", response_model=List[TaskBulkResult])
+def update_tasks_bulk(tasks: List[TaskBulkUpdate], db: Session = Depends(get_db)):
+    """
+    タスクを一括更新する
+    指定されたフィールドのみを更新し、結果は入力と同じ順序で項目ごとに返す。
+    """
+    # 対象・親タスクの存在確認と同じクエリで経路も取得し、親の変更が循環しないかを入力順に確認する
+    paths = task_crud.get_task_paths(
+        db,
+        {task.id for task in tasks}
+        | {task.parent_task_id for task in tasks if task.parent_task_id is not None}
+    )
+    category_ids = category_crud.get_existing_category_ids(
+        db, {task.category_id for task in tasks if task.category_id is not None}
+    )
+    plan = task_crud.TaskMovePlan(paths)
+    
+    results = []
+    valid = []
+    for index, task in enumerate(tasks):
+        moves = "parent_task_id" in task.__fields_set__
+        if task.id not in paths:
+            detail = "Task not found"
+        elif task.parent_task_id == task.id:
+            detail = "Task cannot be its own parent"
+        else:
+            detail = _reference_error(task, category_ids, paths)
+            if detail is None and moves and plan.creates_cycle(task.id, task.parent_task_id):
+                detail = task_crud.TASK_CYCLE_ERROR
+        
+        if detail is None and moves:
+            plan.move(task.id, task.parent_task_id)
+        if detail is None:
+            valid.append(task)
+            results.append(TaskBulkResult(index=index, id=task.id, success=True))
+        else:
+            results.append(TaskBulkResult(index=index, id=task.id, success=False, detail=detail))
+    
+    if valid:
+        task_crud.bulk_update_tasks(db, valid)
+    return results
+
+
+@router.delete("/bulk", response_model=List[TaskBulkResult])
+def delete_tasks_bulk(task_ids: List[int], db: Session = Depends(get_db)):
+    """
+    タスクを一括削除する
+    結果は入力と同じ順序で項目ごとに返す。
+    """
+    # 削除に使うタスクを読み込み、その結果で存在確認も行う
+    db_tasks = task_crud.get_tasks_by_ids(db, task_ids)
+    existing_ids = {db_task.id for db_task in db_tasks}
+    if db_tasks:
+        task_crud.bulk_delete_tasks(db, existing_ids, db_tasks=db_tasks)
+    
+    return [
+        TaskBulkResult(index=index, id=task_id, success=True)
+        if task_id in existing_ids
+        else TaskBulkResult(index=index, id=task_id, success=False, detail="Task not found")
+        for index, task_id in enumerate(task_ids)
+    ]
+
+
+@router.post("/archive", response_model=TaskArchiveResult)
+def archive_completed_tasks(
+    older_than_days: Optional[int] = Query(None, ge=0),
+    batch_size: Optional[int] = Query(None, ge=1, le=10000),
+    db: Session = Depends(get_db),
+):
+    """
+    完了から一定期間が過ぎたタスクをアーカイブに移動する (一覧・検索などの対象から外れる)
+    - **older_than_days**: 完了 (最終更新) からの日数 (省略時はARCHIVE_AFTER_DAYS)
+    - **batch_size**: 1トランザクションで移動する件数 (省略時はARCHIVE_BATCH_SIZE)
+    未完了のサブタスクが残っているタスクは移動しない
+    """
+    return task_archive.archive_completed_tasks(db, older_than_days, batch_size)
+
+
+@router.get("/archived", response_model=List[ArchivedTask])
+def read_archived_tasks(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db),
+):
+    """
+    アーカイブしたタスクを新しくアーカイブした順に取得する
+    """
+    return task_archive.get_archived_tasks(db, skip=skip, limit=limit)
+
+
+@router.post("/archived/{task_id}/restore", response_model=Task)
+def restore_archived_task(task_id: int, db: Session = Depends(get_db)):
+    """
+    アーカイブしたタスクを戻す (サブタスクは個別に戻す)
+    カテゴリや親タスクが既に存在しない場合は未設定にする
+    """
+    archived = task_archive.get_archived_task(db, task_id)
+    if archived is None:
+        raise HTTPException(status_code=404, detail="Archived task not found")
+    
+    db_task = task_archive.restore_task(db, archived)
+    if db_task is None:
+        raise HTTPException(status_code=409, detail=task_archive.RESTORE_CONFLICT_ERROR)
+    return db_task
+
+
 @router.get("/{task_id}", response_model=Task)
-def read_task(task_id: int, db: Session = Depends(get_db)):
+def read_task(task_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
     """
     指定されたIDのタスクを取得する
+    If-None-Matchが一致する場合は304を返す
     """
+    etag = compute_etag(get_versions(db, ["tasks"]), request)
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    
     db_task = task_crud.get_task(db, task_id=task_id)
     if db_task is None:
         raise HTTPException(status_code=404, detail="Task not found")
+    response.headers["ETag"] = etag
     return db_task
 
 
@@ -87,33 +505,60 @@ def read_task_with_subtasks(task_id: int, db: Session = Depends(get_db)):
     return db_task
 
 
+@router.get("/{task_id}/tree", response_model=TaskWithSubtasks)
+def read_task_tree(
+    task_id: int,
+    max_depth: Optional[int] = Query(None, ge=0),
+    db: Session = Depends(get_db),
+):
+    """
+    指定されたIDのタスクと、その子孫タスクを入れ子で取得する
+    - **max_depth**: 取得する階層の深さ（指定しない場合は全階層、0はタスク自身のみ）
+    """
+    db_task = task_crud.get_task_tree(db, task_id=task_id, max_depth=max_depth)
+    if db_task is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return db_task
+
+
+@router.get("/{task_id}/ancestors", response_model=List[Task])
+def read_task_ancestors(task_id: int, db: Session = Depends(get_db)):
+    """
+    指定されたIDのタスクの祖先をルートから順に取得する (パンくずリスト用)
+    """
+    db_task = task_crud.get_task(db, task_id=task_id)
+    if db_task is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return task_crud.get_ancestors(db, db_task)
+
+
 @router.put("/{task_id}", response_model=Task)
 def update_task(task_id: int, task: TaskUpdate, db: Session = Depends(get_db)):
     """
     タスクを更新する
     """
-    # タスクの存在確認
+    # タスクの存在確認 (読み込んだタスクをそのまま更新に使う)
     db_task = task_crud.get_task(db, task_id)
     if db_task is None:
         raise HTTPException(status_code=404, detail="Task not found")
     
-    # カテゴリIDが指定されている場合は存在確認
-    if task.category_id is not None:
-        db_category = category_crud.get_category(db, task.category_id)
-        if db_category is None:
-            raise HTTPException(status_code=404, detail="Category not found")
-    
-    # 親タスクIDが指定されている場合は存在確認
-    if task.parent_task_id is not None:
-        parent_task = task_crud.get_task(db, task.parent_task_id)
-        if parent_task is None:
-            raise HTTPException(status_code=404, detail="Parent task not found")
-        
-        # 自分自身を親にはできない
-        if parent_task.id == task_id:
-            raise HTTPException(status_code=400, detail="Task cannot be its own parent")
+    # 自分自身を親にはできない
+    if task.parent_task_id == task_id:
+        raise HTTPException(status_code=400, detail="Task cannot be its own parent")
+    
+    # 変更されるカテゴリ・親タスクのみ1クエリで存在確認 (親は経路で子孫でないことも確認)
+    detail = task_crud.check_references(
+        db,
+        task.category_id if task.category_id != db_task.category_id else None,
+        task.parent_task_id if task.parent_task_id != db_task.parent_task_id else None,
+        task=db_task,
+    )
+    if detail == task_crud.TASK_CYCLE_ERROR:
+        raise HTTPException(status_code=400, detail=detail)
+    if detail is not None:
+        raise HTTPException(status_code=404, detail=detail)
     
-    updated_task = task_crud.update_task(db=db, task_id=task_id, task_update=task)
+    updated_task = task_crud.update_task(db=db, task_id=task_id, task_update=task, db_task=db_task)
     return updated_task
 
 
@@ -126,7 +571,9 @@ def update_task_status(task_id: int, status_update: TaskStatusUpdate, db: Sessio
     if db_task is None:
         raise HTTPException(status_code=404, detail="Task not found")
     
-    updated_task = task_crud.update_task_status(db=db, task_id=task_id, status=status_update.status)
+    updated_task = task_crud.update_task_status(
+        db=db, task_id=task_id, status=status_update.status, db_task=db_task
+    )
     return updated_task
 
 
@@ -139,19 +586,33 @@ def delete_task(task_id: int, db: Session = Depends(get_db)):
     if db_task is None:
         raise HTTPException(status_code=404, detail="Task not found")
     
-    task_crud.delete_task(db=db, task_id=task_id)
+    task_crud.delete_task(db=db, task_id=task_id, db_task=db_task)
     return {"message": "Task deleted successfully"}
 
 
+@router.post("/{task_id}/archive")
+def archive_task(task_id: int, db: Session = Depends(get_db)):
+    """
+    タスクをサブタスクごとアーカイブする (削除と異なり、POST /tasks/archived/{task_id}/restoreで戻せる)
+    """
+    db_task = task_crud.get_task(db, task_id)
+    if db_task is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    
+    archived = task_archive.archive_task(db, db_task)
+    return {"message": "Task archived successfully", "archived": archived}
+
+
 @router.post("/reorder", response_model=List[Task])
 def reorder_tasks(task_ids: List[int], db: Session = Depends(get_db)):
     """
     タスクの並び順を更新する
     タスクIDのリストを順番通りに並べ替える
     """
-    # すべてのタスクが存在するか確認
+    # すべてのタスクが存在するか1回のクエリで確認
+    existing_ids = task_crud.get_existing_task_ids(db, task_ids)
     for task_id in task_ids:
-        if task_crud.get_task(db, task_id) is None:
+        if task_id not in existing_ids:
             raise HTTPException(status_code=404, detail=f"Task {task_id} not found")
     
     tasks = task_crud.reorder_tasks(db=db, task_ids=task_ids)
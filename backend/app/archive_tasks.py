@@ -0,0 +1,39 @@
+"""
+完了から一定期間が過ぎたタスクをアーカイブ (archived_tasks) に移動する
+
+使い方 (backendディレクトリで実行):
+    python -m app.archive_tasks
+    python -m app.archive_tasks --days 90 --batch-size 1000
+cronなどで定期的に実行する想定。未完了のサブタスクが残っているタスクは移動しない
+"""
+import argparse
+import sys
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.crud.task_archive import archive_completed_tasks
+from app.models import archived_task, category, data_version, task, task_tombstone  # noqa: F401
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--days", type=int, default=settings.ARCHIVE_AFTER_DAYS, help="完了 (最終更新) からの日数"
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=settings.ARCHIVE_BATCH_SIZE, help="1トランザクションで移動する件数"
+    )
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        result = archive_completed_tasks(db, args.days, args.batch_size)
+    finally:
+        db.close()
+
+    print(f"{result.archived}件をアーカイブしました ({result.batches}バッチ, {result.seconds:.1f}秒)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,167 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi.encoders import jsonable_encoder
+from starlette.responses import Response
+
+from app.core.config import settings
+from app.core.serialization import dumps
+
+
+class MemoryCacheBackend:
+    """TTL付きのプロセス内LRUキャッシュ"""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    def counter(self, key: str) -> int:
+        with self._lock:
+            return self._counters.get(key, 0)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._counters.clear()
+
+
+class RedisCacheBackend:
+    """Redis互換サーバーを使うキャッシュ (redisパッケージが必要)。複数プロセスで共有できる"""
+
+    def __init__(self, url: str, prefix: str = "todo:cache:"):
+        try:
+            import redis
+        except ImportError as exc:
+            raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package") from exc
+        self._client = redis.Redis.from_url(url)
+        self._prefix = prefix
+
+    def get(self, key: str) -> Optional[Any]:
+        raw = self._client.get(self._prefix + key)
+        return None if raw is None else json.loads(raw)
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        self._client.set(self._prefix + key, json.dumps(value), px=int(ttl * 1000))
+
+    def incr(self, key: str) -> int:
+        return self._client.incr(self._prefix + key)
+
+    def counter(self, key: str) -> int:
+        return int(self._client.get(self._prefix + key) or 0)
+
+    def clear(self) -> None:
+        for key in self._client.scan_iter(self._prefix + "*"):
+            self._client.delete(key)
+
+
+class ResponseCache:
+    """
+    読み取りエンドポイントのレスポンス (JSON本文とヘッダー) をキャッシュする
+    キーは名前空間 ("tasks" / "categories") と、その時点の名前空間の世代とクエリパラメータから作る。
+    書き込み時は世代を進めるだけで、古いエントリはTTL/LRUで自然に消える。
+    """
+
+    def __init__(self, backend: Optional[Any], ttl: float):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None
+
+    def _key(self, namespace: str, params: Dict[str, Any]) -> str:
+        generation = self.backend.counter(f"generation:{namespace}")
+        digest = hashlib.sha1(
+            json.dumps(jsonable_encoder(params), sort_keys=True).encode()
+        ).hexdigest()
+        return f"{namespace}:{generation}:{digest}"
+
+    def load(self, namespace: str, params: Dict[str, Any]) -> Optional[Response]:
+        """キャッシュ済みのレスポンスを返す (ない場合はNone)"""
+        if not self.enabled:
+            return None
+        cached = self.backend.get(self._key(namespace, params))
+        if cached is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        body, headers = cached
+        return Response(
+            content=body.encode(),
+            media_type="application/json",
+            headers={**headers, "X-Cache": "HIT"},
+        )
+
+    def store(
+        self, namespace: str, params: Dict[str, Any], content: Any, headers: Optional[Dict[str, str]] = None
+    ) -> Response:
+        """contentをJSONレスポンスにしてキャッシュし、そのレスポンスを返す"""
+        headers = headers or {}
+        response = Response(content=dumps(content), media_type="application/json", headers=headers)
+        if self.enabled:
+            self.backend.set(self._key(namespace, params), [response.body.decode(), headers], self.ttl)
+            response.headers["X-Cache"] = "MISS"
+        return response
+
+    def invalidate(self, *namespaces: str) -> None:
+        if not self.enabled:
+            return
+        for namespace in namespaces:
+            self.backend.incr(f"generation:{namespace}")
+        self.invalidations += 1
+
+    def clear(self) -> None:
+        if self.enabled:
+            self.backend.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": settings.CACHE_BACKEND if self.enabled else "none",
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+        }
+
+
+def _create_backend() -> Optional[Any]:
+    if settings.CACHE_BACKEND == "memory":
+        return MemoryCacheBackend(settings.CACHE_MAX_ENTRIES)
+    if settings.CACHE_BACKEND == "redis":
+        return RedisCacheBackend(settings.CACHE_REDIS_URL)
+    return None
+
+
+response_cache = ResponseCache(_create_backend(), settings.CACHE_TTL)
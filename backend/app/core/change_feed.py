@@ -0,0 +1,129 @@
+"""
+別のプロセス (app.serveの複数ワーカー) でコミットした変更を、このプロセスの変更通知に流す
+
+書き込みはコミットのたびにdata_versionsのバージョンを1進め、タスクの行と削除記録に変更シーケンス
+(進めた後のtasksのバージョン) を設定する。STREAM_POLL_SECONDSごとにバージョンを確認し、
+前回から進んだ分のうちこのプロセスのコミット (CRUDが通知済み) 以外を読んで通知する。
+- タスクは変更シーケンスの範囲で行と削除記録を読む。作成後に更新していない (updated_atがNULLの) タスクは
+  created、それ以外はupdated、削除・アーカイブはdeletedになる
+- カテゴリは変更を記録していないため、カテゴリの通知を受け取る購読者にresyncを送る
+"""
+import logging
+import threading
+from typing import Callable, Dict, List, Optional, Set
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.events import ChangeEvent, EventHub, event_hub, task_event
+from app.models.data_version import DataVersion
+from app.models.task import Task
+from app.models.task_tombstone import TaskTombstone
+
+logger = logging.getLogger(__name__)
+
+NAMESPACES = ("tasks", "categories")
+
+
+class ChangeFeed:
+    """購読者がいる間だけ、他のプロセスがコミットした変更をDBから読んでhubに通知する"""
+
+    def __init__(self, hub: EventHub):
+        self.hub = hub
+        # 前回確認したバージョン (購読者がいない間はNone)
+        self._versions: Optional[Dict[str, int]] = None
+        # このプロセスのコミットで進めたバージョンのうち、まだ確認していないもの
+        self._local: Dict[str, Set[int]] = {namespace: set() for namespace in NAMESPACES}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def active(self) -> bool:
+        return self._versions is not None
+
+    def record_local(self, versions: Dict[str, int]) -> None:
+        """このプロセスでコミットした書き込みが進めたバージョンを記録する (コミット後に呼ぶ)"""
+        with self._lock:
+            if self._versions is None:
+                return
+            for namespace, version in versions.items():
+                if namespace in self._local:
+                    self._local[namespace].add(version)
+
+    def poll(self, db: Session) -> None:
+        """前回から進んだバージョンのうち、他のプロセスのコミットの変更を通知する"""
+        if not self.hub.subscriber_count:
+            with self._lock:
+                self._versions = None
+                for versions in self._local.values():
+                    versions.clear()
+            return
+
+        versions = {namespace: 0 for namespace in NAMESPACES}
+        versions.update(db.execute(
+            select(DataVersion.name, DataVersion.version).where(DataVersion.name.in_(NAMESPACES))
+        ).all())
+        with self._lock:
+            previous, self._versions = self._versions, versions
+            local = {}
+            for namespace, recorded in self._local.items():
+                local[namespace] = {version for version in recorded if version <= versions[namespace]}
+                recorded.difference_update(local[namespace])
+        if previous is None:
+            # 購読者ができた時点から通知する
+            return
+
+        events: List[ChangeEvent] = []
+        if versions["tasks"] > previous["tasks"]:
+            window = (previous["tasks"], versions["tasks"])
+            rows = db.execute(
+                select(Task.id, Task.category_id, Task.updated_at, Task.change_seq)
+                .where(Task.change_seq > window[0], Task.change_seq <= window[1])
+            )
+            events.extend(
+                task_event("created" if row.updated_at is None else "updated", row.id, row.category_id)
+                for row in rows
+                if row.change_seq not in local["tasks"]
+            )
+            tombstones = db.execute(
+                select(TaskTombstone.task_id, TaskTombstone.change_seq)
+                .where(TaskTombstone.change_seq > window[0], TaskTombstone.change_seq <= window[1])
+            )
+            # 削除したタスクのカテゴリは残っていないため、全ての購読者に届ける
+            events.extend(
+                ChangeEvent("task", "deleted", row.task_id)
+                for row in tombstones
+                if row.change_seq not in local["tasks"]
+            )
+        self.hub.publish(*events)
+
+        remote_categories = set(range(previous["categories"] + 1, versions["categories"] + 1))
+        if remote_categories - local["categories"]:
+            self.hub.resync("category")
+
+    def start(self, interval: float, session_factory: Callable[[], Session]) -> None:
+        """interval秒ごとにpollするスレッドを開始する"""
+        self._stop.clear()
+
+        def run() -> None:
+            while not self._stop.wait(interval):
+                try:
+                    with session_factory() as db:
+                        self.poll(db)
+                except Exception:
+                    logger.exception("failed to read changes from other processes")
+
+        self._thread = threading.Thread(target=run, name="change-feed", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        with self._lock:
+            self._versions = None
+
+
+change_feed = ChangeFeed(event_hub)
@@ -0,0 +1,142 @@
+from typing import Any, Dict, Iterable
+
+from sqlalchemy import event, insert, inspect, select, update
+from sqlalchemy.orm import Session, object_session
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.sql import Insert, Select
+
+from app.core.cache import response_cache
+from app.core.change_feed import change_feed
+from app.models.data_version import DataVersion
+from app.models.task import Task
+from app.models.task_tombstone import TaskTombstone
+
+
+_CHANGED_KEY = "changed_namespaces"
+_TOMBSTONES_KEY = "task_tombstones"
+_VERSIONS_KEY = "committed_versions"
+
+
+def mark_changed(db: Any, *namespaces: str) -> None:
+    """
+    このセッションでnamespaces ("tasks" / "categories") のテーブルを書き換えたことを記録する
+    コミット時に同じトランザクションでdata_versionsのバージョンを進め、
+    コミット後にレスポンスキャッシュを無効化する
+    (コミット前に無効化すると、コミットまでの間の読み取りで古い内容が再びキャッシュされるため)
+    """
+    session = getattr(db, "sync_session", db)  # AsyncSessionの場合は内部の同期セッション
+    session.info.setdefault(_CHANGED_KEY, set()).update(namespaces)
+
+
+def commit_and_keep(db: Session, *instances: Any) -> None:
+    """
+    コミットし、instancesの列の値をコミット後も読み込み済みのまま残す (コミット後のrefreshのSELECTを省く)
+    DB側で生成する値はモデルのeager_defaultsでフラッシュ時に取得済みのため、コミット前の値がそのまま使える。
+    コミット時に採番するchange_seqだけは残さず、アクセス時に読み込み直す
+    """
+    db.flush()
+    snapshots = []
+    for instance in instances:
+        state = inspect(instance)
+        snapshots.append((instance, {
+            attr.key: state.dict[attr.key]
+            for attr in state.mapper.column_attrs
+            if attr.key in state.dict and attr.key != "change_seq"
+        }))
+    db.commit()
+    for instance, values in snapshots:
+        for key, value in values.items():
+            set_committed_value(instance, key, value)
+
+
+def get_versions(db: Session, namespaces: Iterable[str]) -> Dict[str, int]:
+    """namespacesの現在のバージョンを1クエリで取得する (未更新のものは0)"""
+    namespaces = sorted(set(namespaces))
+    rows = db.query(DataVersion.name, DataVersion.version).filter(DataVersion.name.in_(namespaces))
+    versions = {name: 0 for name in namespaces}
+    versions.update({row.name: row.version for row in rows})
+    return versions
+
+
+def _bump_versions(session: Session, namespaces: Iterable[str]) -> None:
+    for namespace in sorted(namespaces):
+        updated = (
+            session.query(DataVersion)
+            .filter(DataVersion.name == namespace)
+            .update({DataVersion.version: DataVersion.version + 1}, synchronize_session=False)
+        )
+        if not updated:
+            session.add(DataVersion(name=namespace, version=1))
+    session.flush()
+
+
+def _stamp_task_changes(session: Session) -> None:
+    """
+    このトランザクションで変更・削除したタスク (change_seqがNULLの行) に
+    進めた後のtasksのバージョンを変更シーケンスとして設定する
+    data_versionsの行ロックを持ったまま採番するため、シーケンスはコミット順に増える
+    """
+    change_seq = (
+        select(DataVersion.version).where(DataVersion.name == "tasks").scalar_subquery()
+    )
+    session.execute(
+        update(Task)
+        .where(Task.change_seq.is_(None))
+        # updated_atのonupdateを働かせず、採番だけを行う
+        .values(change_seq=change_seq, updated_at=Task.updated_at)
+        .execution_options(synchronize_session=False)
+    )
+    if session.info.pop(_TOMBSTONES_KEY, False):
+        session.execute(
+            update(TaskTombstone)
+            .where(TaskTombstone.change_seq.is_(None))
+            .values(change_seq=change_seq)
+            .execution_options(synchronize_session=False)
+        )
+
+
+@event.listens_for(Session, "before_commit")
+def _bump_versions_before_commit(session: Session) -> None:
+    namespaces = session.info.get(_CHANGED_KEY)
+    if namespaces:
+        _bump_versions(session, namespaces)
+        if "tasks" in namespaces:
+            _stamp_task_changes(session)
+        if change_feed.active:
+            # 他のプロセスの変更として二重に通知しないよう、このコミットで進めたバージョンを記録する
+            session.info[_VERSIONS_KEY] = get_versions(session, namespaces)
+
+
+@event.listens_for(Task, "after_delete")
+def _record_task_tombstone(mapper: Any, connection: Any, target: Task) -> None:
+    # ORMのdeleteで削除したタスク (リレーションのカスケードで削除されたサブタスクを含む)。DELETE文で
+    # 削除する場合はrecord_task_tombstonesを使う
+    connection.execute(TaskTombstone.__table__.insert().values(task_id=target.id))
+    object_session(target).info[_TOMBSTONES_KEY] = True
+
+
+def record_task_tombstones(db: Any, task_ids: Select) -> Insert:
+    """
+    task_ids (削除するタスクのIDを返すSELECT) の削除記録を作るINSERT ... SELECTを返す
+    ORMのdeleteを通さずにDELETE文で削除する場合に、after_deleteの代わりに削除の前に実行する
+    """
+    session = getattr(db, "sync_session", db)
+    session.info[_TOMBSTONES_KEY] = True
+    return insert(TaskTombstone).from_select(["task_id"], task_ids)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session) -> None:
+    namespaces = session.info.pop(_CHANGED_KEY, None)
+    if namespaces:
+        response_cache.invalidate(*sorted(namespaces))
+    versions = session.info.pop(_VERSIONS_KEY, None)
+    if versions:
+        change_feed.record_local(versions)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session: Session) -> None:
+    session.info.pop(_CHANGED_KEY, None)
+    session.info.pop(_TOMBSTONES_KEY, None)
+    session.info.pop(_VERSIONS_KEY, None)
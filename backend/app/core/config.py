@@ -1,5 +1,5 @@
 import os
-from typing import Dict, Optional, Any
+from typing import Optional
 
 from pydantic import BaseSettings
 
@@ -8,6 +8,86 @@ class Settings(BaseSettings):
     API_V1_STR: str = "/api/v1"
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./todo.db")
     ENVIRONMENT: str = os.getenv("ENVIRONMENT", "development")
+    # Trueの場合は主要なエンドポイントを非同期セッション (AsyncSession) で処理する
+    ASYNC_DB: bool = False
+    # 非同期エンジンの接続先 (省略時はDATABASE_URLのドライバをaiosqlite/asyncpgに置き換える)
+    ASYNC_DATABASE_URL: Optional[str] = None
+
+    # コネクションプール設定 (インメモリSQLite以外で有効)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    # 接続を再作成するまでの秒数 (-1は無効)
+    DB_POOL_RECYCLE: int = -1
+    DB_POOL_PRE_PING: bool = False
+
+    # SQLiteの接続ごとに設定するPRAGMA (Noneの場合は設定しない)
+    SQLITE_JOURNAL_MODE: Optional[str] = "WAL"
+    SQLITE_SYNCHRONOUS: Optional[str] = "NORMAL"
+    SQLITE_MMAP_SIZE: Optional[int] = 256 * 1024 * 1024
+    # 負の値はKiB単位 (-64000は約64MB)
+    SQLITE_CACHE_SIZE: Optional[int] = -64000
+    # ロック待ちのミリ秒
+    SQLITE_BUSY_TIMEOUT: Optional[int] = 5000
+
+    # 読み取りレスポンスのキャッシュ ("memory" / "redis" / "none")
+    CACHE_BACKEND: str = "memory"
+    # エントリの有効秒数 (memoryは複数プロセス間で無効化を共有しないため、
+    # python -m app.serveで複数ワーカーを起動する場合はnoneに切り替える)
+    CACHE_TTL: float = 30.0
+    CACHE_MAX_ENTRIES: int = 1024
+    CACHE_REDIS_URL: str = "redis://localhost:6379/0"
+
+    # Trueの場合、一覧のレスポンスをORMオブジェクト・pydanticの検証を経由せずに列の値から作り、orjsonでエンコードする
+    # (orjsonパッケージが必要)
+    FAST_JSON: bool = False
+
+    # 変更通知のストリーム (/api/v1/stream)
+    # クライアントごとの未送信の通知の上限 (超えた場合は破棄してresyncを送る)
+    STREAM_MAX_PENDING: int = 1000
+    # 通知を受けてから送信するまでに待つ秒数 (この間の変更を1回の送信にまとめる)
+    STREAM_COALESCE_SECONDS: float = 0.05
+    # 接続を維持するためのコメントを送る間隔
+    STREAM_HEARTBEAT_SECONDS: float = 15.0
+    # 他のプロセスがコミットした変更をDBから読んで配信する間隔 (Noneの場合は配信しない)
+    # python -m app.serveで複数ワーカーを起動する場合は、未設定なら1秒になる
+    STREAM_POLL_SECONDS: Optional[float] = None
+
+    # タスクのインポート (POST /api/v1/tasks/import, python -m app.import_tasks)
+    # 1トランザクションで作成する行数
+    IMPORT_CHUNK_SIZE: int = 1000
+    # 結果に含める行ごとのエラーの上限 (失敗した件数は全て数える)
+    IMPORT_MAX_ERRORS: int = 100
+
+    # 完了したタスクのアーカイブ (POST /api/v1/tasks/archive, python -m app.archive_tasks)
+    # 完了 (最終更新) からこの日数が過ぎたタスクを対象にする
+    ARCHIVE_AFTER_DAYS: int = 30
+    # 1トランザクションで移動する件数
+    ARCHIVE_BATCH_SIZE: int = 500
+
+    # リクエストごとのSQLの件数・時間の計測 (Server-Timingヘッダーと/metrics)
+    METRICS_ENABLED: bool = True
+    # この秒数以上かかったSQLを警告としてログに出力する (Noneの場合は出力しない)
+    SLOW_QUERY_SECONDS: Optional[float] = 0.1
+
+    # 本番用のサーバー (python -m app.serve)
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_PORT: int = 8000
+    # ワーカープロセス数 (Noneの場合は使えるCPU数。cgroupのCPU制限も考慮する)
+    SERVER_WORKERS: Optional[int] = None
+    # Keep-Aliveの接続を維持する秒数。前段のロードバランサー・プロキシのアイドルタイムアウト (多くは60秒) より長くし、
+    # 再利用しようとした接続をサーバー側が先に閉じないようにする
+    SERVER_KEEP_ALIVE: int = 65
+    # listenのバックログ (受け付け待ちの接続数の上限)
+    SERVER_BACKLOG: int = 2048
+    # ワーカーごとの同時接続数の上限 (超えた分は503を返す。Noneの場合は無制限)
+    SERVER_LIMIT_CONCURRENCY: Optional[int] = None
+    # この件数のリクエストを処理したワーカーを再起動する (Noneの場合は再起動しない)
+    SERVER_LIMIT_MAX_REQUESTS: Optional[int] = None
+    # 終了時に処理中のリクエストの完了を待つ秒数 (過ぎたワーカーは強制終了する)
+    SERVER_GRACEFUL_TIMEOUT: float = 30.0
+    # アクセスログ (リクエストごとの出力はスループットを下げるため既定では無効。/metricsで集計は取れる)
+    SERVER_ACCESS_LOG: bool = False
 
     class Config:
         env_file = ".env"
@@ -1,13 +1,84 @@
-from sqlalchemy import create_engine
+from typing import Any, Dict
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.core.config import Settings, settings
+from app.core.metrics import install_query_metrics
+
+
+def _is_memory_sqlite(url: str) -> bool:
+    return make_url(url).database in (None, "", ":memory:")
+
+
+def engine_options(url: str, config: Settings = settings) -> Dict[str, Any]:
+    """URLと設定からcreate_engine / create_async_engineの引数を作る"""
+    if _is_memory_sqlite(url) and url.startswith("sqlite"):
+        # インメモリDBは接続ごとに別のDBになるため、既定のプールのままにする
+        return {"connect_args": {"check_same_thread": False}}
+
+    options: Dict[str, Any] = {
+        "pool_size": config.DB_POOL_SIZE,
+        "max_overflow": config.DB_MAX_OVERFLOW,
+        "pool_timeout": config.DB_POOL_TIMEOUT,
+        "pool_recycle": config.DB_POOL_RECYCLE,
+        "pool_pre_ping": config.DB_POOL_PRE_PING,
+    }
+    if url.startswith("sqlite"):
+        # ファイルのSQLiteもプールで接続を使い回し、PRAGMAやキャッシュを接続ごとに作り直さない
+        options["connect_args"] = {"check_same_thread": False}
+        options["poolclass"] = AsyncAdaptedQueuePool if "+aiosqlite" in url else QueuePool
+    return options
+
+
+def sqlite_pragmas(config: Settings = settings) -> Dict[str, Any]:
+    """接続時に設定するSQLiteのPRAGMA"""
+    pragmas = {
+        "journal_mode": config.SQLITE_JOURNAL_MODE,
+        "synchronous": config.SQLITE_SYNCHRONOUS,
+        "mmap_size": config.SQLITE_MMAP_SIZE,
+        "cache_size": config.SQLITE_CACHE_SIZE,
+        "busy_timeout": config.SQLITE_BUSY_TIMEOUT,
+    }
+    return {name: value for name, value in pragmas.items() if value is not None}
+
+
+def install_sqlite_pragmas(engine: Engine, config: Settings = settings) -> None:
+    """
+    SQLiteの接続ごとにPRAGMAを設定するconnectイベントを登録する
+    WALモードでは読み取りが書き込みの完了を待たなくなる
+    """
+    if engine.dialect.name != "sqlite":
+        return
+    pragmas = sqlite_pragmas(config)
+    if _is_memory_sqlite(str(engine.url)):
+        # インメモリDBにWALやmmapは適用できない
+        pragmas.pop("journal_mode", None)
+        pragmas.pop("mmap_size", None)
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+def create_db_engine(url: str, config: Settings = settings) -> Engine:
+    """設定に従ってプールとPRAGMAを構成したエンジンを作成する"""
+    db_engine = create_engine(url, **engine_options(url, config))
+    install_sqlite_pragmas(db_engine, config)
+    # METRICS_ENABLED=falseの場合はSQLごとの計測と遅いSQLのログを行わない
+    if config.METRICS_ENABLED:
+        install_query_metrics(db_engine)
+    return db_engine
 
-from app.core.config import settings
 
 # SQLAlchemyエンジン作成
-engine = create_engine(
-    settings.DATABASE_URL, connect_args={"check_same_thread": False}
-)
+engine = create_db_engine(settings.DATABASE_URL)
 
 # セッションローカル作成
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -22,4 +93,47 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+# 同期ドライバのURLを対応する非同期ドライバのURLに変換する
+_ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+}
+
+
+def to_async_url(url: str) -> str:
+    scheme, separator, rest = url.partition("://")
+    return _ASYNC_DRIVERS.get(scheme, scheme) + separator + rest
+
+
+def create_async_session_factory(url: str):
+    """非同期エンジンとセッションファクトリを作成する (aiosqlite/asyncpgが必要)"""
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+    async_engine = create_async_engine(url, **engine_options(url))
+    install_sqlite_pragmas(async_engine.sync_engine)
+    if settings.METRICS_ENABLED:
+        install_query_metrics(async_engine.sync_engine)
+    return async_engine, sessionmaker(
+        async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+    )
+
+
+# 非同期エンジンはASYNC_DBが有効な場合のみ作成する
+async_engine = None
+AsyncSessionLocal = None
+if settings.ASYNC_DB:
+    async_engine, AsyncSessionLocal = create_async_session_factory(
+        settings.ASYNC_DATABASE_URL or to_async_url(settings.DATABASE_URL)
+    )
+
+
+# 非同期エンドポイント用のDB依存関係
+async def get_async_db():
+    if AsyncSessionLocal is None:
+        raise RuntimeError("ASYNC_DB is disabled")
+    async with AsyncSessionLocal() as db:
+        yield db
\ No newline at end of file
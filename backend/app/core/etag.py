@@ -0,0 +1,44 @@
+import hashlib
+from typing import Any, Dict, Optional
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+
+def compute_etag(versions: Dict[str, int], request: Request, extra: Optional[Dict[str, Any]] = None) -> str:
+    """
+    テーブルのバージョンとリクエストのパス・クエリから強いETagを作る
+    バージョンが同じ間は同じ条件のレスポンス本文も同じになる。
+    extraにはクエリ以外でレスポンスが変わる値 (省略したパラメータをサーバー側で補った値など) を渡す
+    """
+    source = ";".join(f"{name}={version}" for name, version in sorted(versions.items()))
+    source += "|" + request.url.path + "?" + "&".join(sorted(str(request.query_params).split("&")))
+    if extra:
+        source += "|" + ";".join(f"{name}={value}" for name, value in sorted(extra.items()))
+    return '"' + hashlib.sha1(source.encode()).hexdigest() + '"'
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    """If-None-MatchがETagに一致するか (弱い比較) を判定する"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [candidate.strip() for candidate in header.split(",")]
+    if "*" in candidates:
+        return True
+    return any(
+        (candidate[2:] if candidate.startswith("W/") else candidate) == etag
+        for candidate in candidates
+    )
+
+
+def not_modified_response(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
+
+
+def conditional_response(request: Request, response: Response) -> Response:
+    """レスポンスのETagがIf-None-Matchに一致する場合は本文なしの304に置き換える"""
+    etag = response.headers.get("etag")
+    if etag is not None and is_not_modified(request, etag):
+        return not_modified_response(etag)
+    return response
@@ -0,0 +1,194 @@
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from app.core.config import settings
+
+
+class ChangeEvent:
+    """
+    タスク・カテゴリの変更通知
+    categoriesは購読のカテゴリ絞り込みに使うカテゴリID (Noneの場合は対象が不明なため全ての購読者に配信する)
+    """
+
+    __slots__ = ("type", "action", "id", "category_id", "categories")
+
+    def __init__(
+        self,
+        type: str,
+        action: str,
+        id: int,
+        category_id: Optional[int] = None,
+        categories: Optional[Iterable[Optional[int]]] = None,
+    ):
+        self.type = type
+        self.action = action
+        self.id = id
+        self.category_id = category_id
+        self.categories = None if categories is None else frozenset(categories)
+
+    @property
+    def key(self) -> Tuple[str, int]:
+        return self.type, self.id
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {"type": self.type, "action": self.action, "id": self.id}
+        if self.type == "task":
+            data["category_id"] = self.category_id
+        return data
+
+
+def task_event(
+    action: str, task_id: int, category_id: Optional[int], previous_category_id: Optional[int] = None
+) -> ChangeEvent:
+    """タスクの変更通知を作る (カテゴリを移動した場合は移動元の購読者にも配信する)"""
+    return ChangeEvent("task", action, task_id, category_id, categories={category_id, previous_category_id})
+
+
+def category_event(action: str, category_id: int) -> ChangeEvent:
+    return ChangeEvent("category", action, category_id, categories={category_id})
+
+
+class Subscription:
+    """
+    1クライアント分の購読
+    未送信の通知は (種類, ID) ごとに最新の1件にまとめ (連続した更新は1件になる)、
+    max_pendingを超えた場合は破棄してresyncを1件だけ送る。送信が遅いクライアントでもメモリは一定に収まる。
+    """
+
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        categories: Optional[Set[int]] = None,
+        types: Optional[Set[str]] = None,
+        max_pending: int = 1000,
+    ):
+        self.loop = loop
+        self.categories = categories
+        self.types = types
+        self.max_pending = max_pending
+        self.resync = False
+        self.dropped = 0
+        self._pending: "OrderedDict[Tuple[str, int], ChangeEvent]" = OrderedDict()
+        self._ready = asyncio.Event()
+
+    def matches(self, event: ChangeEvent) -> bool:
+        if self.types is not None and event.type not in self.types:
+            return False
+        if self.categories is None or event.categories is None:
+            return True
+        return not self.categories.isdisjoint(event.categories)
+
+    def push(self, event: ChangeEvent) -> None:
+        """イベントループのスレッドで呼ぶ"""
+        if not self.resync:
+            previous = self._pending.pop(event.key, None)
+            if previous is not None and previous.action == "created":
+                if event.action == "deleted":
+                    # 送信前に作成・削除されたものはクライアントに伝える必要がない
+                    return
+                event = previous
+            self._pending[event.key] = event
+            if len(self._pending) > self.max_pending:
+                self.dropped += len(self._pending)
+                self._pending.clear()
+                self.resync = True
+        self._ready.set()
+
+    def request_resync(self) -> None:
+        """未送信の通知を破棄してresyncを送る (変更の内容が分からない場合。イベントループのスレッドで呼ぶ)"""
+        self._pending.clear()
+        self.resync = True
+        self._ready.set()
+
+    async def next_batch(self, timeout: Optional[float] = None, coalesce: float = 0.0) -> List[Dict[str, Any]]:
+        """
+        通知が来るまで待ち、まとめた通知を返す (timeout秒で来なければ空のリスト)
+        coalesce秒だけ待ってから取り出すことで、連続した書き込みを1回の送信にまとめる
+        """
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return []
+        if coalesce:
+            await asyncio.sleep(coalesce)
+        self._ready.clear()
+        if self.resync:
+            self.resync = False
+            return [{"type": "resync"}]
+        batch = [event.to_dict() for event in self._pending.values()]
+        self._pending.clear()
+        return batch
+
+
+class EventHub:
+    """
+    プロセス内のpub/sub。CRUDの書き込み (任意のスレッド) から購読者のイベントループに通知を渡す
+    別プロセス (複数ワーカー) の書き込みはchange_feedがDBから読んで渡す
+    """
+
+    def __init__(self):
+        self._subscriptions: Set[Subscription] = set()
+        self._lock = threading.Lock()
+        self.published = 0
+
+    def subscribe(
+        self, categories: Optional[Iterable[int]] = None, types: Optional[Iterable[str]] = None
+    ) -> Subscription:
+        """実行中のイベントループで購読を開始する"""
+        subscription = Subscription(
+            asyncio.get_event_loop(),
+            categories=set(categories) if categories else None,
+            types=set(types) if types else None,
+            max_pending=settings.STREAM_MAX_PENDING,
+        )
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscriptions)
+
+    def publish(self, *events: ChangeEvent) -> None:
+        """コミット後の変更を購読者に通知する (スレッドセーフ)"""
+        if not events:
+            return
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        self.published += len(events)
+        for subscription in subscriptions:
+            matched = [event for event in events if subscription.matches(event)]
+            if not matched:
+                continue
+            try:
+                subscription.loop.call_soon_threadsafe(_push_all, subscription, matched)
+            except RuntimeError:
+                # イベントループが終了している
+                self.unsubscribe(subscription)
+
+    def resync(self, type: str) -> None:
+        """typeの通知を受け取る購読者に、一覧の取得し直しを求める (スレッドセーフ)"""
+        with self._lock:
+            subscriptions = [
+                subscription for subscription in self._subscriptions
+                if subscription.types is None or type in subscription.types
+            ]
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.request_resync)
+            except RuntimeError:
+                self.unsubscribe(subscription)
+
+
+def _push_all(subscription: Subscription, events: List[ChangeEvent]) -> None:
+    for event in events:
+        subscription.push(event)
+
+
+event_hub = EventHub()
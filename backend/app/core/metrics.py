@@ -0,0 +1,244 @@
+import logging
+import os
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# リクエストの処理時間のヒストグラムのバケット (秒)
+REQUEST_DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class RequestStats:
+    """1リクエストで発行したSQLの件数・合計時間・最も遅かった文"""
+
+    __slots__ = ("method", "path", "queries", "db_seconds", "slowest_seconds", "slowest_statement")
+
+    def __init__(self, method: str = "", path: str = ""):
+        self.method = method
+        self.path = path
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.slowest_seconds = 0.0
+        self.slowest_statement: Optional[str] = None
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.queries += 1
+        self.db_seconds += seconds
+        if seconds > self.slowest_seconds:
+            self.slowest_seconds = seconds
+            self.slowest_statement = statement
+
+
+# 処理中のリクエストの集計先
+# スレッドプールで動く同期のエンドポイントにもコンテキストがコピーされるため、同じオブジェクトに記録される
+_current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+
+def current_request_stats() -> Optional[RequestStats]:
+    return _current_request.get()
+
+
+def install_query_metrics(engine: Engine) -> None:
+    """
+    SQLの実行時間を処理中のリクエストに記録するイベントを登録する
+    SLOW_QUERY_SECONDSを超えた文は警告としてログに出力する
+    """
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._query_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        seconds = time.perf_counter() - context._query_started
+        stats = _current_request.get()
+        if stats is not None:
+            stats.record(statement, seconds)
+        threshold = settings.SLOW_QUERY_SECONDS
+        if threshold is not None and seconds >= threshold:
+            metrics.record_slow_query()
+            logger.warning(
+                "slow query %.1fms (%s %s): %s",
+                seconds * 1000,
+                stats.method if stats else "-",
+                stats.path if stats else "-",
+                " ".join(statement.split()),
+            )
+
+
+class _RouteMetrics:
+    __slots__ = ("statuses", "duration_sum", "buckets", "queries", "db_seconds", "slowest_seconds")
+
+    def __init__(self):
+        self.statuses: Dict[int, int] = {}
+        self.duration_sum = 0.0
+        self.buckets = [0] * len(REQUEST_DURATION_BUCKETS)
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.slowest_seconds = 0.0
+
+
+class MetricsRegistry:
+    """ルート (パスのテンプレート) ごとのリクエスト・SQLの集計 (プロセス内)"""
+
+    def __init__(self):
+        self._routes: Dict[Tuple[str, str], _RouteMetrics] = {}
+        self._lock = threading.Lock()
+        self.slow_queries = 0
+        self.started_at = time.time()
+
+    def record_request(self, method: str, route: str, status: int, seconds: float, stats: RequestStats) -> None:
+        with self._lock:
+            metrics = self._routes.get((method, route))
+            if metrics is None:
+                metrics = self._routes[(method, route)] = _RouteMetrics()
+            metrics.statuses[status] = metrics.statuses.get(status, 0) + 1
+            metrics.duration_sum += seconds
+            for index, bound in enumerate(REQUEST_DURATION_BUCKETS):
+                if seconds <= bound:
+                    metrics.buckets[index] += 1
+            metrics.queries += stats.queries
+            metrics.db_seconds += stats.db_seconds
+            metrics.slowest_seconds = max(metrics.slowest_seconds, stats.slowest_seconds)
+
+    def record_slow_query(self) -> None:
+        with self._lock:
+            self.slow_queries += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._routes.clear()
+            self.slow_queries = 0
+
+    def render(self) -> str:
+        """Prometheusのテキスト形式で出力する"""
+        with self._lock:
+            routes = sorted(self._routes.items())
+            slow_queries = self.slow_queries
+
+        lines: List[str] = []
+
+        def family(name: str, kind: str, help: str, samples: List[Tuple[str, Any]]) -> None:
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(f"{sample} {value}" for sample, value in samples)
+
+        def labels(method: str, route: str, **extra: Any) -> str:
+            pairs = {"method": method, "route": route, **extra}
+            return ",".join(f'{key}="{_escape(str(value))}"' for key, value in pairs.items())
+
+        # 複数ワーカーではリクエストを受けたワーカーの値になるため、どのプロセスの値か分かるようにする
+        family("todo_process_start_time_seconds", "gauge", "Start time of the worker process these metrics cover.", [
+            (f'todo_process_start_time_seconds{{pid="{os.getpid()}"}}', self.started_at)
+        ])
+        family("todo_http_requests_total", "counter", "HTTP requests by route and status.", [
+            (f"todo_http_requests_total{{{labels(method, route, status=status)}}}", count)
+            for (method, route), metrics in routes
+            for status, count in sorted(metrics.statuses.items())
+        ])
+        duration = []
+        for (method, route), metrics in routes:
+            total = sum(metrics.statuses.values())
+            for bound, count in zip(REQUEST_DURATION_BUCKETS, metrics.buckets):
+                duration.append((f"todo_http_request_duration_seconds_bucket{{{labels(method, route, le=bound)}}}", count))
+            duration.append((f"todo_http_request_duration_seconds_bucket{{{labels(method, route, le='+Inf')}}}", total))
+            duration.append((f"todo_http_request_duration_seconds_sum{{{labels(method, route)}}}", metrics.duration_sum))
+            duration.append((f"todo_http_request_duration_seconds_count{{{labels(method, route)}}}", total))
+        family("todo_http_request_duration_seconds", "histogram", "HTTP request duration.", duration)
+        family("todo_db_queries_total", "counter", "SQL statements executed while handling requests.", [
+            (f"todo_db_queries_total{{{labels(method, route)}}}", metrics.queries) for (method, route), metrics in routes
+        ])
+        family("todo_db_query_duration_seconds_total", "counter", "Time spent executing SQL while handling requests.", [
+            (f"todo_db_query_duration_seconds_total{{{labels(method, route)}}}", metrics.db_seconds)
+            for (method, route), metrics in routes
+        ])
+        family("todo_db_slowest_query_seconds", "gauge", "Slowest single SQL statement observed per route.", [
+            (f"todo_db_slowest_query_seconds{{{labels(method, route)}}}", metrics.slowest_seconds)
+            for (method, route), metrics in routes
+        ])
+        family("todo_db_slow_queries_total", "counter", "SQL statements slower than SLOW_QUERY_SECONDS.", [
+            ("todo_db_slow_queries_total", slow_queries)
+        ])
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+metrics = MetricsRegistry()
+
+
+def server_timing(stats: RequestStats, seconds: float) -> str:
+    """Server-Timingヘッダーの値 (ミリ秒)"""
+    return (
+        f'db;dur={stats.db_seconds * 1000:.2f};desc="{stats.queries} queries", '
+        f"db-slowest;dur={stats.slowest_seconds * 1000:.2f}, "
+        f"total;dur={seconds * 1000:.2f}"
+    )
+
+
+class QueryMetricsMiddleware:
+    """
+    リクエストごとにSQLの件数・時間を集計し、Server-Timingヘッダーとmetricsに記録するASGIミドルウェア
+    ヘッダーはレスポンスの開始時点までの値 (ストリーミングのレスポンスでは送信中のSQLは含まない)
+    """
+
+    def __init__(self, app: Callable):
+        self.app = app
+        self._routes: Dict[Any, str] = {}
+
+    def _route(self, scope: Dict[str, Any]) -> str:
+        """マッチしたルートのパスのテンプレート (ラベルの値が増え続けないように、実際のパスは使わない)"""
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        if endpoint not in self._routes:
+            self._routes = {
+                getattr(route, "endpoint", None): route.path for route in scope["app"].routes
+            }
+        return self._routes.get(endpoint, "unmatched")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(scope["method"], scope["path"])
+        token = _current_request.set(stats)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", server_timing(stats, time.perf_counter() - started).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_request.reset(token)
+            seconds = time.perf_counter() - started
+            metrics.record_request(scope["method"], self._route(scope), status, seconds, stats)
+            if stats.slowest_statement is not None:
+                logger.debug(
+                    "%s %s: %d queries in %.1fms, slowest %.1fms: %s",
+                    scope["method"],
+                    scope["path"],
+                    stats.queries,
+                    stats.db_seconds * 1000,
+                    stats.slowest_seconds * 1000,
+                    " ".join(stats.slowest_statement.split()),
+                )
@@ -0,0 +1,59 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Sequence
+
+from sqlalchemy import and_, or_, tuple_
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """ソートキーの値を不透明なカーソル文字列に変換する"""
+    def default(value: Any) -> Any:
+        if isinstance(value, datetime):
+            return {"dt": value.isoformat()}
+        raise TypeError(f"Unsupported cursor value: {value!r}")
+
+    raw = json.dumps(list(values), default=default, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, length: int) -> List[Any]:
+    """
+    カーソル文字列をソートキーの値に戻す
+    不正なカーソルの場合はValueErrorを送出する
+    """
+    def object_hook(obj: dict) -> Any:
+        if set(obj) == {"dt"}:
+            return datetime.fromisoformat(obj["dt"])
+        raise ValueError("Invalid cursor")
+
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()), object_hook=object_hook)
+    except (ValueError, TypeError) as exc:
+        raise ValueError("Invalid cursor") from exc
+
+    if not isinstance(values, list) or len(values) != length:
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def keyset_after(columns: Sequence[Any], values: Sequence[Any]):
+    """
+    ORDER BY columns (昇順) においてvaluesの行より後ろにある行を表す条件を作る
+    NULLは先頭に並ぶ (SQLiteの昇順と同じ) ものとして扱うため、ORDER BYではNULLS FIRSTを指定する。
+    NULLを含まない場合は行値比較 (a, b, ...) > (?, ?, ...) になり、インデックスで直接シークできる。
+    """
+    if all(value is not None for value in values):
+        if len(columns) == 1:
+            return columns[0] > values[0]
+        return tuple_(*columns) > tuple_(*values)
+
+    column, value = columns[0], values[0]
+    rest_columns, rest_values = columns[1:], values[1:]
+    if not rest_columns:
+        return column.isnot(None)
+    if value is None:
+        # NULLの後ろには非NULLの値が全て並ぶ
+        return or_(column.isnot(None), and_(column.is_(None), keyset_after(rest_columns, rest_values)))
+    return or_(column > value, and_(column == value, keyset_after(rest_columns, rest_values)))
@@ -0,0 +1,57 @@
+import csv
+import io
+import json
+from typing import Any, Dict, Iterable, List, Sequence
+
+from fastapi.encoders import jsonable_encoder
+
+from app.core.config import settings
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def fast_json_enabled() -> bool:
+    """orjsonによる高速なレスポンスを使うか (FAST_JSON)"""
+    if settings.FAST_JSON and orjson is None:
+        raise RuntimeError("FAST_JSON=true requires the 'orjson' package")
+    return settings.FAST_JSON
+
+
+def dumps(content: Any) -> bytes:
+    """
+    レスポンス本文のJSONを作る
+    FAST_JSON有効時はorjsonで直接エンコードし、orjsonが扱えない値 (pydanticモデルなど) だけjsonable_encoderに任せる。
+    無効時はFastAPIのJSONResponseと同じ出力になる
+    """
+    if fast_json_enabled():
+        return orjson.dumps(content, default=jsonable_encoder)
+    return json.dumps(
+        jsonable_encoder(content),
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+def dumps_ndjson(rows: Iterable[Any]) -> bytes:
+    """1行に1件のJSONを並べたNDJSONを作る"""
+    return b"".join(dumps(row) + b"\n" for row in rows)
+
+
+def dumps_csv(rows: Iterable[Dict[str, Any]], fieldnames: Sequence[str], header: bool = False) -> bytes:
+    """
+    辞書の行をCSVにする (header=Trueの場合は先頭に列名の行を付ける)
+    日時はJSONと同じISO 8601形式、Noneは空欄にする
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    if header:
+        writer.writerow(fieldnames)
+    for row in rows:
+        values: List[Any] = jsonable_encoder([row[name] for name in fieldnames])
+        writer.writerow(["" if value is None else value for value in values])
+    return buffer.getvalue().encode("utf-8")
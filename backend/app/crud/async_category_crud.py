@@ -0,0 +1,80 @@
+from typing import List, Optional
+from sqlalchemy import delete, exists, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.changes import mark_changed
+from app.core.events import category_event, event_hub
+from app.models.category import Category
+from app.models.task import Task
+from app.schemas.category import CategoryCreate, CategoryUpdate
+
+
+async def get_category(db: AsyncSession, category_id: int) -> Optional[Category]:
+    """指定されたIDのカテゴリを取得する"""
+    result = await db.execute(select(Category).where(Category.id == category_id))
+    return result.scalars().first()
+
+
+async def get_category_by_name(db: AsyncSession, name: str) -> Optional[Category]:
+    """指定された名前のカテゴリを取得する"""
+    result = await db.execute(select(Category).where(Category.name == name))
+    return result.scalars().first()
+
+
+async def get_categories(
+    db: AsyncSession, skip: int = 0, limit: int = 100, after_id: Optional[int] = None
+) -> List[Category]:
+    """カテゴリ一覧を取得する (条件はcategory_crud.get_categoriesと同じ)"""
+    statement = select(Category).order_by(Category.id)
+    if after_id is not None:
+        statement = statement.where(Category.id > after_id)
+    else:
+        statement = statement.offset(skip)
+    result = await db.execute(statement.limit(limit))
+    return result.scalars().all()
+
+
+async def create_category(db: AsyncSession, category: CategoryCreate) -> Category:
+    """カテゴリを作成する"""
+    db_category = Category(name=category.name)
+    db.add(db_category)
+    mark_changed(db, "categories")
+    await db.commit()
+    event_hub.publish(category_event("created", db_category.id))
+    return db_category
+
+
+async def update_category(
+    db: AsyncSession,
+    category_id: int,
+    category_update: CategoryUpdate,
+    db_category: Optional[Category] = None,
+) -> Optional[Category]:
+    """カテゴリを更新する (db_categoryは読み込み済みのカテゴリ。省略時はcategory_idで取得する)"""
+    if db_category is None:
+        db_category = await get_category(db, category_id)
+    if db_category is None:
+        return None
+    
+    update_data = category_update.dict(exclude_unset=True)
+    for key, value in update_data.items():
+        setattr(db_category, key, value)
+    
+    mark_changed(db, "categories")
+    await db.commit()
+    event_hub.publish(category_event("updated", db_category.id))
+    return db_category
+
+
+async def delete_category(db: AsyncSession, category_id: int, only_if_empty: bool = False) -> bool:
+    """カテゴリを削除する (only_if_emptyはcategory_crud.delete_categoryと同じ)"""
+    statement = delete(Category).where(Category.id == category_id)
+    if only_if_empty:
+        statement = statement.where(~exists().where(Task.category_id == category_id))
+    result = await db.execute(statement.execution_options(synchronize_session=False))
+    if result.rowcount:
+        mark_changed(db, "categories")
+    await db.commit()
+    if result.rowcount:
+        event_hub.publish(category_event("deleted", category_id))
+    return result.rowcount > 0
@@ -0,0 +1,156 @@
+from typing import Any, Dict, List, Optional, Sequence
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.changes import mark_changed, record_task_tombstones
+from app.core.events import event_hub, task_event
+from app.crud.task_crud import (
+    child_path_of,
+    expunge_deleted,
+    move_subtree_statement,
+    reference_error,
+    rows_to_dicts,
+    select_missing_references,
+    select_tasks,
+    subtree_filter,
+    task_row_columns,
+)
+from app.models.task import Task
+from app.schemas.task import TaskCreate, TaskUpdate
+
+
+async def get_task(db: AsyncSession, task_id: int) -> Optional[Task]:
+    """指定されたIDのタスクを取得する"""
+    result = await db.execute(select(Task).where(Task.id == task_id))
+    return result.scalars().first()
+
+
+async def get_tasks(
+    db: AsyncSession,
+    skip: int = 0,
+    limit: int = 100,
+    status: Optional[bool] = None,
+    priority: Optional[str] = None,
+    category_id: Optional[int] = None,
+    parent_task_id: Optional[int] = None,
+    after: Optional[Sequence[Any]] = None
+) -> List[Task]:
+    """タスク一覧を取得する (条件はtask_crud.get_tasksと同じ)"""
+    statement = select_tasks(
+        db.bind.dialect.name,
+        skip=skip,
+        limit=limit,
+        status=status,
+        priority=priority,
+        category_id=category_id,
+        parent_task_id=parent_task_id,
+        after=after,
+    )
+    result = await db.execute(statement)
+    return result.scalars().all()
+
+
+async def get_task_rows(
+    db: AsyncSession,
+    skip: int = 0,
+    limit: int = 100,
+    status: Optional[bool] = None,
+    priority: Optional[str] = None,
+    category_id: Optional[int] = None,
+    parent_task_id: Optional[int] = None,
+    after: Optional[Sequence[Any]] = None,
+    fields: Optional[Sequence[str]] = None
+) -> List[Dict[str, Any]]:
+    """レスポンスの列だけを辞書で取得する (task_crud.get_task_rowsと同じ)"""
+    statement = select_tasks(
+        db.bind.dialect.name,
+        skip=skip,
+        limit=limit,
+        status=status,
+        priority=priority,
+        category_id=category_id,
+        parent_task_id=parent_task_id,
+        after=after,
+    ).with_only_columns(*task_row_columns(fields))
+    return rows_to_dicts(await db.execute(statement))
+
+
+async def check_references(
+    db: AsyncSession,
+    category_id: Optional[int] = None,
+    parent_task_id: Optional[int] = None,
+    task: Optional[Task] = None,
+) -> Optional[str]:
+    """参照先のカテゴリ・親タスクを1クエリで存在確認する (task_crud.check_referencesと同じ)"""
+    statement = select_missing_references(category_id, parent_task_id)
+    if statement is None:
+        return None
+    return reference_error((await db.execute(statement)).one(), parent_task_id, task)
+
+
+async def create_task(db: AsyncSession, task: TaskCreate) -> Task:
+    """タスクを作成する"""
+    db_task = Task(**task.dict(), path=child_path_of(task.parent_task_id))
+    db.add(db_task)
+    mark_changed(db, "tasks")
+    # expire_on_commit=Falseのセッションのため、フラッシュ時に取得した値 (eager_defaults) のまま返す
+    await db.commit()
+    event_hub.publish(task_event("created", db_task.id, db_task.category_id))
+    return db_task
+
+
+async def update_task(
+    db: AsyncSession, task_id: int, task_update: TaskUpdate, db_task: Optional[Task] = None
+) -> Optional[Task]:
+    """タスクを更新する (db_taskは読み込み済みのタスク。省略時はtask_idで取得する)"""
+    if db_task is None:
+        db_task = await get_task(db, task_id)
+    if db_task is None:
+        return None
+    
+    previous_category_id = db_task.category_id
+    update_data = task_update.dict(exclude_unset=True)
+    if "parent_task_id" in update_data and update_data["parent_task_id"] != db_task.parent_task_id:
+        await db.execute(move_subtree_statement(db_task.id, db_task.path, update_data["parent_task_id"]))
+        db.expire(db_task, ["path"])
+    for key, value in update_data.items():
+        setattr(db_task, key, value)
+    
+    mark_changed(db, "tasks")
+    await db.commit()
+    event_hub.publish(task_event("updated", db_task.id, db_task.category_id, previous_category_id))
+    return db_task
+
+
+async def update_task_status(
+    db: AsyncSession, task_id: int, status: bool, db_task: Optional[Task] = None
+) -> Optional[Task]:
+    """タスクのステータスを更新する (db_taskはupdate_taskと同じ)"""
+    if db_task is None:
+        db_task = await get_task(db, task_id)
+    if db_task is None:
+        return None
+    
+    db_task.status = status
+    mark_changed(db, "tasks")
+    await db.commit()
+    event_hub.publish(task_event("updated", db_task.id, db_task.category_id))
+    return db_task
+
+
+async def delete_task(db: AsyncSession, task_id: int, db_task: Optional[Task] = None) -> bool:
+    """タスクをサブタスク (全階層) ごと削除する (task_crud.delete_taskと同じ3文。db_taskはupdate_taskと同じ)"""
+    if db_task is None:
+        db_task = await get_task(db, task_id)
+    if db_task is None:
+        return False
+    
+    condition = subtree_filter([db_task])
+    await db.execute(record_task_tombstones(db, select(Task.id).where(condition)))
+    rows = (await db.execute(select(Task.id, Task.category_id).where(condition))).all()
+    await db.execute(delete(Task).where(condition).execution_options(synchronize_session=False))
+    expunge_deleted(db, (row.id for row in rows))
+    mark_changed(db, "tasks")
+    await db.commit()
+    event_hub.publish(*(task_event("deleted", row.id, row.category_id) for row in rows))
+    return True
@@ -1,7 +1,11 @@
-from typing import List, Optional
+from typing import Dict, Iterable, List, Optional, Set
+from sqlalchemy import exists
 from sqlalchemy.orm import Session
 
+from app.core.changes import commit_and_keep, mark_changed
+from app.core.events import category_event, event_hub
 from app.models.category import Category
+from app.models.task import Task
 from app.schemas.category import CategoryCreate, CategoryUpdate
 
 
@@ -10,28 +14,60 @@ def get_category(db: Session, category_id: int) -> Optional[Category]:
     return db.query(Category).filter(Category.id == category_id).first()
 
 
+def get_existing_category_ids(db: Session, category_ids: Iterable[int]) -> Set[int]:
+    """指定されたIDのうち存在するカテゴリのIDを返す"""
+    category_ids = set(category_ids)
+    if not category_ids:
+        return set()
+    query = db.query(Category.id).filter(Category.id.in_(category_ids))
+    return {row.id for row in query}
+
+
+def get_category_id_map(db: Session) -> Dict[str, int]:
+    """全カテゴリの名前からIDへの対応表を返す"""
+    return {row.name: row.id for row in db.query(Category.id, Category.name)}
+
+
 def get_category_by_name(db: Session, name: str) -> Optional[Category]:
     """指定された名前のカテゴリを取得する"""
     return db.query(Category).filter(Category.name == name).first()
 
 
-def get_categories(db: Session, skip: int = 0, limit: int = 100) -> List[Category]:
-    """カテゴリ一覧を取得する"""
-    return db.query(Category).offset(skip).limit(limit).all()
+def get_categories(
+    db: Session, skip: int = 0, limit: int = 100, after_id: Optional[int] = None
+) -> List[Category]:
+    """
+    カテゴリ一覧を取得する
+    after_idを指定した場合はskipを使わずそのIDの直後からシークする
+    """
+    query = db.query(Category).order_by(Category.id)
+    if after_id is not None:
+        return query.filter(Category.id > after_id).limit(limit).all()
+    return query.offset(skip).limit(limit).all()
 
 
 def create_category(db: Session, category: CategoryCreate) -> Category:
     """カテゴリを作成する"""
     db_category = Category(name=category.name)
     db.add(db_category)
-    db.commit()
-    db.refresh(db_category)
+    mark_changed(db, "categories")
+    commit_and_keep(db, db_category)
+    event_hub.publish(category_event("created", db_category.id))
     return db_category
 
 
-def update_category(db: Session, category_id: int, category_update: CategoryUpdate) -> Optional[Category]:
-    """カテゴリを更新する"""
-    db_category = get_category(db, category_id)
+def update_category(
+    db: Session,
+    category_id: int,
+    category_update: CategoryUpdate,
+    db_category: Optional[Category] = None,
+) -> Optional[Category]:
+    """
+    カテゴリを更新する
+    db_category: 呼び出し側で読み込み済みのカテゴリ (省略時はcategory_idで取得する)
+    """
+    if db_category is None:
+        db_category = get_category(db, category_id)
     if db_category is None:
         return None
     
@@ -40,17 +76,25 @@ def update_category(db: Session, category_id: int, category_update: CategoryUpda
     for key, value in update_data.items():
         setattr(db_category, key, value)
     
-    db.commit()
-    db.refresh(db_category)
+    mark_changed(db, "categories")
+    commit_and_keep(db, db_category)
+    event_hub.publish(category_event("updated", db_category.id))
     return db_category
 
 
-def delete_category(db: Session, category_id: int) -> bool:
-    """カテゴリを削除する"""
-    db_category = get_category(db, category_id)
-    if db_category is None:
-        return False
-    
-    db.delete(db_category)
+def delete_category(db: Session, category_id: int, only_if_empty: bool = False) -> bool:
+    """
+    カテゴリを削除する
+    関連タスクのコレクションを読み込まないよう、DELETE文を直接発行する
+    only_if_empty: Trueの場合は関連タスクがないことをDELETEの条件に含め (NOT EXISTS)、確認と削除を1文で行う
+    """
+    query = db.query(Category).filter(Category.id == category_id)
+    if only_if_empty:
+        query = query.filter(~exists().where(Task.category_id == category_id))
+    deleted = query.delete(synchronize_session=False)
+    if deleted:
+        mark_changed(db, "categories")
     db.commit()
-    return True
\ No newline at end of file
+    if deleted:
+        event_hub.publish(category_event("deleted", category_id))
+    return deleted > 0
\ No newline at end of file
@@ -0,0 +1,152 @@
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from sqlalchemy import exists, insert, literal, select, union_all
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import ColumnElement, CompoundSelect
+
+from app.core.changes import mark_changed
+from app.core.config import settings
+from app.core.events import ChangeEvent, event_hub, task_event
+from app.crud import task_crud
+from app.models.archived_task import ArchivedTask
+from app.models.category import Category
+from app.models.task import Task
+from app.schemas.task import TaskArchiveResult
+
+# tasksからarchived_tasksにそのまま移す列 (change_seqはtasks側の差分同期にだけ使う)
+ARCHIVED_COLUMNS = tuple(column.name for column in ArchivedTask.__table__.c if column.name != "archived_at")
+
+# 移動先のIDが既に使われていて戻せない場合のエラー
+RESTORE_CONFLICT_ERROR = "Task ID is already in use"
+
+
+def _archive_where(db: Session, condition: ColumnElement) -> List[ChangeEvent]:
+    """conditionに一致するタスクをarchived_tasksにコピーしてからtasksから削除し、通知を返す (コミットは呼び出し側で行う)"""
+    db.execute(
+        insert(ArchivedTask).from_select(
+            ARCHIVED_COLUMNS, select(*(Task.__table__.c[name] for name in ARCHIVED_COLUMNS)).where(condition)
+        )
+    )
+    return task_crud.delete_where(db, condition, "archived")
+
+
+def archive_task(db: Session, db_task: Task) -> int:
+    """
+    タスクをサブタスク (全階層) ごとアーカイブする (削除の代わりに使う。restore_taskで戻せる)
+    アーカイブした件数を返す
+    """
+    events = _archive_where(db, task_crud.subtree_filter([db_task]))
+    mark_changed(db, "tasks")
+    db.commit()
+    event_hub.publish(*events)
+    return len(events)
+
+
+def select_archive_candidates(cutoff: datetime, limit: int) -> CompoundSelect:
+    """
+    cutoffより前に完了 (最終更新) したタスクのうち、サブタスクが残っていないものを最大limit件選ぶSELECT
+    子から順にアーカイブするため、親は子が全てアーカイブされた後のバッチで対象になる。
+    (status, updated_at)のインデックスを範囲検索で使えるよう、作成後に更新していない (updated_atがNULLの)
+    タスクを作成日時で判定する条件はUNION ALLで分ける
+    """
+    child = Task.__table__.alias("child")
+    is_leaf = ~exists().where(child.c.parent_task_id == Task.id)
+    return union_all(
+        select(Task.id).where(Task.status.is_(True), Task.updated_at < cutoff, is_leaf),
+        select(Task.id).where(
+            Task.status.is_(True), Task.updated_at.is_(None), Task.created_at < cutoff, is_leaf
+        ),
+    ).limit(limit)
+
+
+def archive_completed_tasks(
+    db: Session, older_than_days: Optional[int] = None, batch_size: Optional[int] = None
+) -> TaskArchiveResult:
+    """
+    完了からolder_than_days日 (省略時はARCHIVE_AFTER_DAYS) が過ぎたタスクをarchived_tasksに移動する
+    batch_size件 (省略時はARCHIVE_BATCH_SIZE) ごとに1トランザクションでコミットし、対象がなくなるまで繰り返す。
+    未完了のサブタスクが残っているタスクは移動しない
+    """
+    older_than_days = settings.ARCHIVE_AFTER_DAYS if older_than_days is None else older_than_days
+    batch_size = batch_size or settings.ARCHIVE_BATCH_SIZE
+    # created_at / updated_atはDB側の現在時刻 (SQLiteではUTC) で記録される
+    cutoff = datetime.now(timezone.utc) - timedelta(days=older_than_days)
+    candidates = select_archive_candidates(cutoff, batch_size)
+
+    started = time.perf_counter()
+    archived = batches = 0
+    while True:
+        task_ids = db.execute(candidates).scalars().all()
+        if not task_ids:
+            break
+        events = _archive_where(db, Task.id.in_(task_ids))
+        mark_changed(db, "tasks")
+        db.commit()
+        event_hub.publish(*events)
+        archived += len(events)
+        batches += 1
+
+    return TaskArchiveResult(archived=archived, batches=batches, seconds=time.perf_counter() - started)
+
+
+def get_archived_task(db: Session, task_id: int) -> Optional[ArchivedTask]:
+    return db.query(ArchivedTask).filter(ArchivedTask.id == task_id).first()
+
+
+def get_archived_tasks(db: Session, skip: int = 0, limit: int = 100) -> List[ArchivedTask]:
+    """アーカイブしたタスクを新しくアーカイブした順に取得する"""
+    return (
+        db.query(ArchivedTask)
+        .order_by(ArchivedTask.archived_at.desc(), ArchivedTask.id.desc())
+        .offset(skip)
+        .limit(limit)
+        .all()
+    )
+
+
+def restore_task(db: Session, archived: ArchivedTask) -> Optional[Task]:
+    """
+    アーカイブしたタスクを1件tasksに戻す (アーカイブしたサブタスクは戻さない)
+    カテゴリや親タスクが既に存在しない場合は未設定 (親はルート) にする。
+    アーカイブ後に同じIDのタスクが作成されている場合はNone
+    """
+    checks = [exists().where(Task.id == archived.id).label("taken")]
+    if archived.category_id is not None:
+        checks.append(exists().where(Category.id == archived.category_id).label("category"))
+    if archived.parent_task_id is not None:
+        checks.append(
+            select(Task.path).where(Task.id == archived.parent_task_id).scalar_subquery().label("parent_path")
+        )
+    references = db.execute(select(*checks)).first()._mapping
+    if references["taken"]:
+        return None
+
+    # 列の値はINSERT ... SELECTでDB上の値をそのままコピーする。ORMで読み込んだdatetimeを書き戻すと
+    # created_atなどの保存形式 (小数秒の有無) が変わり、キーセットページングの比較がずれるため
+    overrides = {}
+    if not references.get("category", True):
+        overrides["category_id"] = None
+    parent_path = references.get("parent_path")
+    if parent_path is None:
+        overrides["parent_task_id"] = None
+        overrides["path"] = "/"
+    else:
+        overrides["path"] = task_crud.child_path(parent_path, archived.parent_task_id)
+    task_id = archived.id
+    archived_table = ArchivedTask.__table__
+    columns = [
+        literal(overrides[name], archived_table.c[name].type).label(name) if name in overrides
+        else archived_table.c[name]
+        for name in ARCHIVED_COLUMNS
+    ]
+    db.execute(
+        insert(Task).from_select(ARCHIVED_COLUMNS, select(*columns).where(archived_table.c.id == task_id))
+    )
+    db.delete(archived)
+    mark_changed(db, "tasks")
+    db.commit()
+    db_task = task_crud.get_task(db, task_id)
+    event_hub.publish(task_event("restored", db_task.id, db_task.category_id))
+    return db_task
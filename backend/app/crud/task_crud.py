@@ -1,9 +1,105 @@
-from typing import List, Optional, Dict, Any
+from typing import Iterable, Iterator, List, Optional, Dict, Any, Sequence, Set, Tuple
+from sqlalchemy import (
+    String, and_, bindparam, case, cast, delete, exists, func, literal, literal_column, or_, select, type_coerce, update
+)
 from sqlalchemy.orm import Session
-from datetime import datetime
+from sqlalchemy.orm.util import identity_key
+from sqlalchemy.sql import ColumnElement, Select, Update, column, table
+from sqlalchemy.orm.attributes import set_committed_value
+from datetime import date, datetime, time, timedelta
 
-from app.models.task import Task
-from app.schemas.task import TaskCreate, TaskUpdate
+from app.core.changes import commit_and_keep, get_versions, mark_changed, record_task_tombstones
+from app.core.events import ChangeEvent, event_hub, task_event
+from app.core.pagination import decode_cursor, encode_cursor, keyset_after
+from app.models.category import Category
+from app.models.task import TASK_SEARCH_TABLE, Task
+from app.models.task_tombstone import TaskTombstone
+from app.schemas.task import Task as TaskSchema, TaskBulkUpdate, TaskCreate, TaskUpdate
+
+
+# IN句に渡すIDの最大数 (SQLiteのバインド変数の上限を超えないように分割する)
+IN_CHUNK_SIZE = 500
+
+# エクスポートで1回に読み込む行数
+EXPORT_BATCH_SIZE = 1000
+
+# 一括作成で1つのINSERT文にまとめる行数 (列数 × 行数がSQLiteのバインド変数の上限999を超えないようにする)
+BULK_INSERT_ROWS = 100
+
+# 親タスクを自身の子孫の下に移動しようとした場合のエラー
+TASK_CYCLE_ERROR = "Task cannot be moved under its own subtask"
+
+# 全文検索のBM25の列ごとの重み (title, description)
+SEARCH_WEIGHTS = (10.0, 1.0)
+SNIPPET_TOKENS = 12
+# 全文検索で順位付けする一致の最大数
+SEARCH_CANDIDATES = 500
+
+# 一覧の並び順 (idは同順位の行を一意に並べるための最終キー)
+TASK_SORT_COLUMNS = (Task.order_index, Task.due_date, Task.created_at, Task.id)
+# ORDER BYに使う並び順。keyset_afterはNULLを先頭として扱うため、NULLを末尾に並べるDB (PostgreSQLなど)
+# でも同じ順序になるようNULLS FIRSTを明示する (SQLiteの昇順では既定の順序のためインデックスをそのまま使える)
+TASK_SORT_ORDER = tuple(column.asc().nulls_first() for column in TASK_SORT_COLUMNS)
+
+# レスポンス (schemas.task.Task) のフィールドに対応する列
+TASK_RESPONSE_COLUMNS = tuple(Task.__table__.c[name] for name in TaskSchema.__fields__)
+
+
+def task_sort_key(task: Task) -> List[Any]:
+    """カーソルに埋め込むタスクのソートキーを返す"""
+    return [task.order_index, task.due_date, task.created_at, task.id]
+
+
+def encode_task_cursor(task: Task) -> str:
+    """タスクの直後から取得するためのカーソルを返す"""
+    return encode_cursor(task_sort_key(task))
+
+
+def encode_task_row_cursor(row: Dict[str, Any]) -> str:
+    """get_task_rowsの行の直後から取得するためのカーソルを返す"""
+    return encode_cursor([row[column.key] for column in TASK_SORT_COLUMNS])
+
+
+def parse_task_fields(fields: str) -> List[str]:
+    """
+    fieldsパラメータ (カンマ区切り) をレスポンスのフィールド名のリストにする
+    順序はスキーマの定義順に揃える。未知のフィールド名がある場合はValueError
+    """
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    if not requested:
+        raise ValueError("No fields specified")
+    unknown = requested.difference(TaskSchema.__fields__)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    return [name for name in TaskSchema.__fields__ if name in requested]
+
+
+def decode_task_cursor(cursor: str) -> List[Any]:
+    """
+    カーソルをget_tasksのafterに渡す値に戻す
+    不正な場合や値の型がソートキーの列と合わない場合 (boolのIDなど) はValueError
+    """
+    order_index, due_date, created_at, task_id = values = decode_cursor(cursor, len(TASK_SORT_COLUMNS))
+    if not (
+        (order_index is None or type(order_index) is int)
+        and (due_date is None or isinstance(due_date, datetime))
+        and isinstance(created_at, datetime)
+        and type(task_id) is int
+    ):
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def _seek_values(dialect_name: str, values: Sequence[Any]) -> List[Any]:
+    """
+    カーソルの値を比較用のバインド値に変換する
+    SQLiteではcreated_atがCURRENT_TIMESTAMP ("YYYY-MM-DD HH:MM:SS") の文字列で保存されるため、
+    マイクロ秒付きの通常のバインド形式では同じ秒の行を正しく比較できない。
+    """
+    order_index, due_date, created_at, task_id = values
+    if created_at is not None and dialect_name == "sqlite":
+        created_at = type_coerce(created_at.strftime("%Y-%m-%d %H:%M:%S"), String)
+    return [order_index, due_date, created_at, task_id]
 
 
 def get_task(db: Session, task_id: int) -> Optional[Task]:
@@ -11,9 +107,283 @@ def get_task(db: Session, task_id: int) -> Optional[Task]:
     return db.query(Task).filter(Task.id == task_id).first()
 
 
+def _chunks(ids: Iterable[int]) -> Iterator[List[int]]:
+    """IDをIN_CHUNK_SIZE件ずつに分割する"""
+    ids = list(ids)
+    for start in range(0, len(ids), IN_CHUNK_SIZE):
+        yield ids[start:start + IN_CHUNK_SIZE]
+
+
+def get_existing_task_ids(db: Session, task_ids: Iterable[int]) -> Set[int]:
+    """指定されたIDのうち存在するタスクのIDを返す"""
+    existing = set()
+    for chunk in _chunks(set(task_ids)):
+        existing.update(row.id for row in db.query(Task.id).filter(Task.id.in_(chunk)))
+    return existing
+
+
+def child_path(path: str, task_id: int) -> str:
+    """経路がpathのタスクtask_idの子の経路 (= task_idの子孫の経路の共通の接頭辞)"""
+    return f"{path}{task_id}/"
+
+
+def ancestor_ids(path: str) -> List[int]:
+    """経路に含まれる祖先のID (ルートから順)"""
+    return [int(task_id) for task_id in path.strip("/").split("/") if task_id]
+
+
+def child_path_of(parent_task_id: Optional[int]) -> ColumnElement:
+    """parent_task_idの子の経路を求めるSQL式 (親がない場合は'/')"""
+    if parent_task_id is None:
+        return literal("/")
+    parent = Task.__table__.alias("parent")
+    return (
+        select(parent.c.path + cast(parent.c.id, String) + "/")
+        .where(parent.c.id == parent_task_id)
+        .scalar_subquery()
+    )
+
+
+def _slashes(path: ColumnElement) -> ColumnElement:
+    """経路の/の数 (ルートのタスクは1、その子は2...)"""
+    return func.length(path) - func.length(func.replace(path, "/", ""))
+
+
+def _descendant_bounds(task_id: int, path: Optional[str] = None) -> Tuple[Any, Any]:
+    """
+    task_idの子孫の経路の範囲 [lower, upper)
+    '/'の次の文字は'0'のため、接頭辞の末尾の'/'を'0'にした文字列が上限になる。
+    pathを省略した場合はtask_idの経路を主キーで引くサブクエリを使う
+    """
+    if path is not None:
+        prefix = child_path(path, task_id)
+        return prefix, prefix[:-1] + "0"
+    root = Task.__table__.alias("root")
+    prefix = root.c.path + cast(root.c.id, String)
+    return (
+        select(prefix + "/").where(root.c.id == task_id).scalar_subquery(),
+        select(prefix + "0").where(root.c.id == task_id).scalar_subquery(),
+    )
+
+
+def descendant_filter(task_id: int, path: Optional[str] = None) -> ColumnElement:
+    """task_idの子孫 (自身は含まない) を経路のインデックスの範囲検索で絞り込む条件"""
+    lower, upper = _descendant_bounds(task_id, path)
+    return and_(Task.path >= lower, Task.path < upper)
+
+
+def move_subtree_statement(task_id: int, path: str, parent_task_id: Optional[int]) -> Update:
+    """
+    経路がpathのタスクtask_idとその子孫の経路を、parent_task_idの下に付け替えるUPDATE (1文)
+    経路はレスポンスに含まれないため、更新日時と変更シーケンスは変えない
+    """
+    new_path = child_path_of(parent_task_id)
+    old_prefix = child_path(path, task_id)
+    return (
+        update(Task)
+        .where(or_(Task.id == task_id, descendant_filter(task_id, path)))
+        .values(
+            path=case(
+                (Task.id == task_id, new_path),
+                else_=new_path + f"{task_id}/" + func.substr(Task.path, len(old_prefix) + 1),
+            ),
+            updated_at=Task.updated_at,
+            change_seq=Task.change_seq,
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+def creates_cycle(task_id: int, path: str, parent_task_id: int, parent_path: str) -> bool:
+    """タスク (経路path) の親をparent_task_id (経路parent_path) にすると循環するか"""
+    return child_path(parent_path, parent_task_id).startswith(child_path(path, task_id))
+
+
+def select_missing_references(category_id: Optional[int], parent_task_id: Optional[int]) -> Optional[Select]:
+    """
+    参照先のカテゴリの存在と親タスクの経路を1文で取得するSELECT (どちらも未指定の場合はNone)
+    親タスクが存在しない場合、経路はNULLになる
+    """
+    checks = []
+    if category_id is not None:
+        checks.append(exists().where(Category.id == category_id).label("category"))
+    if parent_task_id is not None:
+        checks.append(
+            select(Task.path).where(Task.id == parent_task_id).scalar_subquery().label("parent_path")
+        )
+    return select(*checks) if checks else None
+
+
+def reference_error(row: Any, parent_task_id: Optional[int] = None, task: Optional[Task] = None) -> Optional[str]:
+    """
+    select_missing_referencesの結果から、存在しない参照先のエラー内容を返す
+    taskを指定した場合は、親タスクがtaskの子孫になる (循環する) ときにTASK_CYCLE_ERRORを返す
+    """
+    if not row._mapping.get("category", True):
+        return "Category not found"
+    if "parent_path" in row._mapping:
+        parent_path = row._mapping["parent_path"]
+        if parent_path is None:
+            return "Parent task not found"
+        if task is not None and creates_cycle(task.id, task.path, parent_task_id, parent_path):
+            return TASK_CYCLE_ERROR
+    return None
+
+
+def check_references(
+    db: Session,
+    category_id: Optional[int] = None,
+    parent_task_id: Optional[int] = None,
+    task: Optional[Task] = None,
+) -> Optional[str]:
+    """
+    参照先のカテゴリ・親タスクを1クエリで存在確認する
+    存在しない場合はエラー内容 (カテゴリを優先) を返す。
+    task (親を変更するタスク) を指定した場合は、親タスクの経路で循環も確認する
+    """
+    statement = select_missing_references(category_id, parent_task_id)
+    if statement is None:
+        return None
+    return reference_error(db.execute(statement).one(), parent_task_id, task)
+
+
+def get_task_paths(db: Session, task_ids: Iterable[int]) -> Dict[int, str]:
+    """指定されたIDのうち存在するタスクのIDと経路を返す"""
+    paths = {}
+    for chunk in _chunks(set(task_ids)):
+        paths.update(db.query(Task.id, Task.path).filter(Task.id.in_(chunk)))
+    return paths
+
+
+class TaskMovePlan:
+    """
+    一括更新で親の変更を入力順に適用したときの経路を追跡し、循環する変更を検出する
+    pathsには変更するタスクと新しい親タスクの現在の経路を渡す
+    """
+
+    def __init__(self, paths: Dict[int, str]):
+        self.paths = dict(paths)
+
+    def creates_cycle(self, task_id: int, parent_task_id: Optional[int]) -> bool:
+        if parent_task_id is None:
+            return False
+        return creates_cycle(task_id, self.paths[task_id], parent_task_id, self.paths[parent_task_id])
+
+    def move(self, task_id: int, parent_task_id: Optional[int]) -> None:
+        old_prefix = child_path(self.paths[task_id], task_id)
+        new_path = "/" if parent_task_id is None else child_path(self.paths[parent_task_id], parent_task_id)
+        new_prefix = child_path(new_path, task_id)
+        for other_id, path in self.paths.items():
+            if path.startswith(old_prefix):
+                self.paths[other_id] = new_prefix + path[len(old_prefix):]
+        self.paths[task_id] = new_path
+
+
+def get_ancestors(db: Session, task: Task) -> List[Task]:
+    """タスクの祖先を経路のIDから主キーの1クエリで取得する (ルートから順)"""
+    ids = ancestor_ids(task.path)
+    tasks_by_id = {ancestor.id: ancestor for ancestor in get_tasks_by_ids(db, ids)}
+    return [tasks_by_id[task_id] for task_id in ids if task_id in tasks_by_id]
+
+
+def count_descendants(db: Session, task_id: int) -> int:
+    """タスクの子孫 (全階層) の件数を経路の範囲検索の1クエリで数える"""
+    return db.execute(select(func.count()).where(descendant_filter(task_id))).scalar()
+
+
+def get_tasks_by_ids(db: Session, task_ids: Iterable[int]) -> List[Task]:
+    """指定されたIDのタスクをまとめて取得する (順序は不定)"""
+    tasks = []
+    for chunk in _chunks(set(task_ids)):
+        tasks.extend(db.query(Task).filter(Task.id.in_(chunk)).all())
+    return tasks
+
+
 def get_task_with_subtasks(db: Session, task_id: int) -> Optional[Task]:
     """サブタスクを含むタスクを取得する"""
-    return db.query(Task).filter(Task.id == task_id).first()
+    return get_task_tree(db, task_id, max_depth=1)
+
+
+def get_task_tree(db: Session, task_id: int, max_depth: Optional[int] = None) -> Optional[Task]:
+    """
+    タスクとその子孫を経路の範囲検索の1クエリで取得し、subtasksを組み立てて返す
+    max_depthを指定した場合はその深さまでのサブタスクを含める (0はタスク自身のみ)。
+    subtasksは取得済みの値として設定するため、シリアライズ時に遅延ロードは発生しない。
+    """
+    condition = Task.id == task_id
+    if max_depth is None or max_depth > 0:
+        descendants = descendant_filter(task_id)
+        if max_depth is not None:
+            # 子の経路の/の数は子孫の範囲の下限 (task_idの子の経路) と同じで、深さが1増えるごとに1増える
+            lower, _ = _descendant_bounds(task_id)
+            descendants = and_(descendants, _slashes(Task.path) < _slashes(lower) + max_depth)
+        condition = or_(condition, descendants)
+    tasks = db.query(Task).filter(condition).order_by(*TASK_SORT_ORDER).all()
+    
+    children: Dict[int, List[Task]] = {task.id: [] for task in tasks}
+    for task in tasks:
+        # ルートは親が循環していても子として繋がないようにする
+        if task.id != task_id and task.parent_task_id in children:
+            children[task.parent_task_id].append(task)
+    
+    root = None
+    for task in tasks:
+        set_committed_value(task, "subtasks", children[task.id])
+        if task.id == task_id:
+            root = task
+    return root
+
+
+def apply_task_filters(
+    statement: Select,
+    status: Optional[bool] = None,
+    priority: Optional[str] = None,
+    category_id: Optional[int] = None,
+    parent_task_id: Optional[int] = None
+) -> Select:
+    """タスク一覧のフィルタリング条件を適用する"""
+    if status is not None:
+        statement = statement.where(Task.status == status)
+    
+    if priority is not None:
+        statement = statement.where(Task.priority == priority)
+    
+    if category_id is not None:
+        statement = statement.where(Task.category_id == category_id)
+    
+    if parent_task_id is not None:
+        statement = statement.where(Task.parent_task_id == parent_task_id)
+    
+    return statement
+
+
+def select_tasks(
+    dialect_name: str,
+    skip: int = 0,
+    limit: int = 100,
+    status: Optional[bool] = None,
+    priority: Optional[str] = None,
+    category_id: Optional[int] = None,
+    parent_task_id: Optional[int] = None,
+    after: Optional[Sequence[Any]] = None
+) -> Select:
+    """get_tasksのSELECT文を組み立てる (同期・非同期のCRUDで共有する)"""
+    statement = apply_task_filters(
+        select(Task),
+        status=status,
+        priority=priority,
+        category_id=category_id,
+        parent_task_id=parent_task_id,
+    )
+    
+    # 並び順はorder_indexを優先し、次にdue_date、最後にcreated_atで並べる
+    statement = statement.order_by(*TASK_SORT_ORDER)
+    
+    if after is not None:
+        statement = statement.where(keyset_after(TASK_SORT_COLUMNS, _seek_values(dialect_name, after)))
+        return statement.limit(limit)
+    
+    return statement.offset(skip).limit(limit)
 
 
 def get_tasks(
@@ -23,7 +393,8 @@ def get_tasks(
     status: Optional[bool] = None,
     priority: Optional[str] = None,
     category_id: Optional[int] = None,
-    parent_task_id: Optional[int] = None
+    parent_task_id: Optional[int] = None,
+    after: Optional[Sequence[Any]] = None
 ) -> List[Task]:
     """
     タスク一覧を取得する
@@ -32,29 +403,262 @@ def get_tasks(
     - priority: 優先度
     - category_id: カテゴリID
     - parent_task_id: 親タスクID (Noneの場合はルートタスクのみ)
+    ページングオプション:
+    - after: task_sort_keyの値。指定した場合はskipを使わずその行の直後からシークする
     """
-    query = db.query(Task)
-    
-    # フィルタリング条件を適用
-    if status is not None:
-        query = query.filter(Task.status == status)
+    statement = select_tasks(
+        db.bind.dialect.name,
+        skip=skip,
+        limit=limit,
+        status=status,
+        priority=priority,
+        category_id=category_id,
+        parent_task_id=parent_task_id,
+        after=after,
+    )
+    return db.execute(statement).scalars().all()
+
+
+def rows_to_dicts(result: Any) -> List[Dict[str, Any]]:
+    keys = list(result.keys())
+    return [dict(zip(keys, row)) for row in result]
+
+
+def task_row_columns(fields: Optional[Sequence[str]] = None) -> Tuple[Any, ...]:
+    """get_task_rowsでSELECTする列 (fieldsを指定した場合はその列とカーソル用の並び順の列)"""
+    if fields is None:
+        return TASK_RESPONSE_COLUMNS
+    selected = set(fields).union(column.key for column in TASK_SORT_COLUMNS)
+    return tuple(column for column in TASK_RESPONSE_COLUMNS if column.key in selected)
+
+
+def get_task_rows(
+    db: Session, 
+    skip: int = 0, 
+    limit: int = 100,
+    status: Optional[bool] = None,
+    priority: Optional[str] = None,
+    category_id: Optional[int] = None,
+    parent_task_id: Optional[int] = None,
+    after: Optional[Sequence[Any]] = None,
+    fields: Optional[Sequence[str]] = None
+) -> List[Dict[str, Any]]:
+    """
+    get_tasksと同じ条件で、レスポンスの列だけを辞書で取得する
+    ORMオブジェクトの生成 (identity mapへの登録や変更追跡) とpydanticでの再検証を省くための高速経路
+    fieldsを指定した場合はその列とカーソル用の並び順の列だけをSELECTする (descriptionなどの大きな列を読まない)
+    """
+    statement = select_tasks(
+        db.bind.dialect.name,
+        skip=skip,
+        limit=limit,
+        status=status,
+        priority=priority,
+        category_id=category_id,
+        parent_task_id=parent_task_id,
+        after=after,
+    ).with_only_columns(*task_row_columns(fields))
+    return rows_to_dicts(db.execute(statement))
+
+
+def iter_task_rows(
+    db: Session,
+    status: Optional[bool] = None,
+    priority: Optional[str] = None,
+    category_id: Optional[int] = None,
+    parent_task_id: Optional[int] = None,
+    batch_size: Optional[int] = None
+) -> Iterator[List[Dict[str, Any]]]:
+    """
+    条件に一致する全タスクをレスポンスの列の辞書でbatch_size行ずつ返す (エクスポート用)
+    サーバーサイドカーソルで読み進めるため、件数に関わらずメモリ使用量は1バッチ分に収まる。
+    並び順はソートの一時領域を使わないid順
+    """
+    statement = apply_task_filters(
+        select(*TASK_RESPONSE_COLUMNS),
+        status=status,
+        priority=priority,
+        category_id=category_id,
+        parent_task_id=parent_task_id,
+    ).order_by(Task.id)
+    result = db.execute(statement.execution_options(stream_results=True))
+    keys = list(result.keys())
+    try:
+        for partition in result.partitions(batch_size or EXPORT_BATCH_SIZE):
+            yield [dict(zip(keys, row)) for row in partition]
+    finally:
+        result.close()
+
+
+def get_task_stats(db: Session, today: date) -> Dict[str, Any]:
+    """
+    ダッシュボード用の集計を1回のGROUP BYで取得する
+    転送する行数はタスク数ではなく (カテゴリ数 x 優先度 x ステータス) に比例する。
+    due_today / overdueは未完了のタスクのうち、期日がtodayのもの / today以前のものを数える
+    """
+    start = datetime.combine(today, time.min)
+    end = start + timedelta(days=1)
+    open_task = Task.status.isnot(True)
+    due_today = func.sum(case((and_(open_task, Task.due_date >= start, Task.due_date < end), 1), else_=0))
+    overdue = func.sum(case((and_(open_task, Task.due_date < start), 1), else_=0))
+    rows = db.execute(
+        select(
+            Task.category_id,
+            Task.priority,
+            Task.status,
+            func.count().label("count"),
+            due_today.label("due_today"),
+            overdue.label("overdue"),
+        ).group_by(Task.category_id, Task.priority, Task.status)
+    )
     
-    if priority is not None:
-        query = query.filter(Task.priority == priority)
+    stats = {
+        "total": 0,
+        "completed": 0,
+        "by_priority": {"low": 0, "medium": 0, "high": 0},
+        "due_today": 0,
+        "overdue": 0,
+    }
+    by_category: Dict[Optional[int], Dict[str, Any]] = {}
+    for row in rows:
+        completed = row.count if row.status else 0
+        stats["total"] += row.count
+        stats["completed"] += completed
+        stats["by_priority"][row.priority] = stats["by_priority"].get(row.priority, 0) + row.count
+        stats["due_today"] += row.due_today
+        stats["overdue"] += row.overdue
+        category = by_category.setdefault(
+            row.category_id, {"category_id": row.category_id, "total": 0, "completed": 0}
+        )
+        category["total"] += row.count
+        category["completed"] += completed
     
-    if category_id is not None:
-        query = query.filter(Task.category_id == category_id)
+    stats["incomplete"] = stats["total"] - stats["completed"]
+    # カテゴリなしを先頭に、カテゴリIDの順に並べる
+    stats["by_category"] = sorted(
+        by_category.values(), key=lambda item: (item["category_id"] is not None, item["category_id"] or 0)
+    )
+    return stats
+
+
+def get_change_watermark(db: Session) -> int:
+    """コミット済みの最新の変更シーケンスを取得する"""
+    return get_versions(db, ["tasks"])["tasks"]
+
+
+def get_changed_tasks(
+    db: Session,
+    watermark: int,
+    since_seq: Optional[int] = None,
+    since_id: Optional[int] = None,
+    limit: int = 1000
+) -> List[Task]:
+    """
+    変更シーケンスがwatermark以下で、(since_seq, since_id) より後に変更されたタスクを
+    (change_seq, id) 順に取得する
+    since_idがNoneの場合はsince_seqの変更を全て取得済みとして扱い、
+    since_seqもNoneの場合は全てのタスクを返す
+    """
+    query = db.query(Task).filter(Task.change_seq <= watermark)
+    if since_seq is not None:
+        if since_id is None:
+            query = query.filter(Task.change_seq > since_seq)
+        else:
+            query = query.filter(keyset_after((Task.change_seq, Task.id), (since_seq, since_id)))
+    return query.order_by(Task.change_seq, Task.id).limit(limit).all()
+
+
+def get_deleted_task_ids(db: Session, since_seq: int, until_seq: int) -> List[int]:
+    """
+    変更シーケンスがsince_seqより後、until_seq以下で削除されたタスクのIDを取得する
+    同じIDで作り直されたタスクは変更されたタスクとして返るため除く
+    """
+    rows = (
+        db.query(TaskTombstone.task_id)
+        .filter(TaskTombstone.change_seq > since_seq, TaskTombstone.change_seq <= until_seq)
+        .filter(~exists().where(Task.id == TaskTombstone.task_id))
+        .distinct()
+        .order_by(TaskTombstone.task_id)
+    )
+    return [row.task_id for row in rows]
+
+
+def build_search_query(q: str) -> Optional[str]:
+    """
+    検索語をFTS5のクエリに変換する
+    空白で区切った語をそれぞれ引用符で囲んでAND検索し (FTS5の構文として解釈させないため)、
+    入力途中の最後の語だけを前方一致にする。語がない場合はNoneを返す
+    """
+    terms = ['"' + term.replace('"', '""') + '"' for term in q.split()]
+    if not terms:
+        return None
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def supports_search(db: Session) -> bool:
+    """全文検索 (search_tasks) に対応したDBか (SQLiteのFTS5のみ対応)"""
+    return db.bind.dialect.name == "sqlite"
+
+
+def search_tasks(
+    db: Session,
+    q: str,
+    skip: int = 0,
+    limit: int = 100,
+    status: Optional[bool] = None,
+    priority: Optional[str] = None,
+    category_id: Optional[int] = None
+) -> Tuple[List[Tuple[Task, float, str]], bool]:
+    """
+    タイトルと説明を全文検索し、(タスク, BM25スコア, ハイライト付きの抜粋) を関連度順に取得する
+    スコアは小さいほど関連度が高い。一致が多い場合は新しい方からSEARCH_CANDIDATES件だけを順位付けし、
+    その場合は2つ目の戻り値がTrueになる (skip + limitはSEARCH_CANDIDATES以下で呼ぶ)。
+    supports_searchがTrueのDBでのみ呼べる
+    """
+    match = build_search_query(q)
+    if match is None:
+        return [], False
     
-    if parent_task_id is not None:
-        query = query.filter(Task.parent_task_id == parent_task_id)
-    elif parent_task_id is None:
-        # 親タスクIDが指定されていない場合はルートタスクのみを取得
-        pass
+    fts = literal_column(TASK_SEARCH_TABLE)
+    fts_table = table(TASK_SEARCH_TABLE, column("rowid"))
     
-    # 並び順はorder_indexを優先し、次にdue_date、最後にcreated_atで並べる
-    query = query.order_by(Task.order_index, Task.due_date, Task.created_at)
+    def matching(statement: Select) -> Select:
+        statement = statement.join_from(fts_table, Task, Task.id == fts_table.c.rowid).where(fts.op("MATCH")(match))
+        if status is not None:
+            statement = statement.where(Task.status == status)
+        if priority is not None:
+            statement = statement.where(Task.priority == priority)
+        if category_id is not None:
+            statement = statement.where(Task.category_id == category_id)
+        return statement
     
-    return query.offset(skip).limit(limit).all()
+    # BM25の計算は一致した行数に比例するため、よく出る語でも新しい方のSEARCH_CANDIDATES件に絞る
+    # (FTS5はrowidの範囲指定で索引を途中から読める)。対象外になった最初の一致のrowidを結果にも含め、
+    # 絞り込んだかどうかを返す
+    excluded = (
+        matching(select(fts_table.c.rowid))
+        .order_by(fts_table.c.rowid.desc())
+        .offset(SEARCH_CANDIDATES)
+        .limit(1)
+        .scalar_subquery()
+    )
+    rank = func.bm25(fts, *SEARCH_WEIGHTS).label("rank")
+    snippet = func.snippet(fts, -1, "<mark>", "</mark>", "…", SNIPPET_TOKENS).label("snippet")
+    statement = (
+        matching(select(Task, rank, snippet, excluded.label("excluded")))
+        .where(fts_table.c.rowid > func.coalesce(excluded, 0))
+        .order_by(rank, Task.id)
+        .offset(skip)
+        .limit(limit)
+    )
+    rows = db.execute(statement).all()
+    if rows:
+        truncated = rows[0].excluded is not None
+    else:
+        # ページが空の場合 (skipが順位付けした件数以上) も、対象外の一致があれば絞り込んだことを返す
+        truncated = skip > 0 and db.execute(select(excluded)).scalar() is not None
+    return [(row.Task, row.rank, row.snippet) for row in rows], truncated
 
 
 def create_task(db: Session, task: TaskCreate) -> Task:
@@ -68,60 +672,207 @@ def create_task(db: Session, task: TaskCreate) -> Task:
         order_index=task.order_index,
         category_id=task.category_id,
         parent_task_id=task.parent_task_id,
+        # 親の経路はINSERT文の中で参照する
+        path=child_path_of(task.parent_task_id),
     )
     db.add(db_task)
-    db.commit()
-    db.refresh(db_task)
+    mark_changed(db, "tasks")
+    commit_and_keep(db, db_task)
+    event_hub.publish(task_event("created", db_task.id, db_task.category_id))
     return db_task
 
 
-def update_task(db: Session, task_id: int, task_update: TaskUpdate) -> Optional[Task]:
-    """タスクを更新する"""
-    db_task = get_task(db, task_id)
+def _insert_task_rows(db: Session, rows: List[Dict[str, Any]]) -> List[int]:
+    """
+    rowsを複数行のVALUESを持つ1つのINSERT文で挿入し、採番されたIDを同じ順序で返す
+    RETURNINGで複数行を返せるDBではRETURNINGで取得する。SQLiteでは1つのINSERT文の行は
+    書き込みロックを持ったまま連番で採番される (AUTOINCREMENT) ため、最後のIDから逆算する
+    """
+    statement = Task.__table__.insert().values(rows)
+    if db.get_bind().dialect.full_returning:
+        return list(db.execute(statement.returning(Task.id)).scalars())
+    last_id = db.execute(statement).lastrowid
+    return list(range(last_id - len(rows) + 1, last_id + 1))
+
+
+def bulk_create_tasks(
+    db: Session, tasks: List[TaskCreate], parent_paths: Optional[Dict[int, str]] = None
+) -> List[int]:
+    """
+    タスクを1トランザクションで一括作成する
+    作成したタスクのIDを入力と同じ順序で返す
+    parent_paths: 親タスクのIDと経路 (get_task_paths。省略時は親タスクの経路をまとめて取得する)
+    """
+    if parent_paths is None:
+        parent_paths = get_task_paths(db, {task.parent_task_id for task in tasks if task.parent_task_id is not None})
+    mappings = [task.dict() for task in tasks]
+    for mapping in mappings:
+        parent_task_id = mapping["parent_task_id"]
+        mapping["path"] = "/" if parent_task_id is None else child_path(parent_paths[parent_task_id], parent_task_id)
+    for start in range(0, len(mappings), BULK_INSERT_ROWS):
+        chunk = mappings[start:start + BULK_INSERT_ROWS]
+        for mapping, task_id in zip(chunk, _insert_task_rows(db, chunk)):
+            mapping["id"] = task_id
+    mark_changed(db, "tasks")
+    db.commit()
+    event_hub.publish(*(task_event("created", mapping["id"], mapping["category_id"]) for mapping in mappings))
+    return [mapping["id"] for mapping in mappings]
+
+
+def update_task(
+    db: Session, task_id: int, task_update: TaskUpdate, db_task: Optional[Task] = None
+) -> Optional[Task]:
+    """
+    タスクを更新する
+    db_task: 呼び出し側で読み込み済みのタスク (省略時はtask_idで取得する)
+    """
+    if db_task is None:
+        db_task = get_task(db, task_id)
     if db_task is None:
         return None
     
+    previous_category_id = db_task.category_id
     # モデル辞書に変換し、Noneでないフィールドのみを更新
     update_data = task_update.dict(exclude_unset=True)
+    if "parent_task_id" in update_data and update_data["parent_task_id"] != db_task.parent_task_id:
+        # 自身と子孫の経路を新しい親の下に付け替える (循環しないことは呼び出し側で確認する)
+        db.execute(move_subtree_statement(db_task.id, db_task.path, update_data["parent_task_id"]))
+        db.expire(db_task, ["path"])
     for key, value in update_data.items():
         setattr(db_task, key, value)
     
-    db.commit()
-    db.refresh(db_task)
+    mark_changed(db, "tasks")
+    commit_and_keep(db, db_task)
+    event_hub.publish(task_event("updated", db_task.id, db_task.category_id, previous_category_id))
     return db_task
 
 
-def update_task_status(db: Session, task_id: int, status: bool) -> Optional[Task]:
-    """タスクのステータスを更新する"""
-    db_task = get_task(db, task_id)
+def bulk_update_tasks(db: Session, task_updates: List[TaskBulkUpdate]) -> None:
+    """
+    タスクを1トランザクションで一括更新する (指定されたフィールドのみ)
+    親の変更で循環しないことは呼び出し側で確認する (TaskMovePlan)
+    """
+    mappings = [task_update.dict(exclude_unset=True) for task_update in task_updates]
+    for mapping, task_update in zip(mappings, task_updates):
+        mapping["id"] = task_update.id
+    db.bulk_update_mappings(Task, mappings)
+    # 親の変更は入力順に1件ずつ経路を付け替える (前の変更で経路が変わっている場合があるため、その都度読み直す)
+    for mapping in mappings:
+        if "parent_task_id" in mapping:
+            path = db.query(Task.path).filter(Task.id == mapping["id"]).scalar()
+            db.execute(move_subtree_statement(mapping["id"], path, mapping["parent_task_id"]))
+    mark_changed(db, "tasks")
+    db.commit()
+    # 更新前のカテゴリは読み込んでいないため、カテゴリで絞り込んだ購読者にも通知する
+    event_hub.publish(*(ChangeEvent("task", "updated", mapping["id"]) for mapping in mappings))
+
+
+def update_task_status(
+    db: Session, task_id: int, status: bool, db_task: Optional[Task] = None
+) -> Optional[Task]:
+    """
+    タスクのステータスを更新する
+    db_task: 呼び出し側で読み込み済みのタスク (省略時はtask_idで取得する)
+    """
+    if db_task is None:
+        db_task = get_task(db, task_id)
     if db_task is None:
         return None
     
     db_task.status = status
-    db.commit()
-    db.refresh(db_task)
+    mark_changed(db, "tasks")
+    commit_and_keep(db, db_task)
+    event_hub.publish(task_event("updated", db_task.id, db_task.category_id))
     return db_task
 
 
-def delete_task(db: Session, task_id: int) -> bool:
-    """タスクを削除する"""
-    db_task = get_task(db, task_id)
+def subtree_filter(tasks: Sequence[Task]) -> ColumnElement:
+    """tasksとその子孫 (全階層) を絞り込む条件 (主キーと経路の範囲検索のOR)"""
+    return or_(Task.id.in_([task.id for task in tasks]), *(descendant_filter(task.id, task.path) for task in tasks))
+
+
+def expunge_deleted(db: Any, task_ids: Iterable[int]) -> None:
+    """DELETE文で削除したタスクのうちセッションに読み込み済みのものをセッションから外す"""
+    session = getattr(db, "sync_session", db)  # AsyncSessionの場合は内部の同期セッション
+    for task_id in task_ids:
+        instance = session.identity_map.get(identity_key(Task, task_id))
+        if instance is not None:
+            session.expunge(instance)
+
+
+def delete_where(db: Session, condition: ColumnElement, action: str = "deleted") -> List[ChangeEvent]:
+    """
+    conditionに一致するタスクをDELETE文で削除し、削除したタスクの通知 (action) を返す (コミットは呼び出し側で行う)
+    削除記録のINSERT ... SELECT、通知に使うIDとカテゴリの取得、DELETEの3文で、件数によらない
+    """
+    db.execute(record_task_tombstones(db, select(Task.id).where(condition)))
+    rows = db.execute(select(Task.id, Task.category_id).where(condition)).all()
+    db.execute(delete(Task).where(condition).execution_options(synchronize_session=False))
+    expunge_deleted(db, (row.id for row in rows))
+    return [task_event(action, row.id, row.category_id) for row in rows]
+
+
+def _delete_subtrees(db: Session, db_tasks: Sequence[Task]) -> List[ChangeEvent]:
+    """タスクとその子孫を、子孫をセッションに読み込まずにIN_CHUNK_SIZE件のタスクごとに削除する"""
+    events = []
+    for start in range(0, len(db_tasks), IN_CHUNK_SIZE):
+        events.extend(delete_where(db, subtree_filter(db_tasks[start:start + IN_CHUNK_SIZE])))
+    return events
+
+
+def delete_task(db: Session, task_id: int, db_task: Optional[Task] = None) -> bool:
+    """
+    タスクをサブタスク (全階層) ごと削除する
+    db_task: 呼び出し側で読み込み済みのタスク (省略時はtask_idで取得する)
+    """
+    if db_task is None:
+        db_task = get_task(db, task_id)
     if db_task is None:
         return False
     
-    db.delete(db_task)
+    events = _delete_subtrees(db, [db_task])
+    mark_changed(db, "tasks")
     db.commit()
+    event_hub.publish(*events)
     return True
 
 
+def bulk_delete_tasks(db: Session, task_ids: Iterable[int], db_tasks: Optional[List[Task]] = None) -> None:
+    """
+    タスクを1トランザクションで一括削除する (サブタスクも削除される)
+    db_tasks: 呼び出し側で読み込み済みのタスク (省略時はtask_idsで取得する)
+    """
+    if db_tasks is None:
+        db_tasks = get_tasks_by_ids(db, task_ids)
+    events = _delete_subtrees(db, db_tasks)
+    mark_changed(db, "tasks")
+    db.commit()
+    event_hub.publish(*events)
+
+
 def reorder_tasks(db: Session, task_ids: List[int]) -> List[Task]:
-    """タスクの並び順を更新する"""
-    tasks = []
-    for index, task_id in enumerate(task_ids):
-        db_task = get_task(db, task_id)
-        if db_task:
-            db_task.order_index = index
-            tasks.append(db_task)
+    """
+    タスクの並び順を更新する
+    order_indexはリスト内の位置 (IDが重複する場合は後ろの位置) になる。
+    更新は1回のexecutemanyで行い、結果は1回のIN検索でまとめて取得する。
+    """
+    positions = {task_id: index for index, task_id in enumerate(task_ids)}
+    if not positions:
+        return []
     
+    statement = (
+        update(Task)
+        .where(Task.id == bindparam("target_id"))
+        .values(order_index=bindparam("position"))
+        .execution_options(synchronize_session=False)
+    )
+    db.execute(
+        statement,
+        [{"target_id": task_id, "position": index} for task_id, index in positions.items()]
+    )
+    mark_changed(db, "tasks")
     db.commit()
-    return tasks
\ No newline at end of file
+    
+    tasks_by_id = {task.id: task for task in get_tasks_by_ids(db, positions)}
+    event_hub.publish(*(task_event("updated", task.id, task.category_id) for task in tasks_by_id.values()))
+    return [tasks_by_id[task_id] for task_id in task_ids if task_id in tasks_by_id]
\ No newline at end of file
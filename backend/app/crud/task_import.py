@@ -0,0 +1,166 @@
+import codecs
+import csv
+import json
+import time
+from itertools import islice
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.crud import category_crud, task_crud
+from app.schemas.task import TaskCreate, TaskImportError, TaskImportResult
+
+IMPORT_FORMATS = ("ndjson", "csv")
+
+# 文字コードの確認で1回に読むバイト数
+ENCODING_CHECK_BLOCK_SIZE = 64 * 1024
+
+# (行番号, レコード, エラー内容) の組
+ParsedRecord = Tuple[int, Optional[Dict[str, Any]], Optional[str]]
+
+
+def find_undecodable_line(raw: BinaryIO, encoding: str = "utf-8") -> Optional[int]:
+    """
+    rawを末尾まで読み、encodingとして復号できない最初の行の行番号を返す (全て復号できる場合はNone)
+    import_tasksはチャンクごとにコミットするため、途中で復号に失敗して一部だけ作成されないよう事前に確認する
+    """
+    decoder = codecs.getincrementaldecoder(encoding)()
+    line = 1
+    for block in iter(lambda: raw.read(ENCODING_CHECK_BLOCK_SIZE), b""):
+        # 前のブロックの末尾で途切れた文字のバイト (改行を含まない) は復号時に先頭に足される
+        pending = len(decoder.getstate()[0])
+        try:
+            decoder.decode(block)
+        except UnicodeDecodeError as exc:
+            return line + block.count(b"\n", 0, max(exc.start - pending, 0))
+        line += block.count(b"\n")
+    try:
+        decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        return line
+    return None
+
+
+def parse_records(lines: Iterable[str], format: str) -> Iterator[ParsedRecord]:
+    """
+    NDJSON / CSVの行を1件ずつ辞書にする (全体を読み込まずに少しずつ処理する)
+    CSVは先頭行を列名とし、空欄の列は指定されていないものとして扱う
+    """
+    if format == "ndjson":
+        for number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as exc:
+                yield number, None, f"Invalid JSON: {exc}"
+                continue
+            if not isinstance(record, dict):
+                yield number, None, "Expected a JSON object"
+                continue
+            yield number, record, None
+    elif format == "csv":
+        reader = csv.DictReader(lines)
+        for record in reader:
+            yield reader.line_num, {
+                key: value for key, value in record.items() if key is not None and value not in ("", None)
+            }, None
+    else:
+        raise ValueError(f"Unsupported format: {format}")
+
+
+def _batches(records: Iterator[ParsedRecord], size: int) -> Iterator[List[ParsedRecord]]:
+    while True:
+        batch = list(islice(records, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _validation_detail(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(loc) for loc in error['loc'])}: {error['msg']}" for error in exc.errors()
+    )
+
+
+def _to_task(record: Dict[str, Any], categories: Dict[str, int]) -> Tuple[Optional[TaskCreate], Optional[str]]:
+    """レコードを検証してTaskCreateにする (categoryのカテゴリ名はcategory_idに変換する)。不正な場合はエラー内容を返す"""
+    if "category" in record:
+        name = record.pop("category")
+        if not isinstance(name, str) or name not in categories:
+            return None, f"Category '{name}' not found"
+        record["category_id"] = categories[name]
+    try:
+        return TaskCreate(**record), None
+    except ValidationError as exc:
+        return None, _validation_detail(exc)
+
+
+def _reference_error(task: TaskCreate, category_ids: Set[int], parent_paths: Dict[int, str]) -> Optional[str]:
+    """参照先のカテゴリ・親タスクが存在しない場合のエラー内容 (存在する場合はNone)"""
+    if task.category_id is not None and task.category_id not in category_ids:
+        return "Category not found"
+    if task.parent_task_id is not None and task.parent_task_id not in parent_paths:
+        return "Parent task not found"
+    return None
+
+
+def import_tasks(
+    db: Session, lines: Iterable[str], format: str = "ndjson", chunk_size: Optional[int] = None
+) -> TaskImportResult:
+    """
+    NDJSON / CSVの行からタスクを作成する
+    chunk_size行ごとに検証し、有効な行を1トランザクションで作成する (失敗した行は行番号とエラー内容を返す)。
+    linesの復号に失敗するとそれまでのチャンクは作成済みのままになるため、先にfind_undecodable_lineで確認する。
+    categoryにカテゴリ名を指定した場合は、最初に1回だけ読み込んだ名前の対応表でcategory_idに変換する。
+    """
+    started = time.perf_counter()
+    categories = category_crud.get_category_id_map(db)
+    category_ids = set(categories.values())
+    imported = 0
+    failed = 0
+    errors: List[TaskImportError] = []
+
+    def fail(line: int, detail: str) -> None:
+        nonlocal failed
+        failed += 1
+        if len(errors) < settings.IMPORT_MAX_ERRORS:
+            errors.append(TaskImportError(line=line, detail=detail))
+
+    for batch in _batches(parse_records(lines, format), chunk_size or settings.IMPORT_CHUNK_SIZE):
+        valid = []
+        for line, record, error in batch:
+            task = None
+            if error is None:
+                task, error = _to_task(record, categories)
+            if error is not None:
+                fail(line, error)
+            else:
+                valid.append((line, task))
+
+        # 親タスクの存在確認 (と経路の取得) はチャンクごとにまとめて行う
+        parent_paths = task_crud.get_task_paths(
+            db, {task.parent_task_id for _, task in valid if task.parent_task_id is not None}
+        )
+        tasks = []
+        for line, task in valid:
+            error = _reference_error(task, category_ids, parent_paths)
+            if error is not None:
+                fail(line, error)
+            else:
+                tasks.append(task)
+
+        if tasks:
+            task_crud.bulk_create_tasks(db, tasks, parent_paths=parent_paths)
+            imported += len(tasks)
+
+    seconds = time.perf_counter() - started
+    return TaskImportResult(
+        imported=imported,
+        failed=failed,
+        errors=errors,
+        seconds=seconds,
+        rows_per_second=(imported + failed) / seconds if seconds else 0.0,
+    )
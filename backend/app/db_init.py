@@ -1,6 +1,7 @@
 from app.core.database import Base, engine
 from app.models.task import Task
 from app.models.category import Category
+from app.models import archived_task, data_version, task_tombstone  # noqa: F401  メタデータにモデルを登録する
 from app.schemas.category import CategoryCreate
 from app.schemas.task import TaskCreate
 from app.crud import category_crud, task_crud
@@ -72,9 +73,10 @@ def create_initial_data():
                 }
             ]
             
+            # 1トランザクションでまとめて作成する
+            task_crud.bulk_create_tasks(db, [TaskCreate(**task_data) for task_data in tasks])
             for task_data in tasks:
-                task = task_crud.create_task(db, TaskCreate(**task_data))
-                print(f"タスク '{task.title}' を作成しました。")
+                print(f"タスク '{task_data['title']}' を作成しました。")
         
         print("初期データ投入完了")
         
@@ -0,0 +1,55 @@
+"""
+NDJSON / CSVファイルからタスクを取り込む
+
+使い方 (backendディレクトリで実行):
+    python -m app.import_tasks tasks.ndjson
+    python -m app.import_tasks tasks.csv --chunk-size 5000
+形式は拡張子から判定する (--formatで指定も可)。失敗した行がある場合は終了コード1を返す
+"""
+import argparse
+import os
+import sys
+
+from app.core.database import SessionLocal
+from app.crud.task_import import IMPORT_FORMATS, find_undecodable_line, import_tasks
+from app.models import category, data_version, task, task_tombstone  # noqa: F401
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="取り込むファイル")
+    parser.add_argument("--format", choices=IMPORT_FORMATS, help="省略時は拡張子から判定")
+    parser.add_argument("--chunk-size", type=int, help="1トランザクションで作成する行数")
+    args = parser.parse_args()
+
+    format = args.format or os.path.splitext(args.path)[1].lstrip(".").lower()
+    if format not in IMPORT_FORMATS:
+        parser.error("--format is required for files other than .ndjson / .csv")
+
+    # チャンクごとにコミットするため、取り込む前にファイル全体を復号できるか確認する
+    with open(args.path, "rb") as raw:
+        line = find_undecodable_line(raw)
+    if line is not None:
+        print(f"{line}行目をUTF-8として読み込めません", file=sys.stderr)
+        return 1
+
+    db = SessionLocal()
+    try:
+        with open(args.path, encoding="utf-8-sig", newline="") as lines:
+            result = import_tasks(db, lines, format, args.chunk_size)
+    finally:
+        db.close()
+
+    print(
+        f"{result.imported}件を作成、{result.failed}件が失敗しました"
+        f" ({result.seconds:.1f}秒, {result.rows_per_second:.0f}行/秒)"
+    )
+    for error in result.errors:
+        print(f"  {error.line}行目: {error.detail}", file=sys.stderr)
+    if result.failed > len(result.errors):
+        print(f"  ...ほか{result.failed - len(result.errors)}件", file=sys.stderr)
+    return 1 if result.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,12 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 
 from app.api.api import api_router
+from app.core.change_feed import change_feed
 from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.metrics import QueryMetricsMiddleware, metrics
 
 app = FastAPI(
     title="Todo App API",
@@ -20,8 +24,32 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
+# リクエストごとのSQLの件数・時間 (CORSより外側で計測する)
+if settings.METRICS_ENABLED:
+    app.add_middleware(QueryMetricsMiddleware)
+
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
+# 他のプロセス (複数ワーカー) の変更を/streamに配信する
+if settings.STREAM_POLL_SECONDS:
+    @app.on_event("startup")
+    def start_change_feed():
+        change_feed.start(settings.STREAM_POLL_SECONDS, SessionLocal)
+
+    @app.on_event("shutdown")
+    def stop_change_feed():
+        change_feed.stop()
+
 @app.get("/")
 def root():
-    return {"message": "Todo App API is running"}
\ No newline at end of file
+    return {"message": "Todo App API is running"}
+
+
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    def read_metrics():
+        """
+        Prometheus形式のメトリクス (このプロセスで処理したリクエストのみ)
+        複数ワーカーではリクエストを受けたワーカーの値になる (todo_process_start_time_secondsのpidで区別する)
+        """
+        return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
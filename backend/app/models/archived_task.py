@@ -0,0 +1,32 @@
+from sqlalchemy import Boolean, Column, DateTime, Index, Integer, String, Text
+from sqlalchemy.sql import func
+
+from app.core.database import Base
+
+
+class ArchivedTask(Base):
+    """
+    アーカイブしたタスク (完了から一定期間が過ぎたタスクや、削除の代わりにアーカイブしたタスク)
+    tasksから行ごと移動するため、一覧・検索・集計などのtasksへのクエリは対象外になる。
+    IDはtasksの時と同じ (tasksのIDは再利用されないため重複しない) で、
+    カテゴリ・親タスクは削除されている場合があるため外部キーにしない
+    """
+    __tablename__ = "archived_tasks"
+    __table_args__ = (
+        Index("ix_archived_tasks_archived_at", "archived_at", "id"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    title = Column(String(255), nullable=False)
+    description = Column(Text, nullable=True)
+    priority = Column(String(10), nullable=False)
+    due_date = Column(DateTime, nullable=True)
+    status = Column(Boolean)
+    order_index = Column(Integer)
+    category_id = Column(Integer, nullable=True)
+    parent_task_id = Column(Integer, nullable=True)
+    created_at = Column(DateTime(timezone=True))
+    updated_at = Column(DateTime(timezone=True))
+    # アーカイブした時点の経路
+    path = Column(Text, nullable=False)
+    archived_at = Column(DateTime(timezone=True), server_default=func.now())
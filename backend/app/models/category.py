@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy import Column, FetchedValue, Integer, String, DateTime
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
@@ -7,11 +7,13 @@ from app.core.database import Base
 
 class Category(Base):
     __tablename__ = "categories"
+    # created_at・updated_atはTaskと同様にフラッシュ時に取得する
+    __mapper_args__ = {"eager_defaults": True}
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(100), nullable=False, unique=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now(), server_onupdate=FetchedValue())
 
     # リレーションシップ
     tasks = relationship("Task", back_populates="category")
\ No newline at end of file
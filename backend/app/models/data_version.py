@@ -0,0 +1,11 @@
+from sqlalchemy import Column, Integer, String
+
+from app.core.database import Base
+
+
+class DataVersion(Base):
+    """テーブルごとの更新バージョン (書き込みをコミットするたびに1増える)"""
+    __tablename__ = "data_versions"
+
+    name = Column(String(50), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
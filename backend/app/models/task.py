@@ -1,12 +1,31 @@
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, Text, DateTime
+from sqlalchemy import DDL, Boolean, Column, FetchedValue, ForeignKey, Index, Integer, String, Text, DateTime, event
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, null
 
 from app.core.database import Base
 
 
+# 一覧の並び順。フィルタ列の後ろに付けた複合インデックスでソートなしに取得できる
+_SORT_COLUMNS = ("order_index", "due_date", "created_at", "id")
+
+
 class Task(Base):
     __tablename__ = "tasks"
+    __table_args__ = (
+        Index("ix_tasks_sort", *_SORT_COLUMNS),
+        Index("ix_tasks_status_sort", "status", *_SORT_COLUMNS),
+        Index("ix_tasks_priority_sort", "priority", *_SORT_COLUMNS),
+        Index("ix_tasks_category_sort", "category_id", *_SORT_COLUMNS),
+        Index("ix_tasks_parent_sort", "parent_task_id", *_SORT_COLUMNS),
+        Index("ix_tasks_change_seq", "change_seq", "id"),
+        Index("ix_tasks_path", "path"),
+        # 完了から一定期間が過ぎたタスクのアーカイブ (task_archive) で対象を探す
+        Index("ix_tasks_status_updated", "status", "updated_at"),
+        # SQLiteで削除・アーカイブしたタスクのIDを再利用しない (archived_tasksのIDと重複させないため)
+        {"sqlite_autoincrement": True},
+    )
+    # DB側で生成するcreated_at・updated_atをフラッシュ時に取得する (RETURNINGに対応するDBではINSERT/UPDATEと同じ文で取得)
+    __mapper_args__ = {"eager_defaults": True}
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(255), nullable=False)
@@ -18,9 +37,49 @@ class Task(Base):
     category_id = Column(Integer, ForeignKey("categories.id"))
     parent_task_id = Column(Integer, ForeignKey("tasks.id"), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # server_onupdateはeager_defaultsの取得対象にするための印 (DDLには影響しない)
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now(), server_onupdate=FetchedValue())
+    # 最後に変更されたコミットの変更シーケンス。作成・更新時はNULLになり、コミット時に採番される
+    change_seq = Column(Integer, nullable=True, onupdate=null())
+    # 祖先のIDをルートから順に/で区切った経路 (ルートのタスクは'/'、1の子の5の子は'/1/5/')
+    # 子孫は経路の前方一致 (インデックスの範囲検索) で取得できる。task_crudの作成・更新で維持する。
+    # 範囲検索をバイト順で行うため、PostgreSQLでは照合順序をCにする
+    path = Column(
+        Text().with_variant(Text(collation="C"), "postgresql"), nullable=False, server_default="/"
+    )
 
     # リレーションシップ
     category = relationship("Category", back_populates="tasks")
     parent = relationship("Task", back_populates="subtasks", remote_side=[id], uselist=False)
-    subtasks = relationship("Task", back_populates="parent", cascade="all, delete-orphan")
\ No newline at end of file
+    subtasks = relationship("Task", back_populates="parent", cascade="all, delete-orphan")
+
+
+# 全文検索用のFTS5外部コンテンツテーブル (SQLiteのみ)。本文はtasksを参照し、トリガーで索引を同期する
+TASK_SEARCH_TABLE = "tasks_fts"
+
+TASK_SEARCH_DDL = [
+    "CREATE VIRTUAL TABLE tasks_fts USING fts5("
+    "title, description, content='tasks', content_rowid='id', prefix='2 3')",
+    "CREATE TRIGGER tasks_fts_ai AFTER INSERT ON tasks BEGIN "
+    "INSERT INTO tasks_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    "CREATE TRIGGER tasks_fts_ad AFTER DELETE ON tasks BEGIN "
+    "INSERT INTO tasks_fts(tasks_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); END",
+    # 並び替えや変更シーケンスの採番では索引を更新しない
+    "CREATE TRIGGER tasks_fts_au AFTER UPDATE OF title, description ON tasks BEGIN "
+    "INSERT INTO tasks_fts(tasks_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); "
+    "INSERT INTO tasks_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+]
+
+
+def is_task_search_table(name: str) -> bool:
+    """FTS5のテーブルと内部テーブル (tasks_fts_data など) か判定する"""
+    return name == TASK_SEARCH_TABLE or name.startswith(TASK_SEARCH_TABLE + "_")
+
+
+for _statement in TASK_SEARCH_DDL:
+    event.listen(Task.__table__, "after_create", DDL(_statement).execute_if(dialect="sqlite"))
+event.listen(
+    Task.__table__, "before_drop", DDL(f"DROP TABLE IF EXISTS {TASK_SEARCH_TABLE}").execute_if(dialect="sqlite")
+)
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, DateTime, Index, Integer
+from sqlalchemy.sql import func
+
+from app.core.database import Base
+
+
+class TaskTombstone(Base):
+    """削除されたタスクの記録。差分同期で削除をクライアントに伝えるために使う"""
+    __tablename__ = "task_tombstones"
+    __table_args__ = (
+        Index("ix_task_tombstones_change_seq", "change_seq", "task_id"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    task_id = Column(Integer, nullable=False)
+    # 削除したコミットの変更シーケンス (コミット時に採番される)
+    change_seq = Column(Integer, nullable=True)
+    deleted_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 from pydantic import BaseModel, Field
 
@@ -42,14 +42,89 @@ class Task(TaskBase):
         orm_mode = True
 
 
-# サブタスクを含むタスクの詳細スキーマ
+# サブタスクを含むタスクの詳細スキーマ（サブタスクも再帰的に含む）
 class TaskWithSubtasks(Task):
-    subtasks: List[Task] = []
+    subtasks: List['TaskWithSubtasks'] = []
 
     class Config:
         orm_mode = True
 
 
+TaskWithSubtasks.update_forward_refs()
+
+
 # タスクのステータス更新用スキーマ
 class TaskStatusUpdate(BaseModel):
-    status: bool
\ No newline at end of file
+    status: bool
+
+
+# 一括更新用スキーマ（対象のIDを含む）
+class TaskBulkUpdate(TaskUpdate):
+    id: int
+
+
+# 一括操作の項目ごとの結果
+class TaskBulkResult(BaseModel):
+    index: int
+    id: Optional[int] = None
+    success: bool
+    detail: Optional[str] = None
+
+
+# インポートで失敗した行
+class TaskImportError(BaseModel):
+    line: int
+    detail: str
+
+
+# インポートの結果
+class TaskImportResult(BaseModel):
+    imported: int
+    failed: int
+    errors: List[TaskImportError]
+    seconds: float
+    rows_per_second: float
+
+
+# アーカイブしたタスク
+class ArchivedTask(Task):
+    archived_at: datetime
+
+
+# 完了したタスクのアーカイブの結果
+class TaskArchiveResult(BaseModel):
+    archived: int
+    batches: int
+    seconds: float
+
+
+# 差分同期のレスポンス
+class TaskChanges(BaseModel):
+    changed: List[Task]
+    deleted: List[int]
+    next_since: str
+    has_more: bool
+
+
+# 全文検索の結果 (rankはBM25スコアで、小さいほど関連度が高い)
+class TaskSearchResult(Task):
+    rank: float
+    snippet: str
+
+
+# カテゴリ別のタスク数
+class CategoryTaskStats(BaseModel):
+    category_id: Optional[int] = None
+    total: int
+    completed: int
+
+
+# ダッシュボードの集計 (due_today / overdueは未完了のタスクのみ数える)
+class TaskStats(BaseModel):
+    total: int
+    completed: int
+    incomplete: int
+    by_priority: Dict[str, int]
+    by_category: List[CategoryTaskStats]
+    due_today: int
+    overdue: int
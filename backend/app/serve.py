@@ -0,0 +1,204 @@
+"""
+本番用のサーバー起動 (複数のワーカープロセス)
+
+使い方 (backendディレクトリで実行):
+    python -m app.serve
+    python -m app.serve --workers 4 --port 8000
+既定値は設定 (SERVER_*。環境変数・.envでも指定可) から取り、ワーカー数は使えるCPU数に合わせる。
+uvloop / httptoolsがインストールされていれば使う。
+ワーカーを起動する前に親プロセスでアプリをimportできることを確認し、できなければ終了コード1で終了する
+(アプリを読み込んだ状態でforkするのではなく、各ワーカーがspawnで起動してアプリを読み込む)。
+
+複数ワーカーでは、ワーカーごとに独立した状態が他のワーカーの書き込みで古くならないよう、ワーカーの設定を変える
+(worker_environment)。
+- プロセス内のレスポンスキャッシュ (CACHE_BACKEND=memory) は無効にする (redisは共有されるためそのまま使う)
+- 変更通知のストリーム (/api/v1/stream) は、他のワーカーの変更をSTREAM_POLL_SECONDS (未設定なら1秒) ごとにDBから読む
+/metricsはリクエストを受けたワーカーの集計で、todo_process_start_time_secondsのpidでワーカーを区別できる。
+"""
+import argparse
+import logging
+import math
+import os
+import sys
+import time
+from importlib.util import find_spec
+from socket import socket
+from typing import Callable, Dict, List, Optional
+
+import uvicorn
+from uvicorn.importer import ImportFromStringError, import_from_string
+from uvicorn.subprocess import get_subprocess
+from uvicorn.supervisors.multiprocess import Multiprocess
+
+from app.core.config import Settings, settings
+
+logger = logging.getLogger("uvicorn.error")
+
+APP = "app.main:app"
+# 終了したワーカーを確認する間隔 (秒)
+WORKER_CHECK_INTERVAL = 1.0
+# 複数ワーカーでSTREAM_POLL_SECONDSが未設定の場合に、他のワーカーの変更を読む間隔 (秒)
+DEFAULT_STREAM_POLL_SECONDS = 1.0
+
+
+def available_cpus() -> int:
+    """このプロセスが使えるCPU数 (CPUアフィニティと、コンテナのcgroup v2のCPU制限を考慮する)"""
+    try:
+        count = len(os.sched_getaffinity(0))
+    except AttributeError:  # macOS / Windows
+        count = os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as cpu_max:
+            quota, period = cpu_max.read().split()
+        if quota != "max":
+            count = min(count, math.ceil(int(quota) / int(period)))
+    except (OSError, ValueError):
+        pass
+    return max(1, count)
+
+
+def event_loop() -> str:
+    return "uvloop" if find_spec("uvloop") else "asyncio"
+
+
+def http_protocol() -> str:
+    return "httptools" if find_spec("httptools") else "h11"
+
+
+def build_config(config: Settings = settings, **overrides) -> uvicorn.Config:
+    """設定からuvicornの設定を作る (overridesで個別に上書きできる)"""
+    options = dict(
+        host=config.SERVER_HOST,
+        port=config.SERVER_PORT,
+        workers=config.SERVER_WORKERS or available_cpus(),
+        loop=event_loop(),
+        http=http_protocol(),
+        timeout_keep_alive=config.SERVER_KEEP_ALIVE,
+        backlog=config.SERVER_BACKLOG,
+        limit_concurrency=config.SERVER_LIMIT_CONCURRENCY,
+        limit_max_requests=config.SERVER_LIMIT_MAX_REQUESTS,
+        access_log=config.SERVER_ACCESS_LOG,
+        lifespan="on",
+    )
+    options.update(overrides)
+    return uvicorn.Config(APP, **options)
+
+
+def worker_environment(workers: int, config: Settings = settings) -> Dict[str, str]:
+    """ワーカーの設定を上書きする環境変数 (ワーカーはspawnで起動し、設定を環境変数から読み直す)"""
+    if workers <= 1:
+        return {}
+    environment = {}
+    if config.CACHE_BACKEND == "memory":
+        environment["CACHE_BACKEND"] = "none"
+    if config.STREAM_POLL_SECONDS is None:
+        environment["STREAM_POLL_SECONDS"] = str(DEFAULT_STREAM_POLL_SECONDS)
+    return environment
+
+
+class WorkerSupervisor(Multiprocess):
+    """
+    uvicornのMultiprocessに、終了したワーカーの再起動 (SERVER_LIMIT_MAX_REQUESTSによる終了を含む) と
+    終了時の猶予時間を加えたもの
+    """
+
+    def __init__(
+        self,
+        config: uvicorn.Config,
+        target: Callable[[Optional[List[socket]]], None],
+        sockets: List[socket],
+        graceful_timeout: float,
+    ) -> None:
+        super().__init__(config, target, sockets)
+        self.graceful_timeout = graceful_timeout
+
+    def run(self) -> None:
+        self.startup()
+        while not self.should_exit.wait(WORKER_CHECK_INTERVAL):
+            self.restart_exited()
+        self.shutdown()
+
+    def restart_exited(self) -> None:
+        for index, process in enumerate(self.processes):
+            if process.is_alive():
+                continue
+            process.join()
+            # SERVER_LIMIT_MAX_REQUESTSに達したワーカーは正常終了 (0) する
+            level = logging.INFO if process.exitcode == 0 else logging.WARNING
+            logger.log(level, "Worker process [%d] exited with code %s, restarting", process.pid, process.exitcode)
+            replacement = get_subprocess(config=self.config, target=self.target, sockets=self.sockets)
+            replacement.start()
+            self.processes[index] = replacement
+
+    def shutdown(self) -> None:
+        # 全ワーカーに先にSIGTERMを送って新しい接続の受け付けを止め、処理中のリクエストの完了をまとめて待つ
+        for process in self.processes:
+            process.terminate()
+        deadline = time.monotonic() + self.graceful_timeout
+        for process in self.processes:
+            process.join(max(0.0, deadline - time.monotonic()))
+        for process in self.processes:
+            if process.is_alive():
+                logger.warning("Worker process [%d] did not stop in %.0fs, killing", process.pid, self.graceful_timeout)
+                process.kill()
+                process.join()
+        logger.info("Stopping parent process [%d]", self.pid)
+
+
+def validate_app_import(app: str) -> None:
+    """
+    ワーカーを起動する前に親プロセスでappをimportできることを確認する (できない場合はImportFromStringError)
+    設定や依存関係の誤りでワーカーが起動と終了を繰り返さないようにするための確認で、
+    読み込んだアプリをワーカーで共有するわけではない (ワーカーはspawnで起動し、それぞれがappを読み込む)
+    """
+    import_from_string(app)
+
+
+def serve(server_config: uvicorn.Config, graceful_timeout: float = settings.SERVER_GRACEFUL_TIMEOUT) -> None:
+    """ソケットを親プロセスで開き、server_config.workers個のワーカープロセスで受け付ける"""
+    validate_app_import(server_config.app)
+    environment = worker_environment(server_config.workers)
+    for name, value in sorted(environment.items()):
+        logger.info("Setting %s=%s for %d workers", name, value, server_config.workers)
+    os.environ.update(environment)
+    logger.info(
+        "Starting %d workers (loop=%s, http=%s)", server_config.workers, server_config.loop, server_config.http
+    )
+    server = uvicorn.Server(config=server_config)
+    sock = server_config.bind_socket()
+    WorkerSupervisor(server_config, server.run, [sock], graceful_timeout).run()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=settings.SERVER_HOST)
+    parser.add_argument("--port", type=int, default=settings.SERVER_PORT)
+    parser.add_argument("--workers", type=int, default=settings.SERVER_WORKERS, help="省略時は使えるCPU数")
+    parser.add_argument("--keep-alive", type=int, default=settings.SERVER_KEEP_ALIVE, help="秒")
+    parser.add_argument("--backlog", type=int, default=settings.SERVER_BACKLOG)
+    parser.add_argument("--limit-concurrency", type=int, default=settings.SERVER_LIMIT_CONCURRENCY)
+    parser.add_argument("--limit-max-requests", type=int, default=settings.SERVER_LIMIT_MAX_REQUESTS)
+    parser.add_argument("--graceful-timeout", type=float, default=settings.SERVER_GRACEFUL_TIMEOUT, help="秒")
+    parser.add_argument("--access-log", action="store_true", default=settings.SERVER_ACCESS_LOG)
+    args = parser.parse_args()
+
+    server_config = build_config(
+        host=args.host,
+        port=args.port,
+        workers=args.workers or available_cpus(),
+        timeout_keep_alive=args.keep_alive,
+        backlog=args.backlog,
+        limit_concurrency=args.limit_concurrency,
+        limit_max_requests=args.limit_max_requests,
+        access_log=args.access_log,
+    )
+    try:
+        serve(server_config, args.graceful_timeout)
+    except ImportFromStringError as exc:
+        logger.error("Could not import %s: %s", APP, exc)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
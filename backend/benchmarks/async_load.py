@@ -0,0 +1,126 @@
+"""
+同期/非同期DBモードの負荷ベンチマーク
+
+シードしたSQLiteに対してuvicornをASYNC_DB=false/trueで順に起動し、
+多数の同時接続クライアントから一覧・詳細取得を繰り返してスループットとレイテンシを比較する。
+
+使い方 (backendディレクトリで実行):
+    python -m benchmarks.async_load --clients 500 --duration 20 --rows 100000
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.explain_task_queries import migrate, populate
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(db_path: str, async_db: bool, port: int) -> subprocess.Popen:
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{db_path}",
+        ASYNC_DB="true" if async_db else "false",
+    )
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=env,
+    )
+
+
+async def wait_ready(base_url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get(base_url + "/")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError("server did not start")
+
+
+async def run_load(base_url: str, clients: int, duration: float, rows: int) -> dict:
+    latencies = []
+    errors = 0
+    deadline = time.monotonic() + duration
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60.0) as client:
+        async def worker(seed: int) -> None:
+            nonlocal errors
+            rng = random.Random(seed)
+            while time.monotonic() < deadline:
+                if rng.random() < 0.5:
+                    path = f"/api/v1/tasks/?limit=20&category_id={rng.randrange(1, 51)}"
+                else:
+                    path = f"/api/v1/tasks/{rng.randrange(1, rows + 1)}"
+                started = time.perf_counter()
+                try:
+                    response = await client.get(path)
+                    if response.status_code != 200:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - started)
+
+        started = time.monotonic()
+        await asyncio.gather(*(worker(seed) for seed in range(clients)))
+        elapsed = time.monotonic() - started
+
+    quantiles = statistics.quantiles(latencies, n=100)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(quantiles[49] * 1000, 2),
+        "p95_ms": round(quantiles[94] * 1000, 2),
+        "p99_ms": round(quantiles[98] * 1000, 2),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), "load.db")
+    migrate(f"sqlite:///{db_path}")
+    populate(db_path, args.rows)
+
+    results = {}
+    for mode, async_db in (("sync", False), ("async", True)):
+        port = free_port()
+        server = start_server(db_path, async_db, port)
+        try:
+            base_url = f"http://127.0.0.1:{port}"
+            asyncio.run(wait_ready(base_url))
+            results[mode] = asyncio.run(run_load(base_url, args.clients, args.duration, args.rows))
+        finally:
+            server.terminate()
+            server.wait()
+        print(mode, results[mode], file=sys.stderr)
+
+    print(json.dumps({"clients": args.clients, "rows": args.rows, "results": results}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
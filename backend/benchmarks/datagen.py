@@ -0,0 +1,169 @@
+"""
+ベンチマーク用の合成データ生成
+
+マイグレーション済みのDBに、カテゴリとタスク (サブタスクの階層を含む) を直接投入する。
+タスクはルートごとに深さ--depth・平均分岐数--fanoutの木として生成し、合計が--tasks件になるまで繰り返す。
+期日の分布は--dueで選ぶ:
+- uniform: 今日の前後90日に一様
+- clustered: 大半が今後1週間に集中し、一部は期限切れ
+- none: 期日なし
+
+使い方 (backendディレクトリで実行):
+    python -m benchmarks.datagen --db bench.db --categories 50 --tasks 100000 --depth 2 --fanout 3
+"""
+import argparse
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Iterator, List, Optional
+
+from sqlalchemy import create_engine, insert
+
+from app.models.category import Category
+from app.models.task import Task
+from benchmarks.explain_task_queries import migrate
+
+DUE_DISTRIBUTIONS = ("uniform", "clustered", "none")
+# 1回のexecutemanyで投入する行数
+INSERT_CHUNK_SIZE = 5000
+
+WORDS = [
+    "資料", "作成", "確認", "会議", "レビュー", "連絡", "調査", "修正", "設計", "実装",
+    "テスト", "準備", "買い物", "予約", "支払い", "提出", "整理", "更新", "報告", "計画",
+]
+
+
+class DatasetGenerator:
+    """乱数のシードが同じなら同じデータを生成する"""
+
+    def __init__(
+        self,
+        categories: int = 50,
+        tasks: int = 100_000,
+        depth: int = 2,
+        fanout: int = 3,
+        due: str = "uniform",
+        seed: int = 0,
+        now: Optional[datetime] = None,
+    ):
+        if due not in DUE_DISTRIBUTIONS:
+            raise ValueError(f"Unknown due date distribution: {due}")
+        self.categories = categories
+        self.tasks = tasks
+        self.depth = depth
+        self.fanout = fanout
+        self.due = due
+        self.rng = random.Random(seed)
+        self.now = (now or datetime.now()).replace(microsecond=0)
+
+    def category_rows(self) -> List[dict]:
+        return [{"id": i, "name": f"category-{i}"} for i in range(1, self.categories + 1)]
+
+    def due_date(self) -> Optional[datetime]:
+        rng = self.rng
+        if self.due == "none" or rng.random() < 0.2:
+            return None
+        if self.due == "uniform":
+            return self.now + timedelta(minutes=rng.randrange(-90 * 24 * 60, 90 * 24 * 60))
+        # clustered: 8割は今後1週間、残りは過去30日 (期限切れ)
+        if rng.random() < 0.8:
+            return self.now + timedelta(minutes=rng.randrange(0, 7 * 24 * 60))
+        return self.now - timedelta(minutes=rng.randrange(1, 30 * 24 * 60))
+
+    def task_row(
+        self, task_id: int, parent_id: Optional[int], category_id: Optional[int], position: int, path: str
+    ) -> dict:
+        rng = self.rng
+        title = " ".join(rng.choices(WORDS, k=rng.randint(2, 5)))
+        # 説明は空・短文・長文が混在する
+        length = rng.choice([0, 0, 5, 20, 200])
+        return {
+            "id": task_id,
+            "title": f"{title} {task_id}",
+            "description": " ".join(rng.choices(WORDS, k=length)) or None,
+            "priority": rng.choices(["low", "medium", "high"], weights=[3, 5, 2])[0],
+            "due_date": self.due_date(),
+            "status": rng.random() < 0.3,
+            "order_index": position,
+            "category_id": category_id,
+            "parent_task_id": parent_id,
+            "created_at": self.now - timedelta(seconds=self.tasks - task_id),
+            "change_seq": 0,
+            "path": path,
+        }
+
+    def task_rows(self) -> Iterator[dict]:
+        """親が子より先に来る順序でタスクを返す (ルートごとに幅優先)"""
+        rng = self.rng
+        next_id = 1
+        root_position = 0
+        while next_id <= self.tasks:
+            category_id = rng.randrange(1, self.categories + 1) if self.categories and rng.random() < 0.9 else None
+            # (ID, そのタスクの子の経路)
+            level = [(next_id, f"/{next_id}/")]
+            yield self.task_row(next_id, None, category_id, root_position, "/")
+            next_id += 1
+            root_position += 1
+            for _ in range(self.depth):
+                children = []
+                for parent_id, path in level:
+                    for position in range(rng.randint(0, 2 * self.fanout)):
+                        if next_id > self.tasks:
+                            return
+                        yield self.task_row(next_id, parent_id, category_id, position, path)
+                        children.append((next_id, f"{path}{next_id}/"))
+                        next_id += 1
+                level = children
+                if not level:
+                    break
+
+
+def _chunks(rows: Iterator[dict], size: int) -> Iterator[List[dict]]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def generate(url: str, generator: DatasetGenerator, create_schema: bool = True) -> int:
+    """urlのDBにデータを投入し、作成したタスクの件数を返す"""
+    if create_schema:
+        migrate(url)
+    engine = create_engine(url)
+    count = 0
+    with engine.begin() as conn:
+        if generator.categories:
+            conn.execute(insert(Category.__table__), generator.category_rows())
+        for chunk in _chunks(generator.task_rows(), INSERT_CHUNK_SIZE):
+            conn.execute(insert(Task.__table__), chunk)
+            count += len(chunk)
+    engine.dispose()
+    return count
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", required=True, help="作成するSQLiteファイル (--urlで他のDBも指定可)")
+    parser.add_argument("--url", help="SQLAlchemyの接続URL (--dbより優先)")
+    parser.add_argument("--categories", type=int, default=50)
+    parser.add_argument("--tasks", type=int, default=100_000)
+    parser.add_argument("--depth", type=int, default=2, help="サブタスクの最大の深さ")
+    parser.add_argument("--fanout", type=int, default=3, help="1タスクあたりの子の平均数")
+    parser.add_argument("--due", choices=DUE_DISTRIBUTIONS, default="uniform")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    generator = DatasetGenerator(args.categories, args.tasks, args.depth, args.fanout, args.due, args.seed)
+    count = generate(args.url or f"sqlite:///{args.db}", generator)
+    print(f"generated {args.categories} categories and {count} tasks in {time.perf_counter() - started:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
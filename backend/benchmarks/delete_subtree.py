@@ -0,0 +1,102 @@
+"""
+サブタスクの木の削除 (DELETE /tasks/{id}) のベンチマーク
+
+件数の異なる木 (ルート1件とその子孫、分岐数--fanout) をSQLiteに作成し、ルートの削除にかかる時間と
+発行したSQLの文数を、ORMのカスケード削除 (子孫を読み込んで1件ずつDELETE) と
+task_crud.delete_task (経路の範囲でまとめて削除) で比較する。
+task_crud.delete_taskの文数が件数によって変わる (子孫を1件ずつ処理している) 場合は終了コード1を返す。
+
+使い方 (backendディレクトリで実行):
+    python -m benchmarks.delete_subtree --sizes 10000 100000
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.core.changes import mark_changed
+from app.crud import task_crud
+from app.models import category  # noqa: F401  Taskのリレーションを解決するために登録する
+from app.models.task import Task
+from benchmarks.explain_task_queries import migrate
+
+METHODS = ("orm-cascade", "set-based")
+
+
+def populate(path: str, size: int, fanout: int) -> None:
+    """IDがヒープ順 (iの親は(i - 2) // fanout + 1) の木をsqlite3で直接投入する"""
+    paths = {1: "/"}
+
+    def generate():
+        yield (1, "root", None, "/")
+        for task_id in range(2, size + 1):
+            parent_id = (task_id - 2) // fanout + 1
+            paths[task_id] = f"{paths[parent_id]}{parent_id}/"
+            yield (task_id, f"task {task_id}", parent_id, paths[task_id])
+
+    conn = sqlite3.connect(path)
+    conn.executemany(
+        "INSERT INTO tasks (id, title, parent_task_id, path, priority, status, order_index, change_seq)"
+        " VALUES (?, ?, ?, ?, 'medium', 0, 0, 0)",
+        generate(),
+    )
+    conn.commit()
+    conn.close()
+
+
+def measure(path: str, method: str) -> dict:
+    engine = create_engine(f"sqlite:///{path}")
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    db = sessionmaker(bind=engine)()
+    started = time.perf_counter()
+    root = task_crud.get_task(db, 1)
+    if method == "orm-cascade":
+        # 変更前の実装と同じく、リレーションのカスケードで子孫を読み込んで削除する
+        mark_changed(db, "tasks")
+        db.delete(root)
+        db.commit()
+    else:
+        task_crud.delete_task(db, root.id, db_task=root)
+    elapsed = time.perf_counter() - started
+    remaining = db.query(Task).count()
+    db.close()
+    engine.dispose()
+    return {"seconds": elapsed, "statements": len(statements), "remaining": remaining}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--fanout", type=int, default=5)
+    parser.add_argument("--methods", nargs="+", choices=METHODS, default=list(METHODS))
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    set_based_statements = set()
+    for size in args.sizes:
+        for method in args.methods:
+            path = os.path.join(directory, f"delete-{size}-{method}.db")
+            migrate(f"sqlite:///{path}")
+            populate(path, size, args.fanout)
+            result = measure(path, method)
+            assert result["remaining"] == 0, result
+            print(
+                f"{size:>8} tasks  {method:<12}  {result['seconds'] * 1000:>9.1f} ms"
+                f"  {result['statements']:>7} statements"
+            )
+            if method == "set-based":
+                set_based_statements.add(result["statements"])
+    if len(set_based_statements) > 1:
+        print(f"set-based statements depend on the tree size: {sorted(set_based_statements)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
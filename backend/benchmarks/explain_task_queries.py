@@ -0,0 +1,134 @@
+"""
+タスク一覧クエリの実行計画ベンチマーク
+
+マイグレーション (alembic upgrade head) で作成したSQLiteに大量のタスクを投入し、
+task_crud.get_tasksが実際に発行するSQLについて EXPLAIN QUERY PLAN と実行時間を出力する。
+一時B-treeによるソート (USE TEMP B-TREE FOR ORDER BY) が発生した場合は終了コード1を返す。
+
+使い方 (backendディレクトリで実行):
+    python -m benchmarks.explain_task_queries --rows 1000000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from itertools import product
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.crud import task_crud
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FILTERS = {
+    "status": [None, False],
+    "priority": [None, "high"],
+    "category_id": [None, 7],
+    "parent_task_id": [None, 42],
+}
+
+
+def migrate(url: str) -> None:
+    """マイグレーションでスキーマを作成する"""
+    config = Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BACKEND_DIR, "alembic"))
+    config.set_main_option("sqlalchemy.url", url)
+    command.upgrade(config, "head")
+
+
+def populate(path: str, rows: int, categories: int = 50, seed: int = 0) -> None:
+    """sqlite3で直接大量のタスクを投入する"""
+    rng = random.Random(seed)
+    now = datetime(2026, 1, 1)
+    conn = sqlite3.connect(path)
+    conn.executemany(
+        "INSERT INTO categories (id, name) VALUES (?, ?)",
+        [(i, f"category-{i}") for i in range(1, categories + 1)],
+    )
+
+    def generate():
+        for i in range(1, rows + 1):
+            due = now + timedelta(hours=rng.randrange(24 * 365)) if rng.random() < 0.7 else None
+            yield (
+                i,
+                f"task {i}",
+                rng.choice(["low", "medium", "high"]),
+                due.strftime("%Y-%m-%d %H:%M:%S.%f") if due else None,
+                rng.random() < 0.3,
+                rng.randrange(100),
+                rng.randrange(1, categories + 1),
+                rng.randrange(1, i) if i > 1 and rng.random() < 0.2 else None,
+                (now + timedelta(seconds=i)).strftime("%Y-%m-%d %H:%M:%S"),
+            )
+
+    conn.executemany(
+        "INSERT INTO tasks (id, title, priority, due_date, status, order_index,"
+        " category_id, parent_task_id, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        generate(),
+    )
+    conn.commit()
+    conn.execute("ANALYZE")
+    conn.close()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--skip", type=int, default=500_000, help="オフセットページングで比較するskip")
+    parser.add_argument("--db", help="使用するSQLiteファイル (省略時は一時ファイル)")
+    args = parser.parse_args()
+
+    path = args.db or os.path.join(tempfile.mkdtemp(), "bench.db")
+    url = f"sqlite:///{path}"
+    if not os.path.exists(path):
+        migrate(url)
+        started = time.perf_counter()
+        populate(path, args.rows)
+        print(f"populated {args.rows} rows in {time.perf_counter() - started:.1f}s ({path})")
+
+    engine = create_engine(url)
+    statements = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    db = sessionmaker(bind=engine)()
+    sorted_plans = 0
+
+    for values in product(*FILTERS.values()):
+        filters = {key: value for key, value in zip(FILTERS, values) if value is not None}
+        first_page = task_crud.get_tasks(db, limit=100, **filters)
+        cases = [("first", {}), ("offset", {"skip": args.skip})]
+        if first_page:
+            cases.append(("cursor", {"after": task_crud.task_sort_key(first_page[-1])}))
+
+        for label, paging in cases:
+            statements.clear()
+            started = time.perf_counter()
+            task_crud.get_tasks(db, limit=100, **filters, **paging)
+            elapsed = (time.perf_counter() - started) * 1000
+            statement, parameters = statements[-1]
+            plan = [row[-1] for row in db.connection().exec_driver_sql(
+                "EXPLAIN QUERY PLAN " + statement, parameters
+            )]
+            uses_sort = any("TEMP B-TREE" in line for line in plan)
+            sorted_plans += uses_sort
+            print(f"{str(filters or '-'):<60} {label:<7} {elapsed:8.2f}ms  {'SORT ' if uses_sort else ''}{' | '.join(plan)}")
+
+    db.close()
+    if sorted_plans:
+        print(f"{sorted_plans} plan(s) use a temp B-tree sort")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+"""
+タスクのエクスポート (GET /tasks/export) のメモリ使用量ベンチマーク
+
+件数の異なるSQLiteを作成し、それぞれ別プロセスでエクスポートの全行を読み捨てて
+ピークRSSの増加量とスループットを計測する。エクスポートはサーバーサイドカーソルで読み進めるため、
+件数が増えてもピークRSSは変わらないはずで、最小件数との差が--budget (MB) を超えた場合は終了コード1を返す。
+
+使い方 (backendディレクトリで実行):
+    python -m benchmarks.export_tasks --sizes 10000 1000000
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.api.endpoints.tasks import export_tasks
+from app.models import category  # noqa: F401  Taskのリレーションを解決するために登録する
+from benchmarks.explain_task_queries import migrate
+
+
+def populate(path: str, rows: int) -> None:
+    """sqlite3で直接タスクを投入する"""
+    now = datetime(2026, 1, 1)
+
+    def generate():
+        for i in range(1, rows + 1):
+            yield (
+                i,
+                f"task {i}",
+                f"説明 {i} " * 20,
+                ("low", "medium", "high")[i % 3],
+                (now + timedelta(hours=i % 10000)).strftime("%Y-%m-%d %H:%M:%S.%f"),
+                i % 4 == 0,
+                i,
+                now.strftime("%Y-%m-%d %H:%M:%S"),
+            )
+
+    conn = sqlite3.connect(path)
+    conn.executemany(
+        "INSERT INTO tasks (id, title, description, priority, due_date, status, order_index, created_at)"
+        " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        generate(),
+    )
+    conn.commit()
+    conn.close()
+
+
+def peak_rss_mb() -> float:
+    # LinuxではKB単位
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def measure(path: str, export_format: str) -> dict:
+    """エクスポートの全チャンクを読み捨て、ピークRSSの増加量を返す (子プロセスで実行する)"""
+    # アプリと同じく、行の読み込みはスレッドプールのスレッドで行われる
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    db = sessionmaker(bind=engine)()
+    baseline = peak_rss_mb()
+    started = time.perf_counter()
+    response = export_tasks(
+        format=export_format, status=None, priority=None, category_id=None, parent_task_id=None, db=db
+    )
+
+    async def consume():
+        # StreamingResponseは同期のイテレータをスレッドプールで回す非同期イテレータにする
+        size = lines = 0
+        async for chunk in response.body_iterator:
+            size += len(chunk)
+            lines += chunk.count(b"\n")
+        return size, lines
+
+    size, lines = asyncio.run(consume())
+    elapsed = time.perf_counter() - started
+    db.close()
+    return {
+        "lines": lines,
+        "bytes": size,
+        "seconds": elapsed,
+        "rss_growth_mb": peak_rss_mb() - baseline,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 1_000_000])
+    parser.add_argument("--format", choices=["ndjson", "csv"], default="ndjson")
+    parser.add_argument("--budget", type=float, default=20.0, help="ピークRSSの増加量の差の上限 (MB)")
+    parser.add_argument("--measure", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(args.measure, args.format)))
+        return 0
+
+    directory = tempfile.mkdtemp()
+    growths = []
+    for rows in sorted(args.sizes):
+        path = os.path.join(directory, f"export-{rows}.db")
+        migrate(f"sqlite:///{path}")
+        populate(path, rows)
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.export_tasks", "--measure", path, "--format", args.format],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        growths.append(result["rss_growth_mb"])
+        print(
+            f"{rows:>9} rows  {result['bytes'] / 1024 / 1024:8.1f} MB exported"
+            f"  {result['lines'] / result['seconds']:>9.0f} lines/s"
+            f"  peak RSS +{result['rss_growth_mb']:.1f} MB"
+        )
+
+    if growths[-1] - growths[0] > args.budget:
+        print(f"peak RSS grows by {growths[-1] - growths[0]:.1f} MB (> {args.budget} MB)")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+"""
+全文検索 (GET /tasks/search) のベンチマーク
+
+マイグレーションで作成したSQLiteに、語彙の出現頻度が偏った (Zipf分布) タイトルと説明を持つ
+大量のタスクを投入し、task_crud.search_tasksの実行時間を検索語の種類ごとに計測する。
+いずれかのクエリの中央値が--budget (ミリ秒) を超えた場合は終了コード1を返す。
+
+使い方 (backendディレクトリで実行):
+    python -m benchmarks.search_tasks --rows 1000000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from itertools import accumulate
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.crud import task_crud
+from app.models import category  # noqa: F401  Taskのリレーションを解決するために登録する
+from benchmarks.explain_task_queries import migrate
+
+SYLLABLES = [c + v for c in "bdfgkmnprstz" for v in "aeiou"]
+
+
+def make_vocabulary(size: int, rng: random.Random) -> list:
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+def populate(path: str, rows: int, vocabulary: list, seed: int = 0) -> None:
+    """sqlite3で直接タスクを投入する (FTS5の索引はトリガーで作られる)"""
+    rng = random.Random(seed)
+    cum_weights = list(accumulate(1 / rank for rank in range(1, len(vocabulary) + 1)))
+
+    def words(count: int) -> str:
+        return " ".join(rng.choices(vocabulary, cum_weights=cum_weights, k=count))
+
+    def generate():
+        for i in range(1, rows + 1):
+            yield (
+                i,
+                words(rng.randint(3, 6)),
+                words(rng.randint(10, 20)) if rng.random() < 0.8 else None,
+                rng.choice(["low", "medium", "high"]),
+                rng.random() < 0.3,
+                rng.randrange(1, 51),
+            )
+
+    conn = sqlite3.connect(path)
+    conn.executemany(
+        "INSERT INTO categories (id, name) VALUES (?, ?)", [(i, f"category-{i}") for i in range(1, 51)]
+    )
+    conn.executemany(
+        "INSERT INTO tasks (id, title, description, priority, status, category_id, order_index, change_seq)"
+        " VALUES (?, ?, ?, ?, ?, ?, 0, 0)",
+        generate(),
+    )
+    conn.execute("INSERT INTO tasks_fts(tasks_fts) VALUES ('optimize')")
+    conn.commit()
+    conn.close()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--vocabulary", type=int, default=50_000, help="語彙の数")
+    parser.add_argument("--repeat", type=int, default=50, help="クエリごとの実行回数")
+    parser.add_argument("--budget", type=float, default=10.0, help="中央値の上限 (ミリ秒)")
+    parser.add_argument("--db", help="使用するSQLiteファイル (省略時は一時ファイル)")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    vocabulary = make_vocabulary(args.vocabulary, rng)
+    path = args.db or os.path.join(tempfile.mkdtemp(), "search.db")
+    if not os.path.exists(path):
+        migrate(f"sqlite:///{path}")
+        started = time.perf_counter()
+        populate(path, args.rows, vocabulary)
+        print(f"populated {args.rows} rows in {time.perf_counter() - started:.1f}s ({path})")
+
+    # 語彙の先頭ほど頻出する (Zipf分布)
+    common, middle, rare = vocabulary[9], vocabulary[len(vocabulary) // 20], vocabulary[-1]
+    cases = [
+        ("rare word", rare, {}),
+        ("mid-frequency word", middle, {}),
+        ("common word", common, {}),
+        ("prefix (3 chars)", middle[:3], {}),
+        ("two words", f"{common} {middle}", {}),
+        ("word + filters", middle, {"status": False, "priority": "high"}),
+        ("word + category", middle, {"category_id": 7}),
+    ]
+
+    db = sessionmaker(bind=create_engine(f"sqlite:///{path}"))()
+    over_budget = 0
+    for label, q, filters in cases:
+        timings = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            results, _ = task_crud.search_tasks(db, q, limit=20, **filters)
+            timings.append((time.perf_counter() - started) * 1000)
+        p50 = statistics.median(timings)
+        p95 = statistics.quantiles(timings, n=20)[-1]
+        over_budget += p50 > args.budget
+        print(f"{label:<20} {q!r:<28} {len(results):>3} hits  p50 {p50:8.2f}ms  p95 {p95:8.2f}ms")
+
+    db.close()
+    if over_budget:
+        print(f"{over_budget} quer(ies) exceed {args.budget}ms at p50")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
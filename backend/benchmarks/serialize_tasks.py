@@ -0,0 +1,92 @@
+"""
+タスク一覧のシリアライズのマイクロベンチマーク
+
+インメモリSQLiteに投入したタスクについて、read_tasksの2つの経路の1ページ分の処理時間を比較する。
+- default: ORMオブジェクトを取得し、schemas.task.Taskで検証してjsonable_encoder + 標準のjsonでエンコード
+  (FastAPIのresponse_modelと同じ処理)
+- fast: 列の値を辞書で取得し、orjsonでエンコード (FAST_JSON=true)
+
+使い方 (backendディレクトリで実行):
+    python -m benchmarks.serialize_tasks --sizes 100 1000 10000
+"""
+import argparse
+import json
+import statistics
+import time
+from datetime import datetime, timedelta
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import Base
+from app.crud import task_crud
+from app.models import category  # noqa: F401  Taskのリレーションを解決するために登録する
+from app.models.task import Task
+from app.schemas.task import Task as TaskSchema
+
+
+def populate(db, rows: int) -> None:
+    now = datetime(2026, 1, 1)
+    db.bulk_insert_mappings(Task, [
+        {
+            "title": f"task {i}",
+            "description": "説明 " * 20,
+            "priority": ("low", "medium", "high")[i % 3],
+            "due_date": now + timedelta(hours=i),
+            "status": i % 4 == 0,
+            "order_index": i,
+            "created_at": now,
+        }
+        for i in range(rows)
+    ])
+    db.commit()
+
+
+def default_path(db, limit: int) -> bytes:
+    tasks = task_crud.get_tasks(db, limit=limit)
+    content = jsonable_encoder([TaskSchema.from_orm(task) for task in tasks])
+    body = json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode()
+    db.expunge_all()
+    return body
+
+
+def fast_path(db, limit: int) -> bytes:
+    return orjson.dumps(task_crud.get_task_rows(db, limit=limit), default=jsonable_encoder)
+
+
+def measure(func, db, limit: int, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(db, limit)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    populate(db, max(args.sizes))
+
+    assert json.loads(default_path(db, 10)) == json.loads(fast_path(db, 10))
+    print(f"{'rows':>6} {'default':>12} {'fast':>12} {'speedup':>8}")
+    for size in args.sizes:
+        default = measure(default_path, db, size, args.repeat)
+        fast = measure(fast_path, db, size, args.repeat)
+        print(
+            f"{size:>6} {default * 1000:10.2f}ms {fast * 1000:10.2f}ms {default / fast:7.1f}x"
+            f"   ({size / default:,.0f} / {size / fast:,.0f} rows/s)"
+        )
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
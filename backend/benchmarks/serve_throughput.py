@@ -0,0 +1,74 @@
+"""
+本番用サーバー (app.serve) のワーカー数ごとのスループットのベンチマーク
+
+シードしたSQLiteに対してpython -m app.serveをワーカー数を変えて順に起動し、
+async_loadと同じ負荷 (一覧・詳細取得) をかけてスループットとレイテンシを比較する。
+ワーカー数を使えるCPU数より多くしても効果はないため、結果にはCPU数も出力する。
+
+使い方 (backendディレクトリで実行):
+    python -m benchmarks.serve_throughput --workers 1 2 4 --clients 200 --duration 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from app.serve import available_cpus, event_loop, http_protocol
+from benchmarks.async_load import free_port, run_load, wait_ready
+from benchmarks.explain_task_queries import migrate, populate
+
+
+def start_server(db_path: str, workers: int, port: int) -> subprocess.Popen:
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{db_path}")
+    return subprocess.Popen(
+        [sys.executable, "-m", "app.serve", "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers)],
+        env=env,
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), "serve.db")
+    migrate(f"sqlite:///{db_path}")
+    populate(db_path, args.rows)
+
+    results = {}
+    for workers in args.workers:
+        port = free_port()
+        server = start_server(db_path, workers, port)
+        try:
+            base_url = f"http://127.0.0.1:{port}"
+            asyncio.run(wait_ready(base_url))
+            results[workers] = asyncio.run(run_load(base_url, args.clients, args.duration, args.rows))
+        finally:
+            server.terminate()
+            server.wait()
+        print(workers, results[workers], file=sys.stderr)
+
+    print(
+        json.dumps(
+            {
+                "cpus": available_cpus(),
+                "loop": event_loop(),
+                "http": http_protocol(),
+                "clients": args.clients,
+                "rows": args.rows,
+                "results": results,
+            },
+            indent=2,
+        )
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,508 @@
+"""
+全エンドポイントのレイテンシ・スループットのベンチマーク
+
+datagenで生成したDBに対して、api/endpointsの各エンドポイントのシナリオを順に実行し、
+シナリオごとのp50/p95/p99 (ミリ秒)・スループット・エラー数をJSONで出力する。
+- --transport inprocess: httpxのASGIクライアントでアプリを直接呼ぶ (ネットワークを含まない)
+- --transport uvicorn: uvicornを起動してHTTPで呼ぶ
+読み取りのシナリオを先に、書き込み・削除のシナリオを後に実行する。
+/streamは応答が終わらないため、uvicornでのみ最初のバイトまでの時間を計測する。
+
+結果は--outputに保存し、compareで別のコミットの結果と比較できる
+(p95が--threshold (%) を超えて悪化したシナリオがある場合は終了コード1)。
+
+使い方 (backendディレクトリで実行):
+    python -m benchmarks.suite run --tasks 100000 --requests 200 --output before.json
+    python -m benchmarks.suite run --transport uvicorn --concurrency 20 --output after.json
+    python -m benchmarks.suite compare before.json after.json --threshold 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from benchmarks.async_load import free_port, wait_ready
+from benchmarks.datagen import DUE_DISTRIBUTIONS, DatasetGenerator, generate
+
+API = "/api/v1"
+TRANSPORTS = ("inprocess", "uvicorn")
+
+# シナリオが呼ぶURLとリクエストの引数 (json / content / params) を返す関数
+Build = Callable[[random.Random, Dict[str, Any]], Tuple[str, Dict[str, Any]]]
+
+
+class Scenario:
+    def __init__(
+        self,
+        name: str,
+        method: str,
+        route: str,
+        build: Build,
+        after: Optional[Callable[[httpx.Response, Dict[str, Any]], None]] = None,
+        transports: Tuple[str, ...] = TRANSPORTS,
+    ):
+        self.name = name
+        self.method = method
+        # 網羅の確認に使うアプリのルートのパス
+        self.route = route
+        self.build = build
+        self.after = after
+        self.transports = transports
+
+
+def _task_id(rng: random.Random, ctx: Dict[str, Any]) -> int:
+    return rng.randrange(1, ctx["tasks"] + 1)
+
+
+def _category_id(rng: random.Random, ctx: Dict[str, Any]) -> int:
+    return rng.randrange(1, ctx["categories"] + 1)
+
+
+def _new_task(rng: random.Random) -> Dict[str, Any]:
+    return {"title": f"bench {rng.random():.6f}", "priority": rng.choice(["low", "medium", "high"])}
+
+
+def _pop(ctx: Dict[str, Any], key: str, count: int = 1) -> List[int]:
+    """書き込みのシナリオで作成したIDを取り出す (足りない場合は存在しないID)"""
+    ids = [ctx[key].pop() for _ in range(min(count, len(ctx[key])))]
+    return ids + [10 ** 9] * (count - len(ids))
+
+
+def _remember(key: str) -> Callable[[httpx.Response, Dict[str, Any]], None]:
+    def after(response: httpx.Response, ctx: Dict[str, Any]) -> None:
+        if response.status_code != 200:
+            return
+        body = response.json()
+        if isinstance(body, list):
+            ctx[key].extend(item["id"] for item in body if item.get("success"))
+        else:
+            ctx[key].append(body["id"])
+    return after
+
+
+def _archive_created(rng: random.Random, ctx: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+    """書き込みのシナリオで作成したタスクをアーカイブし、戻すシナリオのために覚えておく"""
+    task_id = _pop(ctx, "created_tasks")[0]
+    if task_id != 10 ** 9:
+        ctx["archived_tasks"].append(task_id)
+    return f"{API}/tasks/{task_id}/archive", {}
+
+
+def _import_body(rng: random.Random, ctx: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+    lines = (json.dumps({**_new_task(rng), "category": f"category-{_category_id(rng, ctx)}"}) for _ in range(10))
+    return f"{API}/tasks/import", {"content": "\n".join(lines).encode()}
+
+
+SCENARIOS = [
+    # 読み取り
+    Scenario("root", "GET", "/", lambda rng, ctx: ("/", {})),
+    Scenario("tasks.list", "GET", f"{API}/tasks/", lambda rng, ctx: (f"{API}/tasks/?limit=20", {})),
+    Scenario(
+        "tasks.list_filtered", "GET", f"{API}/tasks/",
+        lambda rng, ctx: (f"{API}/tasks/?limit=20&status=false&category_id={_category_id(rng, ctx)}", {}),
+    ),
+    Scenario(
+        "tasks.list_fields", "GET", f"{API}/tasks/",
+        lambda rng, ctx: (f"{API}/tasks/?limit=100&fields=id,title,status,priority,due_date", {}),
+    ),
+    Scenario("tasks.stats", "GET", f"{API}/tasks/stats", lambda rng, ctx: (f"{API}/tasks/stats", {})),
+    Scenario("tasks.changes", "GET", f"{API}/tasks/changes", lambda rng, ctx: (f"{API}/tasks/changes?limit=100", {})),
+    Scenario(
+        "tasks.export", "GET", f"{API}/tasks/export",
+        lambda rng, ctx: (f"{API}/tasks/export?category_id={_category_id(rng, ctx)}&status=true", {}),
+    ),
+    Scenario(
+        "tasks.search", "GET", f"{API}/tasks/search",
+        lambda rng, ctx: (f"{API}/tasks/search?q={rng.choice(['資料', '会議', 'テスト', '予約'])}", {}),
+    ),
+    Scenario(
+        "tasks.get", "GET", f"{API}/tasks/{{task_id}}",
+        lambda rng, ctx: (f"{API}/tasks/{_task_id(rng, ctx)}", {}),
+    ),
+    Scenario(
+        "tasks.subtasks", "GET", f"{API}/tasks/{{task_id}}/subtasks",
+        lambda rng, ctx: (f"{API}/tasks/{rng.choice(ctx['roots'])}/subtasks", {}),
+    ),
+    Scenario(
+        "tasks.tree", "GET", f"{API}/tasks/{{task_id}}/tree",
+        lambda rng, ctx: (f"{API}/tasks/{rng.choice(ctx['roots'])}/tree", {}),
+    ),
+    Scenario(
+        "tasks.ancestors", "GET", f"{API}/tasks/{{task_id}}/ancestors",
+        lambda rng, ctx: (f"{API}/tasks/{_task_id(rng, ctx)}/ancestors", {}),
+    ),
+    Scenario(
+        "tasks.archived", "GET", f"{API}/tasks/archived",
+        lambda rng, ctx: (f"{API}/tasks/archived?limit=20", {}),
+    ),
+    Scenario("categories.list", "GET", f"{API}/categories/", lambda rng, ctx: (f"{API}/categories/", {})),
+    Scenario(
+        "categories.get", "GET", f"{API}/categories/{{category_id}}",
+        lambda rng, ctx: (f"{API}/categories/{_category_id(rng, ctx)}", {}),
+    ),
+    Scenario(
+        "categories.tasks", "GET", f"{API}/categories/{{category_id}}/tasks",
+        lambda rng, ctx: (f"{API}/categories/{_category_id(rng, ctx)}/tasks", {}),
+    ),
+    Scenario("cache.stats", "GET", f"{API}/cache/stats", lambda rng, ctx: (f"{API}/cache/stats", {})),
+    Scenario("stream.connect", "GET", f"{API}/stream", lambda rng, ctx: (f"{API}/stream", {}), transports=("uvicorn",)),
+    # 書き込み
+    Scenario(
+        "tasks.create", "POST", f"{API}/tasks/",
+        lambda rng, ctx: (f"{API}/tasks/", {"json": _new_task(rng)}), after=_remember("created_tasks"),
+    ),
+    Scenario(
+        "tasks.bulk_create", "POST", f"{API}/tasks/bulk",
+        lambda rng, ctx: (f"{API}/tasks/bulk", {"json": [_new_task(rng) for _ in range(10)]}),
+        after=_remember("created_tasks"),
+    ),
+    Scenario("tasks.import", "POST", f"{API}/tasks/import", _import_body),
+    Scenario(
+        "tasks.update", "PUT", f"{API}/tasks/{{task_id}}",
+        lambda rng, ctx: (f"{API}/tasks/{_task_id(rng, ctx)}", {"json": {"priority": rng.choice(["low", "high"])}}),
+    ),
+    Scenario(
+        "tasks.status", "PATCH", f"{API}/tasks/{{task_id}}/status",
+        lambda rng, ctx: (f"{API}/tasks/{_task_id(rng, ctx)}/status", {"json": {"status": rng.random() < 0.5}}),
+    ),
+    Scenario(
+        "tasks.bulk_update", "PATCH", f"{API}/tasks/bulk",
+        lambda rng, ctx: (f"{API}/tasks/bulk", {
+            "json": [{"id": _task_id(rng, ctx), "status": rng.random() < 0.5} for _ in range(10)],
+        }),
+    ),
+    Scenario(
+        "tasks.reorder", "POST", f"{API}/tasks/reorder",
+        lambda rng, ctx: (f"{API}/tasks/reorder", {"json": rng.sample(ctx["roots"], min(10, len(ctx["roots"])))}),
+    ),
+    Scenario(
+        "categories.create", "POST", f"{API}/categories/",
+        lambda rng, ctx: (f"{API}/categories/", {"json": {"name": f"bench {rng.random():.9f}"}}),
+        after=_remember("created_categories"),
+    ),
+    Scenario(
+        "categories.update", "PUT", f"{API}/categories/{{category_id}}",
+        lambda rng, ctx: (
+            f"{API}/categories/{rng.choice(ctx['created_categories'] or [1])}",
+            {"json": {"name": f"bench {rng.random():.9f}"}},
+        ),
+    ),
+    # アーカイブ (生成したデータは作成から30日以内のため、対象を探すクエリだけの定期実行の時間になる)
+    Scenario(
+        "tasks.archive_completed", "POST", f"{API}/tasks/archive",
+        lambda rng, ctx: (f"{API}/tasks/archive?older_than_days=30", {}),
+    ),
+    Scenario("tasks.archive", "POST", f"{API}/tasks/{{task_id}}/archive", _archive_created),
+    Scenario(
+        "tasks.restore", "POST", f"{API}/tasks/archived/{{task_id}}/restore",
+        lambda rng, ctx: (f"{API}/tasks/archived/{_pop(ctx, 'archived_tasks')[0]}/restore", {}),
+        after=_remember("created_tasks"),
+    ),
+    # 削除 (書き込みのシナリオで作成したものを消す)
+    Scenario(
+        "tasks.delete", "DELETE", f"{API}/tasks/{{task_id}}",
+        lambda rng, ctx: (f"{API}/tasks/{_pop(ctx, 'created_tasks')[0]}", {}),
+    ),
+    Scenario(
+        "tasks.bulk_delete", "DELETE", f"{API}/tasks/bulk",
+        lambda rng, ctx: (f"{API}/tasks/bulk", {"json": _pop(ctx, "created_tasks", 10)}),
+    ),
+    Scenario(
+        "categories.delete", "DELETE", f"{API}/categories/{{category_id}}",
+        lambda rng, ctx: (f"{API}/categories/{_pop(ctx, 'created_categories')[0]}", {}),
+    ),
+]
+
+
+def uncovered_routes(app: Any) -> List[str]:
+    """シナリオのないアプリのルートを返す (OpenAPIのドキュメント用のルートは除く)"""
+    covered = {(scenario.method, scenario.route) for scenario in SCENARIOS}
+    missing = []
+    for route in app.routes:
+        if not getattr(route, "include_in_schema", False):
+            continue
+        for method in sorted(route.methods - {"HEAD"}):
+            if (method, route.path) not in covered:
+                missing.append(f"{method} {route.path}")
+    return missing
+
+
+async def request_once(client: httpx.AsyncClient, scenario: Scenario, url: str, kwargs: Dict[str, Any]) -> httpx.Response:
+    if scenario.name == "stream.connect":
+        # 最初のバイトを受け取った時点で切断する
+        async with client.stream("GET", url) as response:
+            async for _ in response.aiter_bytes():
+                break
+            return response
+    return await client.request(scenario.method, url, **kwargs)
+
+
+async def run_scenario(
+    client: httpx.AsyncClient, scenario: Scenario, ctx: Dict[str, Any], requests: int, concurrency: int, warmup: int, seed: int
+) -> Dict[str, Any]:
+    rng = random.Random(f"{seed}:{scenario.name}")
+    latencies: List[float] = []
+    errors = 0
+    remaining = warmup + requests
+
+    async def worker() -> None:
+        nonlocal errors, remaining
+        while remaining > 0:
+            remaining -= 1
+            measured = remaining < requests
+            url, kwargs = scenario.build(rng, ctx)
+            started = time.perf_counter()
+            try:
+                response = await request_once(client, scenario, url, kwargs)
+            except httpx.HTTPError:
+                errors += measured
+                continue
+            elapsed = time.perf_counter() - started
+            if scenario.after is not None:
+                scenario.after(response, ctx)
+            if measured:
+                latencies.append(elapsed)
+                errors += response.status_code >= 400
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        # ウォームアップを含む経過時間のため、リクエスト数が少ない場合は控えめな値になる
+        "rps": round((warmup + requests) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(quantiles[49] * 1000, 3),
+        "p95_ms": round(quantiles[94] * 1000, 3),
+        "p99_ms": round(quantiles[98] * 1000, 3),
+    }
+
+
+async def run_all(client: httpx.AsyncClient, transport: str, ctx: Dict[str, Any], args: argparse.Namespace) -> Dict[str, Any]:
+    results = {}
+    for scenario in SCENARIOS:
+        if transport not in scenario.transports or (args.only and scenario.name not in args.only):
+            continue
+        results[scenario.name] = await run_scenario(
+            client, scenario, ctx, args.requests, args.concurrency, args.warmup, args.seed
+        )
+        print(f"{scenario.name:<22} {json.dumps(results[scenario.name])}", file=sys.stderr)
+    return results
+
+
+def load_context(url: str, categories: int) -> Dict[str, Any]:
+    """シナリオが参照するIDの範囲をDBから読む"""
+    from sqlalchemy import create_engine, func, select
+
+    from app.models.task import Task
+
+    engine = create_engine(url)
+    with engine.connect() as conn:
+        tasks = conn.execute(select(func.max(Task.id))).scalar() or 1
+        roots = [row.id for row in conn.execute(
+            select(Task.id).where(Task.parent_task_id.is_(None)).order_by(Task.id).limit(1000)
+        )]
+    engine.dispose()
+    return {
+        "tasks": tasks,
+        "categories": max(categories, 1),
+        "roots": roots or [1],
+        "created_tasks": [],
+        "archived_tasks": [],
+        "created_categories": [],
+    }
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], check=True, capture_output=True, text=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def prepare_database(args: argparse.Namespace) -> str:
+    """データセットを (なければ生成して) コピーし、シナリオを実行するDBのパスを返す"""
+    dataset = args.db or os.path.join(tempfile.mkdtemp(), "dataset.db")
+    if not os.path.exists(dataset):
+        generator = DatasetGenerator(args.categories, args.tasks, args.depth, args.fanout, args.due, args.seed)
+        started = time.perf_counter()
+        generate(f"sqlite:///{dataset}", generator)
+        print(f"generated {args.tasks} tasks in {time.perf_counter() - started:.1f}s ({dataset})", file=sys.stderr)
+    # 書き込みのシナリオでデータセットが変わらないように、毎回コピーに対して実行する
+    path = os.path.join(tempfile.mkdtemp(), "suite.db")
+    shutil.copyfile(dataset, path)
+    return path
+
+
+def run(args: argparse.Namespace) -> int:
+    # 子プロセス (--worker-output) は親が用意したコピーをそのまま使う
+    path = prepare_database(args) if args.worker_output is None else args.db
+    url = f"sqlite:///{path}"
+    ctx = load_context(url, args.categories)
+
+    env = {"DATABASE_URL": url, "ASYNC_DB": "true" if args.async_db else "false"}
+    if args.no_cache:
+        env["CACHE_BACKEND"] = "none"
+
+    if args.transport == "inprocess" and args.worker_output is None:
+        # 設定はアプリのインポート時に読み込まれるため、環境変数を設定した子プロセスで実行する
+        with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as f:
+            worker_output = f.name
+        subprocess.run(
+            [sys.executable, "-m", "benchmarks.suite", *sys.argv[1:], "--db", path, "--worker-output", worker_output],
+            env=dict(os.environ, **env),
+            check=True,
+        )
+        with open(worker_output) as f:
+            results = json.load(f)
+        os.unlink(worker_output)
+    elif args.transport == "inprocess":
+        from app.main import app
+
+        for route in uncovered_routes(app):
+            print(f"warning: no scenario for {route}", file=sys.stderr)
+
+        async def main() -> Dict[str, Any]:
+            async with httpx.AsyncClient(app=app, base_url="http://bench", timeout=60.0) as client:
+                return await run_all(client, args.transport, ctx, args)
+
+        with open(args.worker_output, "w") as f:
+            json.dump(asyncio.run(main()), f)
+        return 0
+    else:
+        port = free_port()
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+            env=dict(os.environ, **env),
+        )
+        try:
+            base_url = f"http://127.0.0.1:{port}"
+            asyncio.run(wait_ready(base_url))
+
+            async def main() -> Dict[str, Any]:
+                limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+                async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60.0) as client:
+                    return await run_all(client, args.transport, ctx, args)
+
+            results = asyncio.run(main())
+        finally:
+            server.terminate()
+            server.wait()
+
+    shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "transport": args.transport,
+            "async_db": args.async_db,
+            "cache": not args.no_cache,
+            "dataset": {
+                "categories": args.categories,
+                "tasks": ctx["tasks"],
+                "depth": args.depth,
+                "fanout": args.fanout,
+                "due": args.due,
+                "seed": args.seed,
+            },
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+        },
+        "scenarios": results,
+    }
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    return 0
+
+
+def compare(args: argparse.Namespace) -> int:
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.head) as f:
+        head = json.load(f)
+
+    for key in ("transport", "async_db", "cache", "dataset", "concurrency"):
+        if base["meta"].get(key) != head["meta"].get(key):
+            print(f"warning: {key} differs ({base['meta'].get(key)} -> {head['meta'].get(key)})")
+
+    regressions = 0
+    print(f"{'scenario':<22} {'p50':>18} {'p95':>18} {'p99':>18}   ({base['meta']['revision']} -> {head['meta']['revision']})")
+    for name, result in head["scenarios"].items():
+        before = base["scenarios"].get(name)
+        if before is None:
+            print(f"{name:<22} (new)")
+            continue
+        columns = []
+        for key in ("p50_ms", "p95_ms", "p99_ms"):
+            change = (result[key] - before[key]) / before[key] * 100 if before[key] else 0.0
+            columns.append(f"{result[key]:8.2f}ms {change:+6.1f}%")
+        change_p95 = (result["p95_ms"] - before["p95_ms"]) / before["p95_ms"] * 100 if before["p95_ms"] else 0.0
+        flag = ""
+        if change_p95 > args.threshold:
+            regressions += 1
+            flag = "  REGRESSION"
+        print(f"{name:<22} {' '.join(columns)}{flag}")
+
+    if regressions:
+        print(f"{regressions} scenario(s) regressed by more than {args.threshold}% at p95")
+        return 1
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="シナリオを実行して結果をJSONで出力する")
+    run_parser.add_argument("--transport", choices=TRANSPORTS, default="inprocess")
+    run_parser.add_argument(
+        "--db", help="データセットのSQLiteファイル (存在しない場合は生成する。省略時は一時ファイル)。実行はコピーに対して行う"
+    )
+    run_parser.add_argument("--categories", type=int, default=50)
+    run_parser.add_argument("--tasks", type=int, default=100_000)
+    run_parser.add_argument("--depth", type=int, default=2)
+    run_parser.add_argument("--fanout", type=int, default=3)
+    run_parser.add_argument("--due", choices=DUE_DISTRIBUTIONS, default="uniform")
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--requests", type=int, default=200, help="シナリオごとの計測するリクエスト数")
+    run_parser.add_argument("--warmup", type=int, default=20, help="シナリオごとの計測しないリクエスト数")
+    run_parser.add_argument("--concurrency", type=int, default=1)
+    run_parser.add_argument("--async-db", action="store_true", help="ASYNC_DB=trueで実行する")
+    run_parser.add_argument("--no-cache", action="store_true", help="レスポンスキャッシュを無効にする")
+    run_parser.add_argument("--only", nargs="+", help="実行するシナリオ名")
+    run_parser.add_argument("--output", help="結果のJSONを保存するファイル (省略時は標準出力)")
+    run_parser.add_argument("--worker-output", help=argparse.SUPPRESS)
+
+    compare_parser = commands.add_parser("compare", help="2つの結果のJSONを比較する")
+    compare_parser.add_argument("base")
+    compare_parser.add_argument("head")
+    compare_parser.add_argument("--threshold", type=float, default=10.0, help="p95の悪化の許容率 (%%)")
+
+    args = parser.parse_args()
+    return run(args) if args.command == "run" else compare(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,20 @@
+import csv
+import io
+import json
+from contextlib import contextmanager
 from fastapi.testclient import TestClient
 import pytest
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 
+from app.api.endpoints import tasks as tasks_endpoint
+from app.core.cache import response_cache
+from app.core.config import settings
 from app.core.database import Base, get_db
+from app.core.metrics import install_query_metrics, metrics
+from app.core.pagination import encode_cursor
+from app.crud import task_crud
 from app.main import app
 from app.models.task import Task
 from app.models.category import Category
@@ -15,6 +25,7 @@ TEST_SQLALCHEMY_DATABASE_URL = "sqlite:///./test_api.db"
 engine = create_engine(
     TEST_SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
 )
+install_query_metrics(engine)
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
@@ -30,10 +41,26 @@ def override_get_db():
 app.dependency_overrides[get_db] = override_get_db
 
 
+@contextmanager
+def count_queries():
+    """ブロック内でテスト用DBに発行されたSQL文を記録する"""
+    statements = []
+    
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
 @pytest.fixture(scope="module")
 def client():
     # テスト用のデータベースを作成
     Base.metadata.create_all(bind=engine)
+    response_cache.clear()
     
     # テストクライアントを作成
     with TestClient(app) as test_client:
@@ -170,6 +197,50 @@ def test_get_tasks(client, db):
     assert all(task["category_id"] == category_id for task in data)
 
 
+def test_get_tasks_cursor_pagination(client, db):
+    """カーソルページングAPIのテスト"""
+    for i in range(5):
+        client.post("/api/v1/tasks/", json={"title": f"カーソル{i}"})
+    
+    expected = [task["id"] for task in client.get("/api/v1/tasks/?limit=1000").json()]
+    
+    seen = []
+    response = client.get("/api/v1/tasks/?limit=2")
+    while True:
+        assert response.status_code == 200
+        seen.extend(task["id"] for task in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+        response = client.get(f"/api/v1/tasks/?limit=2&cursor={cursor}")
+    
+    assert seen == expected
+    
+    # 不正なカーソルや、値の型がソートキーと合わないカーソルは400
+    response = client.get("/api/v1/tasks/?cursor=invalid")
+    assert response.status_code == 400
+    for values in ([0, None, 5, 1], [0, None, "x", 1], [[1], None, None, 1], [0, None, datetime(2024, 1, 1), True]):
+        response = client.get(f"/api/v1/tasks/?cursor={encode_cursor(values)}")
+        assert response.status_code == 400, values
+
+
+def test_get_categories_cursor_pagination(client, db):
+    """カテゴリ一覧のカーソルページングAPIのテスト"""
+    expected = [cat["id"] for cat in client.get("/api/v1/categories/").json()]
+    
+    response = client.get("/api/v1/categories/?limit=1")
+    seen = [cat["id"] for cat in response.json()]
+    cursor = response.headers["X-Next-Cursor"]
+    response = client.get(f"/api/v1/categories/?limit=100&cursor={cursor}")
+    seen.extend(cat["id"] for cat in response.json())
+    
+    assert seen == expected
+    
+    # IDでない値 (bool) のカーソルは400
+    response = client.get(f"/api/v1/categories/?cursor={encode_cursor([True])}")
+    assert response.status_code == 400
+
+
 def test_update_task(client, db):
     """タスク更新APIのテスト"""
     # タスクを作成
@@ -277,4 +348,731 @@ def test_create_subtask(client, db):
     data = response.json()
     assert isinstance(data["subtasks"], list)
     assert len(data["subtasks"]) >= 1
-    assert any(subtask["title"] == "サブタスク" for subtask in data["subtasks"])
\ No newline at end of file
+    assert any(subtask["title"] == "サブタスク" for subtask in data["subtasks"])
+
+
+def test_reorder_tasks(client, db):
+    """タスク並び替えAPIのテスト"""
+    task_ids = [
+        client.post("/api/v1/tasks/", json={"title": f"並び替え{i}"}).json()["id"]
+        for i in range(20)
+    ]
+    new_order = list(reversed(task_ids))
+    
+    with count_queries() as statements:
+        response = client.post("/api/v1/tasks/reorder", json=new_order)
+    
+    assert response.status_code == 200
+    data = response.json()
+    assert [task["id"] for task in data] == new_order
+    assert [task["order_index"] for task in data] == list(range(20))
+    assert all(task["updated_at"] is not None for task in data)
+    # タスク数に関係なく、存在確認・更新・バージョン更新・変更シーケンスの採番・取得の5文で済む
+    assert len(statements) == 5
+    
+    # 存在しないIDが含まれる場合は何も更新しない
+    response = client.post("/api/v1/tasks/reorder", json=[task_ids[0], 999999])
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Task 999999 not found"
+    assert client.get(f"/api/v1/tasks/{task_ids[0]}").json()["order_index"] == 19
+
+
+def test_bulk_task_operations(client, db):
+    """タスク一括作成・更新・削除APIのテスト"""
+    category_id = client.post("/api/v1/categories/", json={"name": "一括操作用"}).json()["id"]
+    
+    # 一括作成: 参照先が存在しない項目だけがエラーになる
+    response = client.post(
+        "/api/v1/tasks/bulk",
+        json=[
+            {"title": "一括1", "category_id": category_id},
+            {"title": "一括2", "category_id": 999999},
+            {"title": "一括3", "parent_task_id": 999999},
+            {"title": "一括4", "priority": "high"},
+        ]
+    )
+    assert response.status_code == 200
+    results = response.json()
+    assert [result["index"] for result in results] == [0, 1, 2, 3]
+    assert [result["success"] for result in results] == [True, False, False, True]
+    assert results[1]["detail"] == "Category not found"
+    assert results[2]["detail"] == "Parent task not found"
+    first_id, fourth_id = results[0]["id"], results[3]["id"]
+    assert client.get(f"/api/v1/tasks/{first_id}").json()["category_id"] == category_id
+    
+    # 一括更新: 指定したフィールドのみ更新される
+    response = client.patch(
+        "/api/v1/tasks/bulk",
+        json=[
+            {"id": first_id, "status": True},
+            {"id": fourth_id, "parent_task_id": first_id, "title": "一括4改"},
+            {"id": 999999, "title": "存在しない"},
+            {"id": first_id, "parent_task_id": first_id},
+        ]
+    )
+    assert response.status_code == 200
+    results = response.json()
+    assert [result["success"] for result in results] == [True, True, False, False]
+    assert results[3]["detail"] == "Task cannot be its own parent"
+    first = client.get(f"/api/v1/tasks/{first_id}").json()
+    assert first["status"] is True
+    assert first["title"] == "一括1"
+    assert first["parent_task_id"] is None
+    fourth = client.get(f"/api/v1/tasks/{fourth_id}").json()
+    assert fourth["title"] == "一括4改"
+    assert fourth["parent_task_id"] == first_id
+    
+    # 一括削除: サブタスクも削除される
+    response = client.request("DELETE", "/api/v1/tasks/bulk", json=[first_id, 999999])
+    assert response.status_code == 200
+    assert [result["success"] for result in response.json()] == [True, False]
+    assert client.get(f"/api/v1/tasks/{first_id}").status_code == 404
+    assert client.get(f"/api/v1/tasks/{fourth_id}").status_code == 404
+
+
+def test_get_task_tree(client, db):
+    """サブタスクツリー取得APIのテスト"""
+    root_id = client.post("/api/v1/tasks/", json={"title": "ツリー"}).json()["id"]
+    parent_id = root_id
+    for depth in range(1, 4):
+        child_id = client.post(
+            "/api/v1/tasks/", json={"title": f"ツリー{depth}", "parent_task_id": parent_id}
+        ).json()["id"]
+        client.post("/api/v1/tasks/", json={"title": f"ツリー{depth}b", "parent_task_id": parent_id})
+        parent_id = child_id
+    
+    with count_queries() as statements:
+        response = client.get(f"/api/v1/tasks/{root_id}/tree")
+    assert response.status_code == 200
+    assert len(statements) == 1
+    
+    def depth_of(node):
+        return 1 + max((depth_of(child) for child in node["subtasks"]), default=0)
+    
+    data = response.json()
+    assert data["id"] == root_id
+    assert len(data["subtasks"]) == 2
+    assert depth_of(data) == 4
+    
+    # 深さを制限できる
+    data = client.get(f"/api/v1/tasks/{root_id}/tree?max_depth=2").json()
+    assert depth_of(data) == 3
+    data = client.get(f"/api/v1/tasks/{root_id}/tree?max_depth=0").json()
+    assert data["subtasks"] == []
+    
+    assert client.get("/api/v1/tasks/999999/tree").status_code == 404
+
+
+def test_task_hierarchy_moves(client, db):
+    """親の付け替えの循環の検出と祖先取得APIのテスト"""
+    root_id = client.post("/api/v1/tasks/", json={"title": "階層"}).json()["id"]
+    child_id = client.post("/api/v1/tasks/", json={"title": "階層1", "parent_task_id": root_id}).json()["id"]
+    grandchild_id = client.post(
+        "/api/v1/tasks/", json={"title": "階層2", "parent_task_id": child_id}
+    ).json()["id"]
+    other_id = client.post("/api/v1/tasks/", json={"title": "階層 別"}).json()["id"]
+
+    response = client.get(f"/api/v1/tasks/{grandchild_id}/ancestors")
+    assert response.status_code == 200
+    assert [task["id"] for task in response.json()] == [root_id, child_id]
+    assert client.get(f"/api/v1/tasks/{root_id}/ancestors").json() == []
+    assert client.get("/api/v1/tasks/999999/ancestors").status_code == 404
+
+    # 子孫の下には移動できない
+    response = client.put(f"/api/v1/tasks/{root_id}", json={"parent_task_id": grandchild_id})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Task cannot be moved under its own subtask"
+
+    # 部分木ごと移動すると子孫の祖先も変わる
+    response = client.put(f"/api/v1/tasks/{child_id}", json={"parent_task_id": other_id})
+    assert response.status_code == 200
+    ancestors = client.get(f"/api/v1/tasks/{grandchild_id}/ancestors").json()
+    assert [task["id"] for task in ancestors] == [other_id, child_id]
+
+    # 一括更新では前の項目の移動を踏まえて循環を判定する
+    response = client.patch("/api/v1/tasks/bulk", json=[
+        {"id": root_id, "parent_task_id": grandchild_id},
+        {"id": other_id, "parent_task_id": root_id},
+    ])
+    assert response.status_code == 200
+    results = response.json()
+    assert results[0]["success"] is True
+    assert results[1] == {
+        "index": 1, "id": other_id, "success": False, "detail": "Task cannot be moved under its own subtask"
+    }
+    ancestors = client.get(f"/api/v1/tasks/{root_id}/ancestors").json()
+    assert [task["id"] for task in ancestors] == [other_id, child_id, grandchild_id]
+
+
+def test_category_tasks_pagination_and_delete_guard(client, db):
+    """カテゴリのタスク取得APIのページングと削除ガードのテスト"""
+    category_id = client.post("/api/v1/categories/", json={"name": "大量タスク"}).json()["id"]
+    client.post(
+        "/api/v1/tasks/bulk",
+        json=[{"title": f"大量{i}", "category_id": category_id} for i in range(30)]
+    )
+    
+    # タスク件数に関係なく、ETag用のバージョンとカテゴリとタスクのページの3文で取得する
+    with count_queries() as statements:
+        response = client.get(f"/api/v1/categories/{category_id}/tasks?limit=10")
+    assert response.status_code == 200
+    assert len(statements) == 3
+    first_page = response.json()["tasks"]
+    assert len(first_page) == 10
+    
+    cursor = response.headers["X-Next-Cursor"]
+    response = client.get(f"/api/v1/categories/{category_id}/tasks?limit=100&cursor={cursor}")
+    rest = response.json()["tasks"]
+    assert len(rest) == 20
+    assert not {task["id"] for task in first_page} & {task["id"] for task in rest}
+    
+    # タスクがあるカテゴリはNOT EXISTSを条件にしたDELETEで削除を拒否する (存在確認と合わせて2文)
+    with count_queries() as statements:
+        response = client.delete(f"/api/v1/categories/{category_id}")
+    assert response.status_code == 400
+    assert len(statements) == 2
+    assert any("EXISTS" in statement for statement in statements)
+    
+    # タスクのないカテゴリは削除できる
+    empty_id = client.post("/api/v1/categories/", json={"name": "空のカテゴリ"}).json()["id"]
+    response = client.delete(f"/api/v1/categories/{empty_id}")
+    assert response.status_code == 200
+    assert client.get(f"/api/v1/categories/{empty_id}").status_code == 404
+
+
+def test_read_tasks_cache(client, db):
+    """タスク一覧のキャッシュと書き込み時の無効化のテスト"""
+    url = "/api/v1/tasks/?priority=low&limit=1000"
+    first = client.get(url)
+    assert first.headers["X-Cache"] == "MISS"
+    
+    hits = response_cache.stats()["hits"]
+    with count_queries() as statements:
+        second = client.get(url)
+    assert second.headers["X-Cache"] == "HIT"
+    assert second.json() == first.json()
+    assert statements == []
+    assert response_cache.stats()["hits"] == hits + 1
+    
+    # 書き込みのコミット後は新しい結果を返す
+    task_id = client.post("/api/v1/tasks/", json={"title": "キャッシュ", "priority": "low"}).json()["id"]
+    third = client.get(url)
+    assert third.headers["X-Cache"] == "MISS"
+    assert task_id in [task["id"] for task in third.json()]
+    
+    # カテゴリの更新はタスク一覧のキャッシュを無効化しない
+    client.post("/api/v1/categories/", json={"name": "キャッシュ用"})
+    assert client.get(url).headers["X-Cache"] == "HIT"
+    
+    response = client.get("/api/v1/cache/stats")
+    assert response.status_code == 200
+    assert response.json()["backend"] == "memory"
+
+
+def test_conditional_get(client, db):
+    """ETag / If-None-Matchによる条件付きGETのテスト"""
+    response_cache.clear()
+    url = "/api/v1/tasks/?priority=medium"
+    first = client.get(url)
+    etag = first.headers["ETag"]
+    
+    # キャッシュがない場合もバージョンの1クエリだけで304を返す
+    response_cache.clear()
+    with count_queries() as statements:
+        response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["ETag"] == etag
+    assert len(statements) == 1
+    
+    # キャッシュ済みのレスポンスもETagが一致すれば304を返す
+    client.get(url)
+    with count_queries() as statements:
+        response = client.get(url, headers={"If-None-Match": f'W/{etag}, "other"'})
+    assert response.status_code == 304
+    assert statements == []
+    
+    # 条件が違えば別のETagになる
+    assert client.get("/api/v1/tasks/?priority=high").headers["ETag"] != etag
+    
+    task_id = client.post("/api/v1/tasks/", json={"title": "ETag"}).json()["id"]
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    
+    task_etag = client.get(f"/api/v1/tasks/{task_id}").headers["ETag"]
+    assert client.get(f"/api/v1/tasks/{task_id}", headers={"If-None-Match": task_etag}).status_code == 304
+    
+    category_id = client.post("/api/v1/categories/", json={"name": "ETag"}).json()["id"]
+    categories_etag = client.get("/api/v1/categories/").headers["ETag"]
+    assert client.get("/api/v1/categories/", headers={"If-None-Match": categories_etag}).status_code == 304
+    
+    category_url = f"/api/v1/categories/{category_id}/tasks"
+    category_etag = client.get(category_url).headers["ETag"]
+    assert client.get(category_url, headers={"If-None-Match": category_etag}).status_code == 304
+    
+    # タスクの更新はカテゴリのタスク一覧のETagも変える
+    client.patch(f"/api/v1/tasks/{task_id}/status", json={"status": True})
+    assert client.get(category_url, headers={"If-None-Match": category_etag}).status_code == 200
+    assert client.get(f"/api/v1/tasks/{task_id}", headers={"If-None-Match": task_etag}).status_code == 200
+    assert client.get("/api/v1/categories/", headers={"If-None-Match": categories_etag}).status_code == 304
+
+
+def test_task_changes(client, db):
+    """差分同期のテスト"""
+    # 全件の同期をページごとに行う
+    seen = {}
+    since = None
+    while True:
+        params = {"limit": 7}
+        if since is not None:
+            params["since"] = since
+        body = client.get("/api/v1/tasks/changes", params=params).json()
+        seen.update({task["id"]: task for task in body["changed"]})
+        since = body["next_since"]
+        if not body["has_more"]:
+            break
+    assert set(seen) == {task.id for task in db.query(Task)}
+    
+    # 変更がなければ空の差分を返す
+    body = client.get("/api/v1/tasks/changes", params={"since": since}).json()
+    assert body == {"changed": [], "deleted": [], "next_since": since, "has_more": False}
+    
+    parent_id = client.post("/api/v1/tasks/", json={"title": "同期 親"}).json()["id"]
+    child_id = client.post("/api/v1/tasks/", json={"title": "同期 子", "parent_task_id": parent_id}).json()["id"]
+    other_id = client.post("/api/v1/tasks/", json={"title": "同期 その他"}).json()["id"]
+    body = client.get("/api/v1/tasks/changes", params={"since": since}).json()
+    assert [task["id"] for task in body["changed"]] == [parent_id, child_id, other_id]
+    since = body["next_since"]
+    
+    # 一括操作・並び替え・カスケード削除も差分に含まれる
+    client.patch("/api/v1/tasks/bulk", json=[{"id": other_id, "title": "同期 更新"}])
+    client.post("/api/v1/tasks/reorder", json=[other_id])
+    client.delete(f"/api/v1/tasks/{parent_id}")
+    body = client.get("/api/v1/tasks/changes", params={"since": since}).json()
+    assert [task["id"] for task in body["changed"]] == [other_id]
+    assert body["changed"][0]["title"] == "同期 更新"
+    assert body["deleted"] == [parent_id, child_id]
+    
+    assert client.get("/api/v1/tasks/changes", params={"since": "invalid"}).status_code == 400
+    for values in ([True, None], [0, False], ["1", None]):
+        assert client.get("/api/v1/tasks/changes", params={"since": encode_cursor(values)}).status_code == 400
+
+
+def test_archive_tasks(client, db):
+    """完了したタスクのアーカイブ・削除の代わりのアーカイブ・戻すAPIのテスト"""
+    parent_id = client.post("/api/v1/tasks/", json={"title": "保管 親", "status": True}).json()["id"]
+    child_id = client.post(
+        "/api/v1/tasks/", json={"title": "保管 子", "status": True, "parent_task_id": parent_id}
+    ).json()["id"]
+    open_id = client.post(
+        "/api/v1/tasks/", json={"title": "保管 未完了の孫", "parent_task_id": child_id}
+    ).json()["id"]
+    leaf_id = client.post("/api/v1/tasks/", json={"title": "保管 単独", "status": True}).json()["id"]
+    recent_id = client.post("/api/v1/tasks/", json={"title": "保管 最近", "status": True}).json()["id"]
+    client.get("/api/v1/tasks/?limit=1000")  # キャッシュさせておく
+
+    def age(*task_ids):
+        db.query(Task).filter(Task.id.in_(task_ids)).update(
+            {Task.updated_at: datetime(2000, 1, 1)}, synchronize_session=False
+        )
+        db.commit()
+
+    age(parent_id, child_id, open_id, leaf_id)
+
+    # 未完了のサブタスクが残っているタスクは移動しない
+    response = client.post("/api/v1/tasks/archive?older_than_days=30")
+    assert response.status_code == 200
+    assert response.json()["archived"] == 1
+    listed = {task["id"] for task in client.get("/api/v1/tasks/?limit=1000").json()}
+    assert leaf_id not in listed and {parent_id, child_id, open_id, recent_id} <= listed
+    assert client.get(f"/api/v1/tasks/{leaf_id}").status_code == 404
+
+    # 子から順に1件ずつのバッチで移動する
+    client.patch(f"/api/v1/tasks/{open_id}/status", json={"status": True})
+    age(open_id)
+    result = client.post("/api/v1/tasks/archive?older_than_days=30&batch_size=1").json()
+    assert (result["archived"], result["batches"]) == (3, 3)
+    archived = client.get("/api/v1/tasks/archived").json()
+    assert {task["id"] for task in archived} == {parent_id, child_id, open_id, leaf_id}
+    assert all(task["archived_at"] for task in archived)
+
+    # 親がアーカイブされたままのタスクはルートとして戻す
+    response = client.post(f"/api/v1/tasks/archived/{child_id}/restore")
+    assert response.status_code == 200
+    assert response.json()["parent_task_id"] is None
+    assert client.get(f"/api/v1/tasks/{child_id}").json()["title"] == "保管 子"
+    response = client.post(f"/api/v1/tasks/archived/{open_id}/restore")
+    assert response.json()["parent_task_id"] == child_id
+    assert [task["id"] for task in client.get(f"/api/v1/tasks/{open_id}/ancestors").json()] == [child_id]
+    assert client.post(f"/api/v1/tasks/archived/{open_id}/restore").status_code == 404
+
+    # 削除の代わりにサブタスクごとアーカイブする
+    response = client.post(f"/api/v1/tasks/{child_id}/archive")
+    assert response.json()["archived"] == 2
+    assert client.get(f"/api/v1/tasks/{open_id}").status_code == 404
+    assert client.post("/api/v1/tasks/999999/archive").status_code == 404
+
+    # アーカイブ後に同じIDのタスクができている場合は戻せない
+    db.add(Task(id=open_id, title="同じID"))
+    db.commit()
+    assert client.post(f"/api/v1/tasks/archived/{open_id}/restore").status_code == 409
+    db.query(Task).filter(Task.id == open_id).delete()
+    db.commit()
+
+    # 最大のIDのタスクをアーカイブしても、そのIDは新しいタスクに再利用されない
+    last_id = client.post("/api/v1/tasks/", json={"title": "保管 最後"}).json()["id"]
+    assert client.post(f"/api/v1/tasks/{last_id}/archive").status_code == 200
+    next_id = client.post("/api/v1/tasks/", json={"title": "保管 次", "status": True}).json()["id"]
+    assert next_id > last_id
+    assert client.post(f"/api/v1/tasks/{next_id}/archive").status_code == 200
+    age(recent_id)
+    assert client.post("/api/v1/tasks/archive?older_than_days=30").json()["archived"] == 1
+
+
+def test_restore_task_keeps_cursor_pagination(client, db):
+    """アーカイブから戻したタスクを含めてカーソルで最後までページングできる"""
+    category_id = client.post("/api/v1/categories/", json={"name": "保管 ページング"}).json()["id"]
+    task_ids = [
+        client.post("/api/v1/tasks/", json={"title": f"保管 ページ{i}", "category_id": category_id}).json()["id"]
+        for i in range(4)
+    ]
+    assert client.post(f"/api/v1/tasks/{task_ids[1]}/archive").status_code == 200
+    assert client.post(f"/api/v1/tasks/archived/{task_ids[1]}/restore").status_code == 200
+    
+    expected = [task["id"] for task in client.get(f"/api/v1/tasks/?category_id={category_id}&limit=100").json()]
+    assert sorted(expected) == task_ids
+    seen = []
+    response = client.get(f"/api/v1/tasks/?category_id={category_id}&limit=1")
+    for _ in range(len(task_ids) + 1):
+        seen.extend(task["id"] for task in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+        response = client.get(f"/api/v1/tasks/?category_id={category_id}&limit=1&cursor={cursor}")
+    assert seen == expected
+
+
+def test_search_tasks(client, db, monkeypatch):
+    """全文検索APIのテスト"""
+    category_id = client.post("/api/v1/categories/", json={"name": "検索"}).json()["id"]
+    report_id = client.post("/api/v1/tasks/", json={
+        "title": "Quarterly report", "description": "numbers for the budget review", "priority": "high",
+        "category_id": category_id,
+    }).json()["id"]
+    budget_id = client.post("/api/v1/tasks/", json={
+        "title": "Budget meeting", "description": "prepare the quarterly report draft",
+    }).json()["id"]
+    
+    # タイトルの一致が説明の一致より上位になる
+    response = client.get("/api/v1/tasks/search", params={"q": "report"})
+    assert response.status_code == 200
+    results = response.json()
+    assert [task["id"] for task in results] == [report_id, budget_id]
+    assert results[0]["snippet"] == "Quarterly <mark>report</mark>"
+    assert results[0]["rank"] <= results[1]["rank"]
+    
+    # AND検索で、最後の語は前方一致
+    assert [task["id"] for task in client.get("/api/v1/tasks/search", params={"q": "budget rev"}).json()] == [report_id]
+    assert client.get("/api/v1/tasks/search", params={"q": "budg review"}).json() == []
+    
+    # フィルタとの組み合わせ
+    response = client.get("/api/v1/tasks/search", params={"q": "report", "category_id": category_id})
+    assert [task["id"] for task in response.json()] == [report_id]
+    response = client.get("/api/v1/tasks/search", params={"q": "report", "priority": "low"})
+    assert response.json() == []
+    
+    assert "X-Search-Truncated" not in response.headers
+    
+    # 一致が多い場合は新しいタスクから順位付けの対象にし、絞り込んだことをヘッダーで伝える
+    monkeypatch.setattr(task_crud, "SEARCH_CANDIDATES", 1)
+    response = client.get("/api/v1/tasks/search", params={"q": "report", "limit": 1})
+    assert [task["id"] for task in response.json()] == [budget_id]
+    assert response.headers["X-Search-Truncated"] == "true"
+    assert task_crud.search_tasks(db, "report", skip=1) == ([], True)
+    # 順位付けの対象を超えるページは取得できない
+    response = client.get("/api/v1/tasks/search", params={"q": "report", "skip": 1, "limit": 1})
+    assert response.status_code == 400
+    monkeypatch.undo()
+    
+    # 更新・削除が索引に反映される
+    client.put(f"/api/v1/tasks/{budget_id}", json={"description": "agenda"})
+    assert [task["id"] for task in client.get("/api/v1/tasks/search", params={"q": "report"}).json()] == [report_id]
+    client.delete(f"/api/v1/tasks/{report_id}")
+    assert client.get("/api/v1/tasks/search", params={"q": "report"}).json() == []
+    
+    # FTS5の構文として解釈される文字を含んでもエラーにならない
+    assert client.get("/api/v1/tasks/search", params={"q": '"budget OR'}).status_code == 200
+    assert client.get("/api/v1/tasks/search", params={"q": ""}).status_code == 422
+
+
+class FixedDate(date):
+    """today()が決まった日付を返すdate"""
+    
+    @classmethod
+    def on(cls, day: date):
+        return type("FixedDate", (cls,), {"today": classmethod(lambda _: cls(day.year, day.month, day.day))})
+
+
+def test_task_stats(client, db, monkeypatch):
+    """ダッシュボード集計APIのテスト"""
+    today = datetime(2030, 6, 15)
+    category_id = client.post("/api/v1/categories/", json={"name": "集計"}).json()["id"]
+    before = client.get("/api/v1/tasks/stats", params={"today": "2030-06-15"}).json()
+    
+    tasks = [
+        {"title": "今日", "priority": "high", "due_date": (today + timedelta(hours=9)).isoformat(), "category_id": category_id},
+        {"title": "期限切れ", "priority": "low", "due_date": (today - timedelta(days=1)).isoformat(), "category_id": category_id},
+        {"title": "完了済み", "priority": "low", "status": True, "due_date": (today - timedelta(days=1)).isoformat()},
+        {"title": "明日", "due_date": (today + timedelta(days=1)).isoformat()},
+    ]
+    for task in tasks:
+        client.post("/api/v1/tasks/", json=task)
+    
+    with count_queries() as statements:
+        response = client.get("/api/v1/tasks/stats", params={"today": "2030-06-15"})
+    assert response.status_code == 200
+    # ETag用のバージョンと集計の2文だけで、タスクの行は転送しない
+    assert len(statements) == 2
+    stats = response.json()
+    
+    assert stats["total"] == before["total"] + 4
+    assert stats["completed"] == before["completed"] + 1
+    assert stats["incomplete"] == stats["total"] - stats["completed"]
+    assert stats["by_priority"]["low"] == before["by_priority"]["low"] + 2
+    assert stats["by_priority"]["high"] == before["by_priority"]["high"] + 1
+    assert stats["due_today"] == before["due_today"] + 1
+    assert stats["overdue"] == before["overdue"] + 1
+    assert {"category_id": category_id, "total": 2, "completed": 0} in stats["by_category"]
+    assert sum(item["total"] for item in stats["by_category"]) == stats["total"]
+    
+    # タスクの書き込みで集計のキャッシュも無効化される
+    etag = response.headers["ETag"]
+    response = client.get("/api/v1/tasks/stats", params={"today": "2030-06-15"}, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    client.post("/api/v1/tasks/", json={"title": "追加"})
+    assert client.get("/api/v1/tasks/stats", params={"today": "2030-06-15"}).json()["total"] == stats["total"] + 1
+    
+    # todayを省略した場合は、タスクの書き込みがなくても日付が変われば304にしない
+    monkeypatch.setattr(tasks_endpoint, "date", FixedDate.on(date(2030, 7, 1)))
+    etag = client.get("/api/v1/tasks/stats").headers["ETag"]
+    assert client.get("/api/v1/tasks/stats", headers={"If-None-Match": etag}).status_code == 304
+    monkeypatch.setattr(tasks_endpoint, "date", FixedDate.on(date(2030, 7, 2)))
+    response = client.get("/api/v1/tasks/stats", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json() == client.get("/api/v1/tasks/stats", params={"today": "2030-07-02"}).json()
+
+
+def test_fast_json_matches_default(client, db, monkeypatch):
+    """FAST_JSON有効時の一覧が通常の経路と同じJSONになることのテスト"""
+    client.post("/api/v1/tasks/", json={
+        "title": "高速経路", "description": "日本語と\"記号\"", "due_date": "2030-01-02T03:04:05.123456",
+    })
+    urls = ["/api/v1/tasks/?limit=5", "/api/v1/tasks/?limit=1000&priority=medium"]
+    
+    response_cache.clear()
+    expected = [client.get(url) for url in urls]
+    monkeypatch.setattr(settings, "FAST_JSON", True)
+    response_cache.clear()
+    actual = [client.get(url) for url in urls]
+    
+    for fast, default in zip(actual, expected):
+        assert fast.content == default.content
+        assert fast.headers.get("X-Next-Cursor") == default.headers.get("X-Next-Cursor")
+    
+    # カーソルでの続きの取得も同じ結果になる
+    cursor = actual[0].headers["X-Next-Cursor"]
+    fast_next = client.get(f"/api/v1/tasks/?limit=5&cursor={cursor}").json()
+    monkeypatch.setattr(settings, "FAST_JSON", False)
+    response_cache.clear()
+    assert client.get(f"/api/v1/tasks/?limit=5&cursor={cursor}").json() == fast_next
+
+
+def test_sparse_fieldsets(client, db):
+    """fieldsで指定した列だけをSELECTして返すことのテスト"""
+    for i in range(3):
+        client.post("/api/v1/tasks/", json={"title": f"一覧用{i}", "description": "長い説明" * 100})
+    
+    response_cache.clear()
+    with count_queries() as statements:
+        response = client.get("/api/v1/tasks/?limit=2&fields=title, id,status")
+    assert response.status_code == 200
+    rows = response.json()
+    assert len(rows) == 2
+    # スキーマの定義順で、指定したフィールドだけが返る
+    assert all(list(row) == ["title", "status", "id"] for row in rows)
+    task_select = [s for s in statements if "FROM tasks" in s and "data_versions" not in s]
+    assert len(task_select) == 1
+    assert "description" not in task_select[0]
+    
+    # 並び順の列を返さなくてもカーソルで続きを取得できる
+    full = client.get("/api/v1/tasks/?limit=1000").json()
+    cursor = response.headers["X-Next-Cursor"]
+    rest = client.get(f"/api/v1/tasks/?limit=1000&fields=id&cursor={cursor}").json()
+    assert [row["id"] for row in rows + rest] == [task["id"] for task in full]
+    
+    assert client.get("/api/v1/tasks/?fields=id,secret").status_code == 400
+    assert client.get("/api/v1/tasks/?fields=,").status_code == 400
+
+
+def test_export_tasks(client, db, monkeypatch):
+    """全タスクのNDJSON / CSVエクスポートのテスト"""
+    client.post("/api/v1/tasks/", json={"title": "エクスポート,\"引用\"", "description": "複数\n行", "priority": "high"})
+    monkeypatch.setattr(task_crud, "EXPORT_BATCH_SIZE", 2)
+    
+    expected = sorted(client.get("/api/v1/tasks/?limit=10000").json(), key=lambda task: task["id"])
+    
+    response = client.get("/api/v1/tasks/export")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert "tasks.ndjson" in response.headers["content-disposition"]
+    lines = response.content.decode().splitlines()
+    assert [json.loads(line) for line in lines] == expected
+    
+    # フィルタリング条件が適用される
+    response = client.get("/api/v1/tasks/export?priority=high")
+    high = [json.loads(line) for line in response.content.decode().splitlines()]
+    assert high == [task for task in expected if task["priority"] == "high"]
+    
+    response = client.get("/api/v1/tasks/export?format=csv")
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(response.content.decode())))
+    assert [int(row["id"]) for row in rows] == [task["id"] for task in expected]
+    exported = next(row for row in rows if row["title"] == "エクスポート,\"引用\"")
+    assert exported["description"] == "複数\n行"
+    assert exported["category_id"] == ""
+    
+    assert client.get("/api/v1/tasks/export?format=xml").status_code == 422
+
+
+def test_import_tasks(client, db):
+    """NDJSON / CSVからのタスクのインポートのテスト"""
+    category = client.post("/api/v1/categories/", json={"name": "インポート先"}).json()
+    parent = client.post("/api/v1/tasks/", json={"title": "インポートの親"}).json()
+    
+    body = "\n".join([
+        json.dumps({"title": "取込1", "category": "インポート先", "priority": "high"}),
+        "",
+        json.dumps({"title": "取込2", "parent_task_id": parent["id"], "id": 999999, "created_at": "2020-01-01"}),
+        "{broken",
+        json.dumps({"title": "取込3", "category": "存在しない"}),
+        json.dumps({"title": "取込4", "priority": "urgent"}),
+        json.dumps({"title": "取込5", "parent_task_id": 999999}),
+        json.dumps(["not", "an", "object"]),
+    ])
+    with count_queries() as statements:
+        response = client.post("/api/v1/tasks/import?chunk_size=3", data=body.encode())
+    assert response.status_code == 200
+    result = response.json()
+    assert result["imported"] == 2
+    assert result["failed"] == 5
+    assert [error["line"] for error in result["errors"]] == [4, 5, 6, 7, 8]
+    assert "priority" in result["errors"][2]["detail"]
+    # カテゴリ名の対応表は1回だけ読み込む
+    assert len([s for s in statements if "FROM categories" in s]) == 1
+    
+    tasks = {task["title"]: task for task in client.get("/api/v1/tasks/?limit=10000").json()}
+    assert tasks["取込1"]["category_id"] == category["id"]
+    assert tasks["取込1"]["priority"] == "high"
+    assert tasks["取込2"]["parent_task_id"] == parent["id"]
+    assert tasks["取込2"]["id"] != 999999
+    
+    # エクスポートしたCSVをそのまま取り込める
+    exported = client.get(f"/api/v1/tasks/export?format=csv&category_id={category['id']}").content
+    result = client.post("/api/v1/tasks/import?format=csv", data=exported).json()
+    assert (result["imported"], result["failed"], result["errors"]) == (1, 0, [])
+    copies = client.get(f"/api/v1/tasks/?limit=10000&category_id={category['id']}").json()
+    assert [task["title"] for task in copies] == ["取込1", "取込1"]
+    assert copies[1]["priority"] == "high"
+    
+    assert client.post("/api/v1/tasks/import", data=b"\xff\xfe").status_code == 400
+    
+    # 復号できない行があれば、前のチャンクも含めて何も作成しない
+    total = len(client.get("/api/v1/tasks/?limit=10000").json())
+    body = "".join(json.dumps({"title": f"復号{i}"}) + "\n" for i in range(3)).encode() + b'{"title": "\xe3\x81"}\n'
+    response = client.post("/api/v1/tasks/import?chunk_size=1", data=body)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Request body must be UTF-8 (line 4)"
+    assert len(client.get("/api/v1/tasks/?limit=10000").json()) == total
+
+
+def test_query_metrics(client, db, monkeypatch, caplog):
+    """リクエストごとのSQLの計測 (Server-Timing / /metrics / 遅いSQLのログ) のテスト"""
+    metrics.clear()
+    response_cache.clear()
+    with count_queries() as statements:
+        response = client.get("/api/v1/tasks/?limit=5")
+    timing = response.headers["server-timing"]
+    assert f'desc="{len(statements)} queries"' in timing
+    assert "db-slowest;dur=" in timing and "total;dur=" in timing
+    
+    client.get("/api/v1/tasks/999999")
+    body = client.get("/metrics").text
+    assert 'todo_http_requests_total{method="GET",route="/api/v1/tasks/",status="200"} 1' in body
+    # ラベルには実際のパスではなくルートのテンプレートを使う
+    assert 'todo_http_requests_total{method="GET",route="/api/v1/tasks/{task_id}",status="404"} 1' in body
+    assert f'todo_db_queries_total{{method="GET",route="/api/v1/tasks/"}} {len(statements)}' in body
+    assert 'todo_http_request_duration_seconds_count{method="GET",route="/api/v1/tasks/"} 1' in body
+    
+    monkeypatch.setattr(settings, "SLOW_QUERY_SECONDS", 0.0)
+    with caplog.at_level("WARNING", logger="app.core.metrics"):
+        client.get("/api/v1/tasks/stats")
+    assert any("slow query" in record.message and "/api/v1/tasks/stats" in record.message for record in caplog.records)
+    assert "todo_db_slow_queries_total 0" not in client.get("/metrics").text
+
+
+def test_write_endpoint_query_counts(client, db):
+    """書き込み系エンドポイントが発行するSQL文の数 (存在確認の重複やコミット後のrefreshが戻らないこと)"""
+    category_id = client.post("/api/v1/categories/", json={"name": "件数確認用"}).json()["id"]
+    other_category_id = client.post("/api/v1/categories/", json={"name": "件数確認用2"}).json()["id"]
+    empty_category_id = client.post("/api/v1/categories/", json={"name": "件数確認用 (空)"}).json()["id"]
+    task = client.post("/api/v1/tasks/", json={"title": "件数確認", "category_id": category_id}).json()
+    parent_id = client.post("/api/v1/tasks/", json={"title": "件数確認の親"}).json()["id"]
+    victim_id = client.post("/api/v1/tasks/", json={"title": "件数確認の削除"}).json()["id"]
+    for _ in range(3):
+        client.post("/api/v1/tasks/", json={"title": "件数確認の削除の子", "parent_task_id": victim_id})
+    response = client.post("/api/v1/tasks/bulk", json=[{"title": "件数確認の一括1"}, {"title": "件数確認の一括2"}])
+    bulk_ids = [result["id"] for result in response.json()]
+    
+    # (説明, メソッド, パス, 引数, ステータス, SQL文の数)
+    cases = [
+        ("タスク作成", "post", "/api/v1/tasks/", {"json": {"title": "件数"}}, 200, 4),
+        ("参照ありのタスク作成", "post", "/api/v1/tasks/",
+         {"json": {"title": "件数", "category_id": category_id, "parent_task_id": parent_id}}, 200, 5),
+        ("存在しない参照", "post", "/api/v1/tasks/", {"json": {"title": "件数", "category_id": 99999}}, 404, 1),
+        ("一括作成", "post", "/api/v1/tasks/bulk",
+         {"json": [{"title": "件数", "category_id": category_id}, {"title": "件数", "parent_task_id": parent_id}]}, 200, 5),
+        ("インポート", "post", "/api/v1/tasks/import",
+         {"data": '{"title": "件数"}\n{"title": "件数"}\n'.encode()}, 200, 4),
+        ("一括更新", "patch", "/api/v1/tasks/bulk",
+         {"json": [{"id": bulk_ids[0], "priority": "high"}, {"id": bulk_ids[1], "category_id": category_id}]}, 200, 6),
+        ("タスク更新", "put", f"/api/v1/tasks/{task['id']}", {"json": {"title": "件数2"}}, 200, 5),
+        ("参照を変えないタスク更新", "put", f"/api/v1/tasks/{task['id']}",
+         {"json": {"title": "件数3", "category_id": category_id}}, 200, 5),
+        # 親の変更は自身と子孫の経路を付け替えるUPDATEが1文増える
+        ("参照を変えるタスク更新", "put", f"/api/v1/tasks/{task['id']}",
+         {"json": {"category_id": other_category_id, "parent_task_id": parent_id}}, 200, 7),
+        ("存在しないタスクの更新", "put", "/api/v1/tasks/99999", {"json": {"title": "件数"}}, 404, 1),
+        ("ステータス更新", "patch", f"/api/v1/tasks/{task['id']}/status", {"json": {"status": True}}, 200, 5),
+        ("並び替え", "post", "/api/v1/tasks/reorder", {"json": [parent_id, task["id"]]}, 200, 5),
+        # 削除はサブタスクの件数によらず、削除記録のINSERT・通知用のSELECT・DELETEの3文で行う
+        ("タスク削除", "delete", f"/api/v1/tasks/{victim_id}", {}, 200, 7),
+        ("一括削除", "delete", "/api/v1/tasks/bulk", {"json": bulk_ids}, 200, 7),
+        ("カテゴリ作成", "post", "/api/v1/categories/", {"json": {"name": "件数確認用3"}}, 200, 4),
+        ("カテゴリ更新", "put", f"/api/v1/categories/{other_category_id}", {"json": {"name": "件数確認用4"}}, 200, 5),
+        ("タスクがあるカテゴリの削除", "delete", f"/api/v1/categories/{category_id}", {}, 400, 2),
+        ("カテゴリ削除", "delete", f"/api/v1/categories/{empty_category_id}", {}, 200, 2),
+        ("存在しないカテゴリの削除", "delete", "/api/v1/categories/99999", {}, 404, 2),
+    ]
+    for description, method, path, kwargs, status_code, expected in cases:
+        with count_queries() as statements:
+            response = client.request(method.upper(), path, **kwargs)
+        assert response.status_code == status_code, description
+        assert len(statements) == expected, (description, statements)
+    
+    # コミット後にrefreshしなくても、DB側で生成した値がレスポンスに含まれる
+    response = client.put(f"/api/v1/tasks/{task['id']}", json={"title": "件数4"})
+    assert response.json()["title"] == "件数4"
+    assert response.json()["created_at"] == task["created_at"]
+    assert response.json()["updated_at"] is not None
+    assert client.get(f"/api/v1/tasks/{task['id']}").json() == response.json()
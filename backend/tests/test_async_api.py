@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.api.api import build_api_router
+from app.core.cache import response_cache
+from app.core.database import Base, create_async_session_factory, get_async_db, get_db
+from app.core.pagination import encode_cursor
+
+
+@pytest.fixture(scope="module")
+def client(tmp_path_factory):
+    # 非同期ルーターを組み込んだアプリを、同期・非同期の両エンジンで同じDBに接続する
+    path = tmp_path_factory.mktemp("async") / "test_async_api.db"
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    response_cache.clear()
+    TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    async_engine, TestingAsyncSessionLocal = create_async_session_factory(f"sqlite+aiosqlite:///{path}")
+    
+    def override_get_db():
+        db = TestingSessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+    
+    async def override_get_async_db():
+        async with TestingAsyncSessionLocal() as db:
+            yield db
+    
+    app = FastAPI()
+    app.include_router(build_api_router(async_db=True), prefix="/api/v1")
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    
+    with TestClient(app) as test_client:
+        yield test_client
+    
+    asyncio.get_event_loop().run_until_complete(async_engine.dispose())
+    Base.metadata.drop_all(bind=engine)
+
+
+def test_async_handlers_replace_sync_routes(client):
+    """同じパス・メソッドのルートだけが非同期ハンドラーに置き換わることのテスト"""
+    endpoints = {
+        (route.path, method): route.endpoint
+        for route in client.app.routes if hasattr(route, "methods")
+        for method in route.methods
+    }
+    assert asyncio.iscoroutinefunction(endpoints[("/api/v1/tasks/", "GET")])
+    assert asyncio.iscoroutinefunction(endpoints[("/api/v1/tasks/{task_id}", "PUT")])
+    assert asyncio.iscoroutinefunction(endpoints[("/api/v1/categories/{category_id}", "DELETE")])
+    assert not asyncio.iscoroutinefunction(endpoints[("/api/v1/tasks/bulk", "POST")])
+
+
+def test_async_task_crud(client):
+    """非同期ハンドラーでのタスク・カテゴリ操作のテスト"""
+    category_id = client.post("/api/v1/categories/", json={"name": "非同期"}).json()["id"]
+    assert client.post("/api/v1/categories/", json={"name": "非同期"}).status_code == 400
+    
+    response = client.post("/api/v1/tasks/", json={"title": "非同期タスク", "category_id": category_id})
+    assert response.status_code == 200
+    task_id = response.json()["id"]
+    
+    response = client.post("/api/v1/tasks/", json={"title": "子", "parent_task_id": task_id})
+    child_id = response.json()["id"]
+    assert client.post("/api/v1/tasks/", json={"title": "x", "category_id": 999999}).status_code == 404
+    
+    response = client.put(f"/api/v1/tasks/{task_id}", json={"title": "更新済み"})
+    assert response.json()["title"] == "更新済み"
+    assert client.put(f"/api/v1/tasks/{task_id}", json={"parent_task_id": task_id}).status_code == 400
+    
+    response = client.patch(f"/api/v1/tasks/{task_id}/status", json={"status": True})
+    assert response.json()["status"] is True
+    
+    response = client.get(f"/api/v1/tasks/?category_id={category_id}")
+    assert [task["id"] for task in response.json()] == [task_id]
+    assert client.get(f"/api/v1/tasks/?cursor={encode_cursor([0, None, 5, 1])}").status_code == 400
+    assert client.get(f"/api/v1/categories/?cursor={encode_cursor([True])}").status_code == 400
+    
+    # 同期ハンドラーのままのエンドポイントも同じDBを参照する
+    tree = client.get(f"/api/v1/tasks/{task_id}/tree").json()
+    assert [subtask["id"] for subtask in tree["subtasks"]] == [child_id]
+    
+    assert client.delete(f"/api/v1/categories/{category_id}").status_code == 400
+    assert client.delete(f"/api/v1/tasks/{task_id}").status_code == 200
+    assert client.get(f"/api/v1/tasks/{child_id}").status_code == 404
+    assert client.delete(f"/api/v1/categories/{category_id}").status_code == 200
@@ -0,0 +1,56 @@
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.cache import MemoryCacheBackend, ResponseCache, response_cache
+from app.core.changes import get_versions, mark_changed
+from app.core.database import Base
+
+
+def test_memory_backend_lru_and_ttl():
+    """プロセス内キャッシュのLRU削除とTTLのテスト"""
+    backend = MemoryCacheBackend(max_entries=2)
+    backend.set("a", 1, ttl=60)
+    backend.set("b", 2, ttl=60)
+    assert backend.get("a") == 1  # aを最近使ったものにする
+    backend.set("c", 3, ttl=60)
+    assert backend.get("b") is None
+    assert backend.get("a") == 1
+    
+    backend.set("d", 4, ttl=0.01)
+    time.sleep(0.02)
+    assert backend.get("d") is None
+
+
+def test_response_cache_invalidation_by_namespace():
+    """名前空間ごとに無効化されることのテスト"""
+    cache = ResponseCache(MemoryCacheBackend(), ttl=60)
+    cache.store("tasks", {"limit": 1}, [{"id": 1}])
+    cache.store("categories", {"limit": 1}, [{"id": 2}])
+    
+    cache.invalidate("tasks")
+    
+    assert cache.load("tasks", {"limit": 1}) is None
+    assert cache.load("categories", {"limit": 1}).body == b'[{"id":2}]'
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_mark_changed_invalidates_only_after_commit():
+    """コミットした場合のみ無効化し、ロールバックした場合は無効化しないことのテスト"""
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    invalidations = response_cache.invalidations
+    
+    mark_changed(session, "tasks")
+    session.rollback()
+    assert response_cache.invalidations == invalidations
+    
+    mark_changed(session, "tasks")
+    session.commit()
+    assert response_cache.invalidations == invalidations + 1
+    # 同じトランザクションでテーブルのバージョンも進む
+    assert get_versions(session, ["tasks"]) == {"tasks": 1}
+    session.close()
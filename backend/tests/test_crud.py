@@ -1,4 +1,6 @@
 import pytest
+from sqlalchemy import event, insert
+from sqlalchemy.dialects import postgresql
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
 
@@ -7,6 +9,8 @@ from app.schemas.task import TaskCreate, TaskUpdate
 from app.schemas.category import CategoryCreate, CategoryUpdate
 from app.models.task import Task
 from app.models.category import Category
+from app.models.task_tombstone import TaskTombstone
+from app.core.events import event_hub
 from .test_models import db_session  # db_sessionフィクスチャを再利用
 
 
@@ -210,4 +214,178 @@ def test_create_subtask(db_session: Session):
     # 親タスクを取得して関連するサブタスクを確認
     parent_with_subtasks = task_crud.get_task_with_subtasks(db_session, parent_task.id)
     assert len(parent_with_subtasks.subtasks) == 1
-    assert parent_with_subtasks.subtasks[0].title == "サブタスク"
\ No newline at end of file
+    assert parent_with_subtasks.subtasks[0].title == "サブタスク"
+
+
+def test_bulk_create_tasks(db_session: Session, monkeypatch):
+    """一括作成が複数行のINSERT文ごとに採番したIDを入力と同じ順序で返すことのテスト"""
+    monkeypatch.setattr(task_crud, "BULK_INSERT_ROWS", 2)
+    parent = task_crud.create_task(db_session, TaskCreate(title="一括の親"))
+    tasks = [TaskCreate(title=f"一括{i}", parent_task_id=parent.id if i % 2 else None) for i in range(5)]
+    
+    statements = []
+    event.listen(db_session.bind, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    task_ids = task_crud.bulk_create_tasks(db_session, tasks)
+    
+    assert sum(statement.startswith("INSERT INTO tasks") for statement in statements) == 3
+    created = {task.id: task for task in db_session.query(Task).filter(Task.id.in_(task_ids))}
+    assert [created[task_id].title for task_id in task_ids] == [f"一括{i}" for i in range(5)]
+    assert [created[task_id].path for task_id in task_ids] == ["/", f"/{parent.id}/"] * 2 + ["/"]
+    assert all(created[task_id].created_at is not None for task_id in task_ids)
+
+
+def test_get_tasks_keyset_pagination(db_session: Session):
+    """カーソル (キーセット) ページングがオフセットと同じ順序を返すことのテスト"""
+    due = datetime(2030, 1, 1)
+    # 同じ秒に作成された行やdue_dateがNULLの行を混ぜる
+    for i in range(7):
+        task_crud.create_task(db_session, TaskCreate(
+            title=f"ページ{i}",
+            order_index=i % 2,
+            due_date=None if i % 3 == 0 else due + timedelta(days=i % 2)
+        ))
+    
+    expected = [task.id for task in task_crud.get_tasks(db_session, limit=100)]
+    
+    seen = []
+    after = None
+    while True:
+        page = task_crud.get_tasks(db_session, limit=3, after=after)
+        seen.extend(task.id for task in page)
+        if len(page) < 3:
+            break
+        after = task_crud.task_sort_key(page[-1])
+    
+    assert seen == expected
+    
+    # NULLを末尾に並べるDB (PostgreSQL) でもカーソルの条件と同じくNULLを先頭に並べる
+    statement = task_crud.select_tasks("postgresql", after=task_crud.task_sort_key(page[-1]))
+    assert str(statement.compile(dialect=postgresql.dialect())).count("ASC NULLS FIRST") == 4
+
+
+def _insert_tree(db_session: Session, size: int, fanout: int) -> dict:
+    """IDがヒープ順 (iの親は(i - 2) // fanout + 1) の木を直接投入し、IDから親への対応を返す"""
+    parents = {1: None}
+    paths = {1: "/"}
+    rows = [{"id": 1, "title": "ルート", "parent_task_id": None, "path": "/"}]
+    for task_id in range(2, size + 1):
+        parent_id = (task_id - 2) // fanout + 1
+        parents[task_id] = parent_id
+        paths[task_id] = f"{paths[parent_id]}{parent_id}/"
+        rows.append({
+            "id": task_id, "title": f"ノード{task_id}", "parent_task_id": parent_id, "path": paths[task_id]
+        })
+    db_session.execute(insert(Task.__table__), rows)
+    db_session.commit()
+    return parents
+
+
+def _expected_paths(parents: dict) -> dict:
+    paths = {}
+    
+    def path_of(task_id):
+        if task_id not in paths:
+            parent_id = parents[task_id]
+            paths[task_id] = "/" if parent_id is None else f"{path_of(parent_id)}{parent_id}/"
+        return paths[task_id]
+    
+    for task_id in parents:
+        path_of(task_id)
+    return paths
+
+
+def _subtree_size(parents: dict, task_id: int) -> int:
+    children = {}
+    for child_id, parent_id in parents.items():
+        children.setdefault(parent_id, []).append(child_id)
+    stack, count = [task_id], 0
+    while stack:
+        count += 1
+        stack.extend(children.get(stack.pop(), []))
+    return count - 1
+
+
+def test_task_hierarchy_on_large_tree(db_session: Session):
+    """10万件の木で、子孫・祖先・循環の確認がそれぞれ1クエリで行えることと、親の変更で経路が保たれることのテスト"""
+    parents = _insert_tree(db_session, 100_000, fanout=10)
+    statements = []
+    event.listen(db_session.bind, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    
+    def queries(run):
+        statements.clear()
+        result = run()
+        return result, len(statements)
+    
+    # 子孫の件数
+    assert queries(lambda: task_crud.count_descendants(db_session, 1)) == (99_999, 1)
+    assert queries(lambda: task_crud.count_descendants(db_session, 2)) == (_subtree_size(parents, 2), 1)
+    assert queries(lambda: task_crud.count_descendants(db_session, 100_000)) == (0, 1)
+    
+    # 祖先 (ルートから順)
+    leaf = task_crud.get_task(db_session, 100_000)
+    ancestors, count = queries(lambda: task_crud.get_ancestors(db_session, leaf))
+    expected = []
+    parent_id = parents[100_000]
+    while parent_id is not None:
+        expected.insert(0, parent_id)
+        parent_id = parents[parent_id]
+    assert [task.id for task in ancestors] == expected
+    assert count == 1
+    
+    # 子孫を親にすると循環するため拒否する (親の経路を1クエリで引くだけで判定する)
+    branch = task_crud.get_task(db_session, expected[1])
+    detail, count = queries(lambda: task_crud.check_references(db_session, parent_task_id=100_000, task=branch))
+    assert (detail, count) == (task_crud.TASK_CYCLE_ERROR, 1)
+    assert task_crud.check_references(db_session, parent_task_id=3, task=branch) is None
+    
+    # 深さを指定したツリーの取得
+    tree = task_crud.get_task_tree(db_session, 1, max_depth=2)
+    assert len(tree.subtasks) == 10
+    assert sum(len(child.subtasks) for child in tree.subtasks) == 100
+    assert all(grandchild.subtasks == [] for child in tree.subtasks for grandchild in child.subtasks)
+    
+    # 部分木を別の親の下に移動すると、子孫の経路も付け替えられる
+    moved_size = _subtree_size(parents, branch.id)
+    before = task_crud.count_descendants(db_session, 3)
+    task_crud.update_task(db_session, branch.id, TaskUpdate(parent_task_id=3))
+    parents[branch.id] = 3
+    assert task_crud.count_descendants(db_session, 3) == before + moved_size + 1
+    
+    # ルートに戻す
+    task_crud.update_task(db_session, 5, TaskUpdate(parent_task_id=None))
+    parents[5] = None
+    
+    actual = dict(db_session.query(Task.id, Task.path))
+    assert actual == _expected_paths(parents)
+
+
+def test_delete_task_subtree(db_session: Session, monkeypatch):
+    """サブタスクの件数によらず一定の文数で部分木を削除し、削除記録と通知を全件分作ることのテスト"""
+    parents = _insert_tree(db_session, 20_000, fanout=3)
+    statements = []
+    event.listen(db_session.bind, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    published = []
+    monkeypatch.setattr(event_hub, "publish", lambda *events: published.extend(events))
+    
+    deleted_size = _subtree_size(parents, 2) + 1
+    root = task_crud.get_task(db_session, 2)
+    statements.clear()
+    assert task_crud.delete_task(db_session, root.id, db_task=root)
+    # 削除記録のINSERT・通知用のSELECT・DELETEと、コミット時のdata_versionsの更新・作成 (初回のみ) と採番2文
+    assert len(statements) == 7
+    
+    remaining = dict(db_session.query(Task.id, Task.parent_task_id))
+    assert len(remaining) == 20_000 - deleted_size
+    assert all(parent_id is None or parent_id in remaining for parent_id in remaining.values())
+    tombstones = db_session.query(TaskTombstone.task_id, TaskTombstone.change_seq).all()
+    assert len(tombstones) == deleted_size
+    assert {task_id for task_id, _ in tombstones}.isdisjoint(remaining)
+    assert all(change_seq is not None for _, change_seq in tombstones)
+    
+    assert sorted(event.id for event in published) == sorted(
+        task_id for task_id in parents if task_id not in remaining
+    )
+    
+    # 複数の部分木 (一方が他方の子孫でもよい) の一括削除
+    task_crud.bulk_delete_tasks(db_session, [3, 10, 4])
+    assert db_session.query(Task).count() == 1
@@ -0,0 +1,57 @@
+from sqlalchemy import text
+from sqlalchemy.pool import QueuePool
+
+from app.core.config import Settings
+from app.core.database import create_db_engine
+
+
+def test_sqlite_pragmas_and_pool(tmp_path):
+    """SQLiteの接続にPRAGMAとプール設定が適用されることのテスト"""
+    config = Settings(DB_POOL_SIZE=3, DB_MAX_OVERFLOW=1, SQLITE_CACHE_SIZE=-2000)
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'pragma.db'}", config)
+    
+    assert isinstance(engine.pool, QueuePool)
+    assert engine.pool.size() == 3
+    
+    with engine.connect() as connection:
+        assert connection.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert connection.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        assert connection.execute(text("PRAGMA cache_size")).scalar() == -2000
+        assert connection.execute(text("PRAGMA busy_timeout")).scalar() == config.SQLITE_BUSY_TIMEOUT
+    engine.dispose()
+
+
+def test_wal_readers_do_not_wait_for_writer(tmp_path):
+    """書き込みトランザクション中でも別の接続から読み取れることのテスト"""
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'wal.db'}", Settings(SQLITE_BUSY_TIMEOUT=0))
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY)"))
+        connection.execute(text("INSERT INTO items DEFAULT VALUES"))
+    
+    # ロールバックジャーナルでは排他ロック中の読み取りは"database is locked"になる
+    writer = engine.raw_connection()
+    cursor = writer.cursor()
+    cursor.execute("BEGIN EXCLUSIVE")
+    cursor.execute("INSERT INTO items DEFAULT VALUES")
+    try:
+        with engine.connect() as reader:
+            assert reader.execute(text("SELECT count(*) FROM items")).scalar() == 1
+    finally:
+        writer.rollback()
+        writer.close()
+    engine.dispose()
+
+
+def test_memory_sqlite_engine():
+    """インメモリDBではWAL等を設定せずにエンジンを作成できることのテスト"""
+    engine = create_db_engine("sqlite://")
+    with engine.connect() as connection:
+        assert connection.execute(text("PRAGMA journal_mode")).scalar() == "memory"
+
+
+def test_query_metrics_follow_setting():
+    """METRICS_ENABLED=falseの場合はSQLの計測のイベントを登録しないことのテスト"""
+    enabled = create_db_engine("sqlite://", Settings(METRICS_ENABLED=True))
+    disabled = create_db_engine("sqlite://", Settings(METRICS_ENABLED=False))
+    assert len(enabled.dispatch.after_cursor_execute) == 1
+    assert len(disabled.dispatch.after_cursor_execute) == 0
@@ -0,0 +1,169 @@
+import asyncio
+import threading
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.api.endpoints.stream import format_sse
+from app.core.change_feed import change_feed
+from app.core.database import Base
+from app.core.events import EventHub, category_event, event_hub, task_event
+from app.crud import category_crud, task_crud
+from app.schemas.category import CategoryCreate
+from app.schemas.task import TaskCreate, TaskUpdate
+
+
+def run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+def test_coalescing_and_filters():
+    """連続した通知がまとめられ、購読の条件で絞り込まれることのテスト"""
+    async def scenario():
+        hub = EventHub()
+        everything = hub.subscribe()
+        work = hub.subscribe(categories=[1])
+        categories_only = hub.subscribe(types=["category"])
+        
+        hub.publish(
+            task_event("created", 10, 1),
+            task_event("updated", 10, 1),
+            task_event("updated", 11, 2),
+            task_event("updated", 11, 2),
+            task_event("created", 12, 2),
+            task_event("deleted", 12, 2),
+            task_event("updated", 13, 2, previous_category_id=1),
+            category_event("updated", 1),
+        )
+        await asyncio.sleep(0)
+        return [await subscription.next_batch(timeout=1) for subscription in (everything, work, categories_only)]
+    
+    everything, work, categories_only = run(scenario())
+    assert everything == [
+        {"type": "task", "action": "created", "id": 10, "category_id": 1},
+        {"type": "task", "action": "updated", "id": 11, "category_id": 2},
+        {"type": "task", "action": "updated", "id": 13, "category_id": 2},
+        {"type": "category", "action": "updated", "id": 1},
+    ]
+    # カテゴリ1から移動したタスクは移動元の購読者にも届く
+    assert [(event["type"], event["id"]) for event in work] == [("task", 10), ("task", 13), ("category", 1)]
+    assert categories_only == [{"type": "category", "action": "updated", "id": 1}]
+
+
+def test_backpressure_and_threads():
+    """別スレッドからの通知と、溢れた場合のresyncのテスト"""
+    async def scenario():
+        hub = EventHub()
+        subscription = hub.subscribe()
+        subscription.max_pending = 3
+        
+        thread = threading.Thread(target=hub.publish, args=[task_event("updated", i, None) for i in range(5)])
+        thread.start()
+        thread.join()
+        first = await subscription.next_batch(timeout=1)
+        
+        hub.publish(task_event("updated", 1, None))
+        second = await subscription.next_batch(timeout=1)
+        timeout = await subscription.next_batch(timeout=0.01)
+        
+        hub.unsubscribe(subscription)
+        return first, second, timeout, hub.subscriber_count
+    
+    first, second, timeout, subscriber_count = run(scenario())
+    assert first == [{"type": "resync"}]
+    assert second == [{"type": "task", "action": "updated", "id": 1, "category_id": None}]
+    assert timeout == []
+    assert subscriber_count == 0
+
+
+def test_crud_publishes_after_commit():
+    """CRUDの書き込みがコミット後に通知されることのテスト"""
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    loop = asyncio.new_event_loop()
+    
+    async def subscribe():
+        return event_hub.subscribe()
+    
+    subscription = loop.run_until_complete(subscribe())
+    try:
+        category_id = category_crud.create_category(db, CategoryCreate(name="通知")).id
+        task_id = task_crud.create_task(db, TaskCreate(title="通知", category_id=category_id)).id
+        task_crud.update_task(db, task_id, TaskUpdate(category_id=None))
+        other_id, = task_crud.bulk_create_tasks(db, [TaskCreate(title="通知2")])
+        task_crud.delete_task(db, other_id)
+        batch = loop.run_until_complete(subscription.next_batch(timeout=1))
+    finally:
+        event_hub.unsubscribe(subscription)
+        loop.close()
+        db.close()
+    
+    # 作成直後の更新は作成にまとめられ、送信前に作成・削除されたタスクは届かない
+    assert batch == [
+        {"type": "category", "action": "created", "id": category_id},
+        {"type": "task", "action": "created", "id": task_id, "category_id": category_id},
+    ]
+
+
+def test_change_feed_delivers_other_processes_changes(monkeypatch):
+    """他のプロセスがコミットした変更をDBから読んで通知し、このプロセスの変更は二重に通知しないことのテスト"""
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    loop = asyncio.new_event_loop()
+    
+    async def subscribe():
+        return event_hub.subscribe()
+    
+    def next_batch():
+        return loop.run_until_complete(subscription.next_batch(timeout=0.1))
+    
+    subscription = loop.run_until_complete(subscribe())
+    try:
+        kept_id = task_crud.create_task(db, TaskCreate(title="残す")).id
+        deleted_id = task_crud.create_task(db, TaskCreate(title="消す")).id
+        change_feed.poll(db)  # 購読者がいる間の最初の確認から通知する
+        next_batch()
+        
+        # このプロセスの書き込みはCRUDが通知するだけ
+        task_crud.update_task(db, kept_id, TaskUpdate(title="更新"))
+        change_feed.poll(db)
+        local = [next_batch(), next_batch()]
+        
+        # 他のプロセスの書き込み (通知は別のhubに送られ、進めたバージョンは記録されない)
+        with monkeypatch.context() as patch:
+            patch.setattr(task_crud, "event_hub", EventHub())
+            patch.setattr(category_crud, "event_hub", EventHub())
+            patch.setattr(change_feed, "record_local", lambda versions: None)
+            created_id = task_crud.create_task(db, TaskCreate(title="作成")).id
+            task_crud.update_task(db, kept_id, TaskUpdate(title="再更新"))
+            task_crud.delete_task(db, deleted_id)
+            change_feed.poll(db)
+            remote = next_batch()
+            category_crud.create_category(db, CategoryCreate(name="別プロセス"))
+            change_feed.poll(db)
+            categories = next_batch()
+    finally:
+        event_hub.unsubscribe(subscription)
+        change_feed.poll(db)
+        loop.close()
+        db.close()
+    
+    assert local == [[{"type": "task", "action": "updated", "id": kept_id, "category_id": None}], []]
+    assert sorted(remote, key=lambda event: event["id"]) == [
+        {"type": "task", "action": "updated", "id": kept_id, "category_id": None},
+        {"type": "task", "action": "deleted", "id": deleted_id, "category_id": None},
+        {"type": "task", "action": "created", "id": created_id, "category_id": None},
+    ]
+    # カテゴリは変更を記録していないため、一覧の取得し直しを求める
+    assert categories == [{"type": "resync"}]
+    assert not change_feed.active
+
+
+def test_format_sse():
+    assert format_sse("changes", [{"id": 1}]) == 'event: changes\ndata: [{"id":1}]\n\n'
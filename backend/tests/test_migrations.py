@@ -0,0 +1,77 @@
+import os
+
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.config import Config
+from alembic.migration import MigrationContext
+from sqlalchemy import create_engine, text
+
+from app.core.database import Base
+from app.models.task import Task  # noqa: F401
+from app.models.task import is_task_search_table
+from app.models.category import Category  # noqa: F401
+from app.models.data_version import DataVersion  # noqa: F401
+from app.models.task_tombstone import TaskTombstone  # noqa: F401
+from app.models.archived_task import ArchivedTask  # noqa: F401
+
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def alembic_config(url):
+    config = Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BACKEND_DIR, "alembic"))
+    config.set_main_option("sqlalchemy.url", url)
+    return config
+
+
+def test_migrations_match_models(tmp_path):
+    """マイグレーションの最新版がモデル定義と一致することのテスト"""
+    url = f"sqlite:///{tmp_path / 'migration.db'}"
+    config = alembic_config(url)
+    
+    command.upgrade(config, "head")
+    
+    engine = create_engine(url)
+    with engine.connect() as connection:
+        context = MigrationContext.configure(connection, opts={
+            "include_object": lambda object, name, type_, *args: not (
+                type_ == "table" and (is_task_search_table(name) or name == "sqlite_sequence")
+            ),
+        })
+        diff = compare_metadata(context, Base.metadata)
+    assert diff == []
+    
+    # ダウングレードも通ること
+    command.downgrade(config, "base")
+
+
+def test_search_triggers_survive_downgrade(tmp_path):
+    """tasksを作り直すマイグレーションを戻しても、全文検索の索引を同期するトリガーが残ることのテスト"""
+    url = f"sqlite:///{tmp_path / 'migration.db'}"
+    config = alembic_config(url)
+    engine = create_engine(url)
+    
+    def triggers():
+        with engine.connect() as connection:
+            return set(connection.execute(text("SELECT name FROM sqlite_master WHERE type = 'trigger'")).scalars())
+    
+    def search(word):
+        with engine.begin() as connection:
+            return connection.execute(
+                text("SELECT rowid FROM tasks_fts WHERE tasks_fts MATCH :word"), {"word": word}
+            ).scalars().all()
+    
+    expected = {"tasks_fts_ai", "tasks_fts_ad", "tasks_fts_au"}
+    command.upgrade(config, "head")
+    command.downgrade(config, "0005")
+    assert triggers() == expected
+    with engine.begin() as connection:
+        connection.execute(text("INSERT INTO tasks (id, title, priority) VALUES (1, 'downgraded', 'low')"))
+    assert search("downgraded") == [1]
+    
+    command.upgrade(config, "head")
+    assert triggers() == expected
+    with engine.begin() as connection:
+        connection.execute(text("UPDATE tasks SET title = 'upgraded' WHERE id = 1"))
+    assert (search("downgraded"), search("upgraded")) == ([], [1])
@@ -0,0 +1,87 @@
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+import pytest
+import requests
+from uvicorn.importer import ImportFromStringError
+
+from app.core.config import Settings
+from app.serve import (
+    DEFAULT_STREAM_POLL_SECONDS, available_cpus, build_config, validate_app_import, worker_environment
+)
+
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_build_config():
+    """設定からuvicornの設定を作ることのテスト"""
+    config = build_config(Settings(SERVER_WORKERS=3, SERVER_KEEP_ALIVE=10, SERVER_LIMIT_CONCURRENCY=50))
+    assert config.workers == 3
+    assert config.timeout_keep_alive == 10
+    assert config.limit_concurrency == 50
+    assert config.backlog == 2048
+    assert config.access_log is False
+    assert config.loop in ("uvloop", "asyncio")
+    
+    # ワーカー数の既定値は使えるCPU数
+    assert build_config(Settings(SERVER_WORKERS=None)).workers == available_cpus() >= 1
+    assert build_config(Settings(), port=9000).port == 9000
+
+
+def test_worker_environment():
+    """複数ワーカーではプロセス内のキャッシュを無効にし、他のワーカーの変更を配信することのテスト"""
+    assert worker_environment(1, Settings(CACHE_BACKEND="memory")) == {}
+    assert worker_environment(4, Settings(CACHE_BACKEND="memory")) == {
+        "CACHE_BACKEND": "none", "STREAM_POLL_SECONDS": str(DEFAULT_STREAM_POLL_SECONDS),
+    }
+    assert worker_environment(4, Settings(CACHE_BACKEND="redis", STREAM_POLL_SECONDS=0.5)) == {}
+
+
+def test_validate_app_import():
+    """ワーカーの起動前に親プロセスでアプリをimportできることを確認するテスト"""
+    validate_app_import("app.main:app")
+    with pytest.raises(ImportFromStringError):
+        validate_app_import("app.missing:app")
+
+
+def test_serve_restarts_workers_and_stops_gracefully(tmp_path):
+    """上限の件数を処理したワーカーが再起動され、SIGTERMで全プロセスが終了することのテスト"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp_path / 'serve.db'}")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "app.serve", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", "1", "--limit-max-requests", "2", "--graceful-timeout", "5"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+    )
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                requests.get(f"http://127.0.0.1:{port}/", timeout=5)
+                break
+            except requests.ConnectionError:
+                assert time.monotonic() < deadline, "server did not start"
+                time.sleep(0.2)
+        
+        # 再起動中の接続は親プロセスが開いたソケットで待たされ、新しいワーカーが処理する
+        statuses = []
+        for _ in range(4):
+            statuses.append(requests.get(f"http://127.0.0.1:{port}/", timeout=30).status_code)
+            # ワーカーが上限に達したことに気付く (0.1秒ごとに確認する) まで待つ
+            time.sleep(0.3)
+        assert statuses == [200] * 4
+        
+        server.send_signal(signal.SIGTERM)
+        assert server.wait(timeout=15) == 0
+        assert b"exited with code 0, restarting" in server.stderr.read()
+    finally:
+        if server.poll() is None:
+            server.kill()
+            server.wait()